@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request, BackgroundTasks, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import pandas as pd
@@ -10,6 +10,16 @@ from storage import load_offers, update_offer_status, CSV_FILE
 from scraper import run_scraper
 from ignore_this import check_password
 from logger_config import setup_logging
+from browser_service import BrowserService
+from rate_control import get_controller
+import pipeline
+import metrics
+import tracing
+import profiling
+import checkpoint
+from loop_monitor import LoopMonitor
+from scheduler import Scheduler
+from datetime import datetime
 
 # Setup logging
 setup_logging()
@@ -25,6 +35,55 @@ templates = Jinja2Templates(directory="templates")
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+browser_service = None
+loop_monitor = None
+scheduler = None
+scheduled_run = None  # task of the run the scheduler started last
+
+def load_config():
+    try:
+        with open("config.json", "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+# Opt-in: profiles /api/offers requests slower than profiling.slow_request_ms
+app.middleware("http")(profiling.SlowRequestProfiler(load_config()))
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    # run_scraper shares this loop with the API; stalls would otherwise only show as a frozen dashboard
+    global loop_monitor
+    loop_monitor = LoopMonitor(load_config()).start()
+
+@app.on_event("startup")
+async def start_browser_service():
+    global browser_service
+    service_conf = load_config().get("browser_service", {})
+    if not service_conf.get("enabled", False) or not service_conf.get("autostart", True):
+        return
+    browser_service = BrowserService(load_config())
+    try:
+        await browser_service.start()
+        browser_service.start_supervisor()
+    except Exception as e:
+        logger.error(f"Browser service failed to start: {e}")
+
+@app.on_event("startup")
+async def start_scheduler():
+    global scheduler
+    scheduler = Scheduler(load_config, start_scheduled_run).start()
+
+@app.on_event("shutdown")
+async def stop_browser_supervisor():
+    # The browser itself keeps running so the next app start (or reload) finds it warm
+    if browser_service:
+        browser_service.stop_supervisor()
+    if loop_monitor:
+        loop_monitor.stop()
+    if scheduler:
+        scheduler.stop()
+
 def is_authenticated(request: Request):
     return request.cookies.get(AUTH_COOKIE) == "true"
 
@@ -111,14 +170,17 @@ scraper_progress = {
     "eta_seconds": None
 }
 
-def update_progress(processed, total, task_name):
+def update_progress(processed, total, task_name, eta_seconds=None):
     global scraper_progress, scraper_start_time
     scraper_progress["processed"] = processed
     scraper_progress["total"] = total
     scraper_progress["current_task"] = task_name
     scraper_progress["status"] = "running"
     
-    if processed > 0 and total > 0:
+    # run_scraper estimates from past task durations (state/task_history.json)
+    if eta_seconds is not None:
+        scraper_progress["eta_seconds"] = eta_seconds
+    elif processed > 0 and total > 0:
         elapsed = time.time() - scraper_start_time
         avg_time = elapsed / processed
         remaining = total - processed
@@ -143,12 +205,24 @@ async def get_progress(request: Request):
     return scraper_progress
 
 @app.post("/api/run")
-async def trigger_scraper(request: Request, background_tasks: BackgroundTasks):
+async def trigger_scraper(request: Request, background_tasks: BackgroundTasks, budget_minutes: float = None, resume: bool = False,
+                          profile: str = None):
     if not is_authenticated(request):
         raise HTTPException(status_code=401, detail="Unauthorized")
+    if profile and profile not in profiling.KINDS:
+        raise HTTPException(status_code=400, detail=f"profile must be one of {', '.join(profiling.KINDS)}")
+    if not claim_run("manual"):
+        raise HTTPException(status_code=409, detail="Scraper already running")
+    
+    budget_seconds = budget_minutes * 60 if budget_minutes else None
+    background_tasks.add_task(run_scraper_wrapper, budget_seconds, resume, profile)
+    return {"status": "Scraper started in background", "budget_seconds": budget_seconds, "resume": resume, "profile": profile}
+
+def claim_run(trigger: str) -> bool:
+    """Takes the single-run lock and resets the progress; False when a run holds it."""
     global scraper_running, scraper_progress, scraper_start_time
     if scraper_running:
-        raise HTTPException(status_code=409, detail="Scraper already running")
+        return False
     
     scraper_running = True
     scraper_start_time = time.time()
@@ -158,11 +232,100 @@ async def trigger_scraper(request: Request, background_tasks: BackgroundTasks):
         "total": 0, 
         "current_task": "Starting...",
         "status": "running",
-        "eta_seconds": None
+        "eta_seconds": None,
+        "trigger": trigger,
     }
-    
-    background_tasks.add_task(run_scraper_wrapper)
-    return {"status": "Scraper started in background"}
+    return True
+
+def start_scheduled_run(portals=None, max_pages=None, budget_seconds=None) -> bool:
+    global scheduled_run
+    if not claim_run("schedule"):
+        return False
+    # The loop only keeps a weak reference to tasks
+    scheduled_run = asyncio.create_task(run_scraper_wrapper(budget_seconds, portals=portals, max_pages=max_pages))
+    scheduled_run.add_done_callback(_scheduled_run_done)
+    return True
+
+def _scheduled_run_done(task):
+    if task.cancelled():
+        logger.warning("Scheduled run was cancelled")
+    elif task.exception():
+        logger.error(f"Scheduled run failed: {task.exception()!r}")
+
+@app.get("/api/schedule")
+async def get_schedule(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return scheduler.status() if scheduler else {"enabled": False}
+
+@app.get("/api/browser")
+async def get_browser_status(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not browser_service:
+        return {"enabled": False}
+    return {"enabled": True, **(await browser_service.status())}
+
+@app.get("/api/rate-limits")
+async def get_rate_limits(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return get_controller(load_config()).snapshot()
+
+@app.get("/api/pipeline")
+async def get_pipeline(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return pipeline.current_stats()
+
+@app.get("/api/metrics")
+async def get_metrics(request: Request):
+    # Prometheus cannot log in; it may send metrics.token as a bearer token instead
+    token = load_config().get("metrics", {}).get("token")
+    if not is_authenticated(request) and not (token and request.headers.get("authorization") == f"Bearer {token}"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    metrics.update_pipeline(pipeline.current_stats())
+    if loop_monitor:
+        loop_monitor.update_metrics()
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/runs")
+async def get_runs(request: Request, limit: int = 50):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return checkpoint.list_runs(load_config(), limit)
+
+@app.get("/api/runs/{run_id}")
+async def get_run(request: Request, run_id: str):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    run = checkpoint.load_run(load_config(), run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@app.get("/api/loop")
+async def get_loop(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return loop_monitor.stats() if loop_monitor else {"enabled": False}
+
+@app.get("/api/tracing")
+async def get_tracing(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return tracing.status()
+
+@app.post("/api/tracing")
+async def set_tracing(request: Request, enabled: bool):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    # Takes effect immediately, also in a run in progress
+    if enabled:
+        tracing.enable()
+    else:
+        tracing.disable()
+    return tracing.status()
 
 @app.get("/api/config")
 async def get_config(request: Request):
@@ -183,10 +346,16 @@ async def update_config(request: Request):
         json.dump(new_config, f, indent=4)
     return {"status": "Config saved"}
 
-async def run_scraper_wrapper():
+async def run_scraper_wrapper(budget_seconds=None, resume=False, profile=None, portals=None, max_pages=None):
     global scraper_running
     try:
-        await run_scraper(progress_callback=update_progress)
+        name = datetime.now().strftime("run_%Y%m%d_%H%M%S")
+        with profiling.profiled(profile, name, load_config()) as profile_files:
+            # The report (coverage skipped by a time budget, failures) stays visible in /api/progress
+            scraper_progress["report"] = await run_scraper(progress_callback=update_progress, budget_seconds=budget_seconds, resume=resume,
+                                                          portals=portals, max_pages=max_pages)
+        if profile_files:
+            scraper_progress["profile"] = profile_files
     except Exception as e:
         logger.error(f"Scraper error: {e}")
     finally:
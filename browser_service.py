@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import asyncio
+import logging
+import weakref
+import argparse
+import subprocess
+import urllib.request
+from playwright.async_api import async_playwright
+from logger_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "config.json"
+DEFAULT_PORT = 9333
+PROFILE_DIR = "state/browser-profile"
+DISK_CACHE_DIR = "cache/browser"
+USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+
+# memory.profile "low_memory": fewer renderer processes, a capped V8 heap, no
+# background work, a small viewport and no images, media or fonts
+LOW_MEMORY_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-features=site-per-process,TranslateUI,MediaRouter",
+    "--renderer-process-limit=2",
+    "--js-flags=--max-old-space-size=256",
+    "--blink-settings=imagesEnabled=false",
+]
+LOW_MEMORY_VIEWPORT = {"width": 800, "height": 600}
+LOW_MEMORY_BLOCKED = {"image", "media", "font"}
+
+# Browsers obtained from the service, as opposed to locally launched ones
+_service_browsers = weakref.WeakSet()
+# Init scripts already added to the shared default context, by script text
+_shared_scripts = weakref.WeakKeyDictionary()
+
+def is_low_memory(config: dict) -> bool:
+    return config.get("memory", {}).get("profile") == "low_memory"
+
+def launch_args(config: dict, args: list = None) -> list:
+    args = list(LAUNCH_ARGS if args is None else args)
+    if is_low_memory(config):
+        args += [a for a in LOW_MEMORY_ARGS if a not in args]
+    return args
+
+class BrowserService:
+    """
+    Long-lived local Chromium that the app, run_scraper and filter_by_year attach
+    to over CDP instead of launching their own. It runs with a persistent profile
+    and HTTP disk cache, so successive runs start warm and reuse cached assets.
+
+    Python Playwright has no launch_server(), so Chromium is started directly
+    with --remote-debugging-port and clients use connect_over_cdp().
+    """
+    def __init__(self, config: dict):
+        service_conf = config.get("browser_service", {})
+        self.config = config
+        self.port = int(service_conf.get("port", DEFAULT_PORT))
+        self.profile_dir = os.path.abspath(service_conf.get("profile_dir", PROFILE_DIR))
+        self.disk_cache_dir = os.path.abspath(service_conf.get("disk_cache_dir", DISK_CACHE_DIR))
+        self.disk_cache_mb = int(service_conf.get("disk_cache_mb", 500))
+        self.health_interval = float(service_conf.get("health_interval_seconds", 15))
+        self.extra_args = list(service_conf.get("args", []))
+        self.process = None
+        self.restarts = 0
+        self._supervisor = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def _version(self):
+        with urllib.request.urlopen(f"{self.endpoint}/json/version", timeout=2) as resp:
+            return json.load(resp)
+
+    async def is_healthy(self) -> bool:
+        try:
+            await asyncio.to_thread(self._version)
+            return True
+        except Exception:
+            return False
+
+    async def start(self):
+        if await self.is_healthy():
+            logger.info(f"Browser service already running at {self.endpoint}")
+            return
+        async with async_playwright() as p:
+            executable = p.chromium.executable_path
+        os.makedirs(self.profile_dir, exist_ok=True)
+        os.makedirs(self.disk_cache_dir, exist_ok=True)
+        cmd = [
+            executable,
+            "--headless=new",
+            f"--remote-debugging-port={self.port}",
+            "--remote-debugging-address=127.0.0.1",
+            f"--user-data-dir={self.profile_dir}",
+            f"--disk-cache-dir={self.disk_cache_dir}",
+            f"--disk-cache-size={self.disk_cache_mb * 1024 * 1024}",
+            f"--user-agent={USER_AGENT}",
+            "--no-first-run",
+            "--no-default-browser-check",
+            *launch_args(self.config),
+            *self.extra_args,
+        ]
+        # Own session, so the browser survives uvicorn reloads of the app
+        self.process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        for _ in range(100):
+            if await self.is_healthy():
+                logger.info(f"Browser service started at {self.endpoint} (pid {self.process.pid})")
+                return
+            if self.process.poll() is not None:
+                break
+            await asyncio.sleep(0.2)
+        raise RuntimeError(f"Browser service did not become healthy at {self.endpoint}")
+
+    async def stop(self):
+        self.stop_supervisor()
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                await asyncio.to_thread(self.process.wait, 10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    async def restart(self):
+        logger.warning("Browser service unhealthy, restarting")
+        await self.stop()
+        await self.start()
+        self.restarts += 1
+
+    async def supervise(self):
+        """Health-checks the browser and restarts it when it stops answering."""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            if not await self.is_healthy():
+                try:
+                    await self.restart()
+                except Exception as e:
+                    logger.error(f"Browser service restart failed: {e}")
+
+    def start_supervisor(self):
+        self._supervisor = asyncio.create_task(self.supervise())
+
+    def stop_supervisor(self):
+        if self._supervisor:
+            self._supervisor.cancel()
+            self._supervisor = None
+
+    async def status(self) -> dict:
+        healthy = await self.is_healthy()
+        info = {"endpoint": self.endpoint, "healthy": healthy, "restarts": self.restarts,
+                "pid": self.process.pid if self.process else None}
+        if healthy:
+            try:
+                info["browser"] = (await asyncio.to_thread(self._version)).get("Browser")
+            except Exception:
+                pass
+        return info
+
+class SharedContext:
+    """
+    A task's view of the service's persistent default context. Pages opened
+    through it are closed by close(); the context itself (cookies, disk cache)
+    stays alive for the next task and the next run.
+    """
+    def __init__(self, context):
+        self.context = context
+        self._pages = []
+
+    async def new_page(self):
+        page = await self.context.new_page()
+        self._pages.append(page)
+        return page
+
+    async def add_init_script(self, script=None, **kwargs):
+        added = _shared_scripts.setdefault(self.context, set())
+        if script in added:
+            return
+        added.add(script)
+        await self.context.add_init_script(script=script, **kwargs)
+
+    async def close(self):
+        for page in self._pages:
+            if not page.is_closed():
+                await page.close()
+        self._pages = []
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+def unwrap(context):
+    """Returns the real BrowserContext behind a SharedContext."""
+    return context.context if isinstance(context, SharedContext) else context
+
+def is_shared(context) -> bool:
+    return isinstance(context, SharedContext)
+
+def is_service_browser(browser) -> bool:
+    return browser in _service_browsers
+
+async def get_browser(p, config: dict, **launch_kwargs):
+    """
+    Connects to the browser service if enabled and reachable, otherwise launches
+    a local Chromium. Closing a connected browser only disconnects from it.
+    """
+    service_conf = config.get("browser_service", {})
+    if service_conf.get("enabled", False):
+        endpoint = f"http://127.0.0.1:{int(service_conf.get('port', DEFAULT_PORT))}"
+        try:
+            browser = await p.chromium.connect_over_cdp(endpoint, timeout=5000)
+            _service_browsers.add(browser)
+            logger.info(f"Attached to browser service at {endpoint}")
+            return browser
+        except Exception as e:
+            logger.warning(f"Browser service not reachable ({e}), launching a local browser")
+    args = launch_args(config, launch_kwargs.pop("args", None))
+    return await p.chromium.launch(headless=True, args=args, **launch_kwargs)
+
+async def new_context(browser, config: dict, **kwargs):
+    """
+    Context for one task. On the service browser this is the shared persistent
+    context (unless browser_service.shared_context is false), so its HTTP disk
+    cache and cookies carry over between tasks and runs.
+    """
+    shared = config.get("browser_service", {}).get("shared_context", True)
+    if browser in _service_browsers and shared and browser.contexts:
+        return SharedContext(browser.contexts[0])
+    if is_low_memory(config):
+        kwargs.setdefault("viewport", LOW_MEMORY_VIEWPORT)
+    context = await browser.new_context(**kwargs)
+    if is_low_memory(config):
+        await context.route("**/*", _block_heavy_resources)
+    return context
+
+async def _block_heavy_resources(route):
+    if route.request.resource_type in LOW_MEMORY_BLOCKED:
+        await route.abort()
+    else:
+        await route.fallback()
+
+def load_config():
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+async def serve_forever(config):
+    service = BrowserService(config)
+    await service.start()
+    try:
+        await service.supervise()
+    finally:
+        await service.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the shared Chromium used by the app, scraper.py and filter_by_year.py")
+    parser.add_argument("--port", type=int, help="CDP port (default: config browser_service.port)")
+    args = parser.parse_args()
+    setup_logging()
+    config = load_config()
+    if args.port:
+        config.setdefault("browser_service", {})["port"] = args.port
+    try:
+        asyncio.run(serve_forever(config))
+    except KeyboardInterrupt:
+        sys.exit(0)
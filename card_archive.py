@@ -0,0 +1,112 @@
+import os
+import json
+import gzip
+import time
+import shutil
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "archive/cards"
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_MAX_RUNS = 100
+
+class CardArchive:
+    """
+    Raw listing cards of one run, one gzip'ed JSONL file per portal:
+    archive/cards/<run_id>/<portal>.jsonl.gz
+
+    Each record holds the card's outerHTML, the page it came from and the
+    SCRAPER_VERSION that parsed it, so reparse.py can replay newer parsing
+    logic offline.
+    """
+    def __init__(self, run_id: str, directory: str = ARCHIVE_DIR):
+        self.run_id = run_id
+        self.directory = os.path.join(directory, run_id)
+        self.count = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def add(self, portal: str, version: str, page_url: str, htmls: list[str]):
+        now = time.time()
+        lines = []
+        for index, html in enumerate(htmls):
+            if not html:
+                continue
+            lines.append(json.dumps({
+                "portal": portal,
+                "scraper_version": version,
+                "run_id": self.run_id,
+                "page_url": page_url,
+                "index": index,
+                "archived_at": now,
+                "html": html,
+            }, ensure_ascii=False))
+        if not lines:
+            return
+        path = os.path.join(self.directory, f"{portal}.jsonl.gz")
+        with self._lock:
+            # Appending creates a new gzip member per page; gzip.open reads them back as one stream
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            self.count += len(lines)
+
+def get_archive(run_id: str, config: dict):
+    """Returns a CardArchive for this run, or None if archiving is disabled."""
+    archive_conf = config.get("archive", {})
+    if not archive_conf.get("enabled", False):
+        return None
+    return CardArchive(run_id, archive_conf.get("directory", ARCHIVE_DIR))
+
+def prune(config: dict):
+    """Deletes archived runs older than archive.max_age_days, then the oldest beyond archive.max_runs."""
+    archive_conf = config.get("archive", {})
+    directory = archive_conf.get("directory", ARCHIVE_DIR)
+    if not os.path.isdir(directory):
+        return
+    max_age_days = float(archive_conf.get("max_age_days", DEFAULT_MAX_AGE_DAYS))
+    max_runs = int(archive_conf.get("max_runs", DEFAULT_MAX_RUNS))
+    runs = []
+    for run_id in os.listdir(directory):
+        path = os.path.join(directory, run_id)
+        if os.path.isdir(path):
+            # Appending to a portal's file does not touch the directory's mtime
+            mtime = max([os.path.getmtime(path)] + [os.path.getmtime(os.path.join(path, name)) for name in os.listdir(path)])
+            runs.append((mtime, path))
+    runs.sort(reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for index, (mtime, path) in enumerate(runs):
+        if mtime < cutoff or index >= max_runs:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info(f"Card archive: removed {removed} old run(s) from {directory}")
+
+def iter_records(directory: str = ARCHIVE_DIR, since: float = None, portal: str = None):
+    """Yields archived card records, oldest run first."""
+    if not os.path.isdir(directory):
+        return
+    for run_id in sorted(os.listdir(directory)):
+        run_dir = os.path.join(directory, run_id)
+        if not os.path.isdir(run_dir):
+            continue
+        for name in sorted(os.listdir(run_dir)):
+            if not name.endswith(".jsonl.gz"):
+                continue
+            if portal and name != f"{portal}.jsonl.gz":
+                continue
+            path = os.path.join(run_dir, name)
+            if since and os.path.getmtime(path) < since:
+                continue
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        if since and record.get("archived_at", 0) < since:
+                            continue
+                        yield record
+            except (OSError, EOFError, json.JSONDecodeError) as e:
+                # A run killed mid-write leaves a truncated last member
+                logger.warning(f"Stopped reading {path}: {e}")
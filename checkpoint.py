@@ -0,0 +1,245 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+RUNS_DIR = "state/runs"
+RESUME_MAX_AGE_HOURS = 24  # an interrupted run left longer than this is not resumed
+SAVE_INTERVAL_SECONDS = 2.0  # task progress is written at most this often
+
+# Task statuses; everything but "done" is picked up again by a resumed run
+PENDING, RUNNING, DONE, FAILED, SKIPPED, CUT_SHORT = "pending", "running", "done", "failed", "skipped", "cut_short"
+# Run status of a run stopped by an error or cancellation; like a crashed run ("running") it can be resumed
+INTERRUPTED = "interrupted"
+
+def config_hash(config: dict) -> str:
+    """Short fingerprint of the configuration, to tell runs with different settings apart."""
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+class RunCheckpoint:
+    """
+    Crash-safe record of one run: its planned tasks, each task's status and the
+    last listing page it completed. Rewritten atomically to
+    state/runs/<run_id>.json, task progress at most every SAVE_INTERVAL_SECONDS
+    and the run's start and end at once, so a run killed midway can be resumed
+    having lost a few seconds of progress at most. Inside an event loop the
+    file is written by a background task in a thread, never on the loop;
+    flush() waits for it. Finished
+    runs stay as the run ledger (list_runs(), /api/runs): per-task duration,
+    pages, parsed, kept, new and updated offers and errors.
+    """
+    def __init__(self, path: str, data: dict):
+        self.path = path
+        self.data = data
+        self._lock = threading.Lock()
+        self._saved_at = 0.0
+        self._pending = None  # serialized state the writer has not written yet
+        self._writer = None
+
+    @property
+    def run_id(self) -> str:
+        return self.data["run_id"]
+
+    @property
+    def tasks(self) -> list:
+        return self.data["tasks"]
+
+    @classmethod
+    def create(cls, run_id: str, phases: list, config: dict, **meta):
+        """phases: [(phase, (portal, url, max_pages, districts))] in dispatch order."""
+        directory = _runs_dir(config)
+        os.makedirs(directory, exist_ok=True)
+        tasks = [{
+            "id": i,
+            "phase": phase,
+            "portal": portal,
+            "url": url,
+            "max_pages": max_pages,
+            "districts": districts,
+            "status": PENDING,
+            "last_page": 0,
+            "offers": 0,
+            "new_offers": 0,
+            "attempts": 0,
+            "errors": 0,
+        } for i, (phase, (portal, url, max_pages, districts)) in enumerate(phases)]
+        checkpoint = cls(os.path.join(directory, f"{run_id}.json"), {
+            "run_id": run_id,
+            "status": RUNNING,
+            "started_at": time.time(),
+            "updated_at": time.time(),
+            "config_hash": config_hash(config),
+            **meta,
+            "tasks": tasks,
+        })
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r") as f:
+            return cls(path, json.load(f))
+
+    @classmethod
+    def latest_unfinished(cls, config: dict):
+        """
+        The newest run if it crashed (still "running") or was interrupted within
+        checkpoint.resume_max_age_hours, or None. Runs that ended, even with
+        tasks left over by a time budget, are not resumed, and neither is an
+        older run once a newer one has started.
+        """
+        directory = _runs_dir(config)
+        if not os.path.isdir(directory):
+            return None
+        max_age = float(config.get("checkpoint", {}).get("resume_max_age_hours", RESUME_MAX_AGE_HOURS)) * 3600
+        for name in sorted(os.listdir(directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                checkpoint = cls.load(os.path.join(directory, name))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Unreadable run checkpoint {name}: {e}")
+                continue
+            if checkpoint.data.get("status") not in (RUNNING, INTERRUPTED):
+                return None
+            if time.time() - checkpoint.data.get("updated_at", 0) > max_age:
+                logger.info(f"Run {checkpoint.run_id} was interrupted too long ago to resume")
+                return None
+            return checkpoint
+        return None
+
+    def phases(self, unfinished_only: bool = True) -> list:
+        """[(task_id, phase, (portal, url, max_pages, districts))] for the tasks still to do."""
+        return [(t["id"], t["phase"], (t["portal"], t["url"], t["max_pages"], t["districts"]))
+                for t in self.tasks if not unfinished_only or t["status"] != DONE]
+
+    def save(self, force: bool = True):
+        """Writes the checkpoint; unforced saves within SAVE_INTERVAL_SECONDS of the last one wait for the next."""
+        now = time.time()
+        if not force and now - self._saved_at < SAVE_INTERVAL_SECONDS:
+            return
+        self._saved_at = now
+        self.data["updated_at"] = now
+        # Serialized now, so later changes cannot race the writer thread
+        payload = json.dumps(self.data, indent=2, ensure_ascii=False)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._write(payload)
+            return
+        self._pending = payload
+        if self._writer is None or self._writer.done():
+            self._writer = loop.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        # Saves made while a write is in progress collapse into one write of the newest state
+        while self._pending is not None:
+            payload, self._pending = self._pending, None
+            try:
+                await asyncio.to_thread(self._write, payload)
+            except Exception as e:
+                logger.error(f"Could not write run checkpoint {self.path}: {e}")
+
+    async def flush(self):
+        """Waits until every save so far is on disk."""
+        if self._writer:
+            await asyncio.shield(self._writer)
+
+    def _write(self, payload: str):
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def update(self, task_id: int, **fields):
+        self.tasks[task_id].update(fields, updated_at=time.time())
+        self.save(force=False)
+
+    def start_task(self, task_id: int):
+        # Scrapers paginate from page 1, so a restarted task counts its pages anew
+        task = self.tasks[task_id]
+        fields = {"status": RUNNING, "attempts": task["attempts"] + 1, "last_page": 0}
+        if task["last_page"]:
+            fields["previous_last_page"] = task["last_page"]
+        self.update(task_id, **fields)
+
+    def page_done(self, task_id: int, page_number: int):
+        """Records the furthest listing page completed by any attempt of the task."""
+        if page_number > self.tasks[task_id]["last_page"]:
+            self.update(task_id, last_page=page_number)
+
+    def finish(self, status: str = None):
+        """Marks the run done, or incomplete when some task did not finish."""
+        unfinished = sum(1 for t in self.tasks if t["status"] != DONE)
+        self.data["status"] = status or (DONE if not unfinished else "incomplete")
+        self.data["finished_at"] = time.time()
+        self.save()
+
+    def record_report(self, report: dict):
+        """Keeps the run report (coverage, pipeline, network) with the run."""
+        self.data["report"] = report
+        self.save()
+
+    def summary(self) -> dict:
+        """One line of the run ledger."""
+        data = self.data
+        tasks = self.tasks
+        statuses = {}
+        for task in tasks:
+            statuses[task["status"]] = statuses.get(task["status"], 0) + 1
+        finished_at = data.get("finished_at")
+        return {
+            "run_id": data["run_id"],
+            "status": data.get("status"),
+            "started_at": data.get("started_at"),
+            "finished_at": finished_at,
+            "seconds": round((finished_at or data.get("updated_at", 0)) - data.get("started_at", 0), 1),
+            "config_hash": data.get("config_hash"),
+            "budget_seconds": data.get("budget_seconds"),
+            "tasks": len(tasks),
+            "task_status": statuses,
+            "pages": sum(t.get("pages", t["last_page"]) for t in tasks),
+            "cards": sum(t["offers"] for t in tasks),  # offers parsed from listing cards
+            "kept": sum(t.get("kept", 0) for t in tasks),
+            "new_offers": sum(t["new_offers"] for t in tasks),
+            "updated_offers": sum(t.get("updated_offers", 0) for t in tasks),
+            "errors": sum(t.get("errors", 0) for t in tasks),
+        }
+
+def _runs_dir(config: dict) -> str:
+    return config.get("checkpoint", {}).get("directory", RUNS_DIR)
+
+def list_runs(config: dict, limit: int = 50) -> list:
+    """Ledger summaries of the newest runs first."""
+    directory = _runs_dir(config)
+    if not os.path.isdir(directory):
+        return []
+    runs = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        try:
+            runs.append(RunCheckpoint.load(os.path.join(directory, name)).summary())
+        except (OSError, KeyError, json.JSONDecodeError) as e:
+            logger.warning(f"Unreadable run checkpoint {name}: {e}")
+            continue
+        if len(runs) >= limit:
+            break
+    return runs
+
+def load_run(config: dict, run_id: str):
+    """The full record of one run, or None."""
+    if not run_id.replace("_", "").isalnum():
+        return None  # run ids are timestamps; anything else is not a file name of ours
+    path = os.path.join(_runs_dir(config), f"{run_id}.json")
+    if not os.path.exists(path):
+        return None
+    return RunCheckpoint.load(path).data
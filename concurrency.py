@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+
+try:
+    import psutil
+except ImportError:  # optional, /proc is read directly on Linux
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "state/concurrency.json"
+TOTAL = "*"  # key of the tuner for all in-flight pages together
+
+def rss_mb():
+    """RSS of this process and its children (Playwright driver, Chromium), or None if unknown."""
+    if psutil:
+        try:
+            proc = psutil.Process()
+            return sum(p.memory_info().rss for p in [proc, *proc.children(recursive=True)]) / 2**20
+        except psutil.Error:
+            return None
+    if not os.path.isdir("/proc"):
+        return None
+    parents, rss = {}, {}
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # Process name may contain spaces, fields resume after the closing paren
+                fields = f.read().rsplit(")", 1)[1].split()
+            parents[int(pid)] = int(fields[1])
+            rss[int(pid)] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, frontier = {os.getpid()}, [os.getpid()]
+    while frontier:
+        parent = frontier.pop()
+        children = [pid for pid, ppid in parents.items() if ppid == parent and pid not in tree]
+        tree.update(children)
+        frontier.extend(children)
+    return sum(rss.get(pid, 0) for pid in tree) / 2**20
+
+class ConcurrencyTuner:
+    """
+    Hill-climbs one in-flight limit: after each measurement window the level
+    keeps moving in the same direction while pages/second improves and turns
+    around when it drops. An error rate or memory use over the ceiling steps
+    it down and caps it there for the rest of the run.
+    """
+    def __init__(self, key, level, max_level, window_seconds, max_error_rate, max_rss_mb=None):
+        self.key = key
+        self.max_level = max_level
+        self.level = max(1, min(level, max_level))
+        self.window_seconds = window_seconds
+        self.max_error_rate = max_error_rate
+        self.max_rss_mb = max_rss_mb
+        self.in_flight = 0
+        self.direction = 1
+        self.best = None  # (pages_per_second, level)
+        self.last_throughput = None
+        self._reset_window()
+
+    def _reset_window(self):
+        self.window_started = time.monotonic()
+        self.pages = 0
+        self.errors = 0
+        self.peak = self.in_flight
+
+    def acquire(self):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+
+    def release(self):
+        self.in_flight -= 1
+
+    def record(self, pages=1, errors=0):
+        self.pages += pages
+        self.errors += errors
+        elapsed = time.monotonic() - self.window_started
+        if elapsed >= self.window_seconds and self.pages + self.errors >= 3:
+            self._adjust(elapsed)
+
+    def _adjust(self, elapsed):
+        throughput = self.pages / elapsed
+        error_rate = self.errors / (self.pages + self.errors)
+        memory = rss_mb() if self.max_rss_mb else None
+        previous = self.level
+        if error_rate > self.max_error_rate or (memory and memory > self.max_rss_mb):
+            self.max_level = max(1, self.level - 1)
+            self.level = self.max_level
+            self.direction = -1
+            reason = f"error rate {error_rate:.0%}" if error_rate > self.max_error_rate else f"RSS {memory:.0f} MB"
+        else:
+            if self.last_throughput is not None and throughput < self.last_throughput:
+                self.direction = -self.direction
+            # Raising a limit that was never reached says nothing about throughput
+            if self.direction > 0 and self.peak < self.level:
+                reason = "limit not reached"
+            else:
+                self.level = max(1, min(self.max_level, self.level + self.direction))
+                reason = f"{throughput:.2f} pages/s"
+            if self.best is None or throughput > self.best[0]:
+                self.best = (throughput, previous)
+        if self.level != previous:
+            logger.info(f"[concurrency {self.key}] {previous} -> {self.level} in flight ({reason})")
+        self.last_throughput = throughput
+        self._reset_window()
+
+    def chosen_level(self):
+        """Level to start the next run with: the best measured one, else the current one."""
+        return min(self.best[1], self.max_level) if self.best else self.level
+
+    def to_dict(self):
+        return {
+            "level": self.level,
+            "in_flight": self.in_flight,
+            "max_level": self.max_level,
+            "best_pages_per_second": round(self.best[0], 3) if self.best else None,
+            "best_level": self.best[1] if self.best else None,
+        }
+
+class ConcurrencyController:
+    """
+    Runs a set of page-holding jobs under a tuned limit for all pages in flight
+    (bounded by concurrency.max_rss_mb) and one per portal (bounded by the
+    portal's error rate). Chosen levels are saved per scope and portal in
+    state/concurrency.json and used as starting points by the next run.
+    With concurrency.enabled false jobs run one at a time, as before.
+    """
+    def __init__(self, config: dict, scope: str):
+        conf = config.get("concurrency", {})
+        self.scope = scope
+        self.enabled = conf.get("enabled", True)
+        self.max_total = int(conf.get("max_in_flight", 4)) if self.enabled else 1
+        self.max_per_key = int(conf.get("max_per_portal", 3)) if self.enabled else 1
+        self.window_seconds = float(conf.get("window_seconds", 20))
+        self.max_error_rate = float(conf.get("max_error_rate", 0.2))
+        self.max_rss_mb = conf.get("max_rss_mb", 2048)
+        self.state_file = conf.get("state_file", STATE_FILE)
+        self._saved = self._load().get(scope, {})
+        self.tuners = {}
+        self.total = self._new_tuner(TOTAL, self.max_total, self.max_rss_mb)
+        self._changed = asyncio.Event()
+
+    def _load(self):
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _new_tuner(self, key, max_level, max_rss_mb=None):
+        level = int(self._saved.get(key, {}).get("level", 2 if key == TOTAL else 1))
+        return ConcurrencyTuner(key, level if self.enabled else 1, max_level,
+                                self.window_seconds, self.max_error_rate, max_rss_mb)
+
+    def tuner(self, key: str) -> ConcurrencyTuner:
+        if key not in self.tuners:
+            self.tuners[key] = self._new_tuner(key, self.max_per_key)
+        return self.tuners[key]
+
+    def record(self, key: str, pages: int = 1, errors: int = 0):
+        """Reports finished pages (and failed ones) of a job holding a slot for key."""
+        if not self.enabled:
+            return
+        self.tuner(key).record(pages, errors)
+        self.total.record(pages, errors)
+        self._changed.set()
+
+    def _can_start(self, key):
+        return self.total.in_flight < self.total.level and self.tuner(key).in_flight < self.tuner(key).level
+
+    def try_acquire(self, key: str) -> bool:
+        """Takes a slot for key outside map() (e.g. a hedged attempt) if the levels allow one."""
+        if not self._can_start(key):
+            return False
+        self.tuner(key).acquire()
+        self.total.acquire()
+        return True
+
+    def release(self, key: str):
+        self.tuner(key).release()
+        self.total.release()
+        self._changed.set()
+
+    async def _run_one(self, key, item, fn):
+        try:
+            return await fn(item)
+        except Exception as e:
+            logger.exception(f"[concurrency {self.scope}] Job for {key} failed: {e!r}")
+            return e
+        finally:
+            self.release(key)
+
+    async def map(self, items, key_fn, fn):
+        """
+        Awaits fn(item) for every item with as many in flight as the tuned levels
+        allow. Items start in the given order, except that an item whose portal
+        is at its limit lets items of other portals go first. Returns the results
+        in item order; a job that raised is logged and its exception takes its
+        place, so one failing item does not stop the others. If map itself is
+        cancelled, the jobs in flight are cancelled and awaited before it returns.
+        """
+        queues = {}
+        for index, item in enumerate(items):
+            queues.setdefault(key_fn(item), deque()).append((index, item))
+        results = [None] * sum(len(q) for q in queues.values())
+        running = set()
+        try:
+            await self._map(queues, running, results, fn)
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+        return results
+
+    async def _map(self, queues, running, results, fn):
+        while queues or running:
+            startable = [key for key in queues if self._can_start(key)]
+            if startable:
+                key = min(startable, key=lambda k: queues[k][0][0])
+                index, item = queues[key].popleft()
+                if not queues[key]:
+                    del queues[key]
+                self.try_acquire(key)
+                task = asyncio.create_task(self._run_one(key, item, fn))
+                task.index = index
+                running.add(task)
+                continue
+            self._changed.clear()
+            waiter = asyncio.create_task(self._changed.wait())
+            try:
+                done, _ = await asyncio.wait(running | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            for task in done - {waiter}:
+                running.discard(task)
+                results[task.index] = task.result()
+
+    def save(self):
+        if not self.enabled:
+            return
+        state = self._load()
+        scope_state = state.setdefault(self.scope, {})
+        for tuner in [self.total, *self.tuners.values()]:
+            scope_state[tuner.key] = {"level": tuner.chosen_level(), "updated_at": time.time()}
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=4)
+        os.replace(tmp, self.state_file)
+        logger.info(f"Concurrency levels ({self.scope}): " + ", ".join(
+            f"{k}={v['level']}" for k, v in scope_state.items()))
+
+    def snapshot(self) -> dict:
+        return {tuner.key: tuner.to_dict() for tuner in [self.total, *self.tuners.values()]}
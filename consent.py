@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import weakref
+import logging
+import browser_service
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = "state/consent"
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Known CMP (consent management platform) overlays: OneTrust, Google Funding
+# Choices, Cookiebot, Didomi, Quantcast and the portals' own RODO popups.
+CMP_SELECTORS = [
+    "#onetrust-consent-sdk", "#onetrust-banner-sdk", ".onetrust-pc-dark-filter",
+    ".fc-consent-root", ".fc-dialog-overlay",
+    "#CybotCookiebotDialog", "#CybotCookiebotDialogBodyUnderlay",
+    "#didomi-host", ".qc-cmp2-container",
+    ".rodo-popup", "[id*='gdpr-popup']",
+]
+
+# Runs before any page script: hides the overlays and undoes their scroll lock.
+CMP_SUPPRESS_SCRIPT = """
+(() => {
+    const css = `%s { display: none !important; visibility: hidden !important; }
+        html, body { overflow: auto !important; position: static !important; }`;
+    const inject = () => {
+        if (document.getElementById('scrappy-cmp-suppress')) return;
+        const style = document.createElement('style');
+        style.id = 'scrappy-cmp-suppress';
+        style.textContent = css;
+        (document.head || document.documentElement).appendChild(style);
+    };
+    if (document.documentElement) inject();
+    document.addEventListener('DOMContentLoaded', inject);
+})();
+""" % ", ".join(CMP_SELECTORS)
+
+# context -> portals whose saved consent was loaded into it / whose dialog was clicked in it.
+# Keyed per portal because a shared service context serves every portal.
+_primed = weakref.WeakKeyDictionary()
+_accepted = weakref.WeakKeyDictionary()
+
+def state_path(portal: str, directory: str = STATE_DIR) -> str:
+    return os.path.join(directory, f"{portal}.json")
+
+def load_state_path(portal: str, config: dict = None):
+    """Returns the saved storage_state file for a portal, or None if missing or expired."""
+    consent_conf = (config or {}).get("consent", {})
+    path = state_path(portal, consent_conf.get("directory", STATE_DIR))
+    if not os.path.exists(path):
+        return None
+    max_age = float(consent_conf.get("max_age_days", DEFAULT_MAX_AGE_DAYS)) * 86400
+    if time.time() - os.path.getmtime(path) > max_age:
+        logger.info(f"Consent state for {portal} expired, will accept again")
+        return None
+    return path
+
+async def new_context(browser, portal: str, config: dict = None, **kwargs):
+    """
+    Context for one task that reuses the portal's saved consent cookies and
+    suppresses known CMP overlays, so the consent dialog is handled once per
+    portal instead of once per task.
+    """
+    config = config or {}
+    path = None
+    if config.get("consent", {}).get("enabled", True):
+        path = load_state_path(portal, config)
+    if path:
+        kwargs["storage_state"] = path
+    context = await browser_service.new_context(browser, config, **kwargs)
+    if path:
+        if browser_service.is_shared(context):
+            # The persistent context ignores storage_state, add the cookies instead
+            with open(path, "r") as f:
+                cookies = json.load(f).get("cookies", [])
+            if cookies:
+                await context.add_cookies(cookies)
+        await context.add_init_script(script=CMP_SUPPRESS_SCRIPT)
+        _primed.setdefault(browser_service.unwrap(context), set()).add(portal)
+    return context
+
+def is_primed(context, portal: str) -> bool:
+    """True if the context was set up with the portal's saved consent and CMP suppression."""
+    return portal in _primed.get(browser_service.unwrap(context), ())
+
+def is_handled(context, portal: str) -> bool:
+    real = browser_service.unwrap(context)
+    return portal in _primed.get(real, ()) or portal in _accepted.get(real, ())
+
+def mark_accepted(context, portal: str):
+    _accepted.setdefault(browser_service.unwrap(context), set()).add(portal)
+
+async def save_if_accepted(context, portal: str, config: dict = None):
+    """Persists the context's cookies after the first successful consent click."""
+    real = browser_service.unwrap(context)
+    if portal not in _accepted.get(real, ()) or portal in _primed.get(real, ()):
+        return
+    consent_conf = (config or {}).get("consent", {})
+    if not consent_conf.get("enabled", True):
+        return
+    path = state_path(portal, consent_conf.get("directory", STATE_DIR))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        await real.storage_state(path=path)
+        logger.info(f"Saved consent state for {portal} to {path}")
+    except Exception as e:
+        logger.warning(f"Could not save consent state for {portal}: {e}")
@@ -0,0 +1,144 @@
+import time
+import asyncio
+import logging
+from storage import update_offers_fields
+from filter_by_year import get_year_built, classify_year, get_max_year
+from html_cache import get_cache
+from rate_control import get_controller
+from supervisor import close_quietly
+import browser_service
+import tracing
+from network import NetworkMeter
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = browser_service.USER_AGENT
+
+class EnrichmentWorker:
+    """
+    Visits detail pages of offers that are new in the current run and writes
+    the build year (and the max_year hide rule) to storage, batch_size offers
+    or batch_seconds at a time, so the CSV is rewritten once per batch instead
+    of once per offer. Runs next to the listing crawl on the run's browser
+    (see memory_governor.py); submit() never blocks.
+    """
+    def __init__(self, governor, config: dict):
+        enrich_conf = config.get("enrichment", {})
+        self.governor = governor
+        self.recycle_after_pages = int(config.get("memory", {}).get("page_recycle_after", 50))
+        self.config = config
+        self.max_year = get_max_year(config)
+        self.cache = get_cache(config)
+        self.rate = get_controller(config)
+        self.workers = max(1, int(enrich_conf.get("workers", 1)))
+        self.batch_size = max(1, int(enrich_conf.get("batch_size", 50)))
+        self.batch_seconds = float(enrich_conf.get("batch_seconds", 10))
+        self.updates = {}  # url -> fields not written yet
+        self._flushed_at = time.monotonic()
+        self.queue = asyncio.Queue()
+        self.processed = 0
+        self.hidden = 0
+        self.network = NetworkMeter("enrichment")
+        self._tasks = []
+
+    def start(self):
+        logger.info(f"Enrichment started ({self.workers} worker(s), max_year {self.max_year})")
+        self._tasks = [asyncio.create_task(self._work(i)) for i in range(self.workers)]
+
+    def submit(self, offers: list[dict]):
+        for offer in offers:
+            if offer.get("url"):
+                self.queue.put_nowait(offer)
+
+    async def close(self, drain: bool = True) -> int:
+        """
+        Waits for the queue to drain, then stops the workers. With drain=False
+        queued offers are dropped instead; returns how many were dropped.
+        """
+        if not self._tasks:
+            return 0  # closed already
+        dropped = 0
+        if not drain:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                dropped += 1
+        for _ in self._tasks:
+            self.queue.put_nowait(None)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._flush()
+        usage = self.network.total
+        logger.info(f"Enrichment done: {self.processed} checked, {self.hidden} hidden by year, "
+                    f"{usage.requests} requests, {sum(usage.bytes.values()) / 2**20:.1f} MiB.")
+        return dropped
+
+    async def _open_page(self, browser):
+        context = await browser_service.new_context(browser, self.config, user_agent=USER_AGENT)
+        page = await context.new_page()
+        if self.cache:
+            self.cache.attach(page)
+        self.rate.attach(page)
+        await self.network.attach(page)
+        return context, page
+
+    async def _work(self, worker_id):
+        context = page = None
+        generation = served = 0
+        worker_span = tracing.span("enrichment worker", lane=True, worker=worker_id)
+        try:
+            while True:
+                offer = await self.queue.get()
+                if offer is None:
+                    break
+                try:
+                    async with self.governor.lease() as browser:
+                        # Detail pages leak memory too: reopen after recycle_after_pages, or on a recycled browser
+                        if page is None or generation != self.governor.generation or served >= self.recycle_after_pages:
+                            if context:
+                                await close_quietly(context)
+                                context = page = None
+                            context, page = await self._open_page(browser)
+                            generation, served = self.governor.generation, 0
+                        await self._enrich(page, offer)
+                        served += 1
+                        self.governor.page_done()
+                except Exception as e:
+                    # The worker goes on with the next offer on a fresh page
+                    logger.error(f"Enrichment worker {worker_id} failed on {offer['url']}: {e!r}")
+                    if context:
+                        await close_quietly(context)
+                    context = page = None
+        finally:
+            worker_span.end()
+            if context:
+                await close_quietly(context)
+
+    async def _enrich(self, page, offer):
+        url = offer["url"]
+        try:
+            with tracing.span("detail page", url=url) as span:
+                year = await get_year_built(page, url, self.cache, self.rate)
+                span.set(year=year)
+            is_hidden, status = classify_year(year, self.max_year)
+            fields = {"year_built": year}
+            if is_hidden:
+                fields["is_hidden"] = True
+                self.hidden += 1
+            self.updates[url] = fields
+            self.processed += 1
+            logger.info("[ENRICH] %s - %.30s...", status, offer.get("title", "No Title"), extra={"sampled": True})
+        except Exception as e:
+            logger.error(f"Enrichment failed for {url}: {e}")
+        if len(self.updates) >= self.batch_size or time.monotonic() - self._flushed_at > self.batch_seconds:
+            await self._flush()
+
+    async def _flush(self):
+        """Writes the collected fields in one CSV update, under the same lock as the pipeline's persist stage."""
+        updates, self.updates = self.updates, {}
+        self._flushed_at = time.monotonic()
+        if not updates:
+            return
+        try:
+            await asyncio.to_thread(update_offers_fields, updates)
+        except Exception as e:
+            logger.error(f"Saving enrichment of {len(updates)} offers failed: {e}")
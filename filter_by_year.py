@@ -1,19 +1,57 @@
 import asyncio
 import pandas as pd
-import sys
 import os
 import re
 import json
+import time
 import logging
-from playwright.async_api import async_playwright
-from logger_config import setup_logging
+import contextlib
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+from logger_config import setup_logging, bind
+from html_cache import get_cache
+from rate_control import get_controller, host_of
+from concurrency import ConcurrencyController
+from memory_governor import MemoryGovernor
+from supervisor import close_quietly
+import browser_service
+import tracing
+import profiling
+from network import NetworkMeter
 
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+CONFIG_FILE = "config.json"
+DEFAULT_MAX_YEAR = 1960
+
 # --- Helper Functions ---
 
+def load_config():
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def get_max_year(config=None):
+    if config is None:
+        config = load_config()
+    return int(config.get("enrichment", {}).get("max_year", DEFAULT_MAX_YEAR))
+
+def classify_year(year, max_year):
+    """
+    Returns (is_hidden, status) for a build year.
+    - If year < max_year: KEEP
+    - If year not found: KEEP
+    - If year >= max_year: HIDE
+    """
+    if year is None:
+        return False, "YEAR NOT FOUND (KEEP)"
+    if year < max_year:
+        return False, f"YEAR {year} < {max_year} (KEEP)"
+    return True, f"YEAR {year} >= {max_year} (HIDE)"
+
 def normalize_year(text):
     if not text: return None
     # Look for 4 digits in range 1000-2030
@@ -126,16 +164,28 @@ async def extract_year_tabelaofert(page):
         return None
     except: return None
 
-async def get_year_built(page, url):
+async def get_year_built(page, url, cache=None, rate=None):
     try:
-        logger.info(f"Checking: {url}")
+        logger.info("Checking: %s", url, extra={"sampled": True})
         
-        # Use a more aggressive timeout for slow sites, but allow for early exit
-        try:
-            await page.goto(url, wait_until="domcontentloaded", timeout=20000)
-        except Exception as e:
-            logger.warning(f"Timeout or error loading {url}: {e}")
-            # Try to continue if we have some content
+        # Detail pages rarely change, a cached copy within the freshness window avoids the fetch
+        serving = cache.serving(page, url, cache.detail_max_age, rate=rate) if cache else contextlib.nullcontext(False)
+        async with serving as from_cache:
+            if from_cache:
+                logger.info("Using cached HTML for %s", url, extra={"sampled": True})
+            elif rate:
+                await rate.acquire(url)
+
+            # Use a more aggressive timeout for slow sites, but allow for early exit
+            try:
+                response = await page.goto(url, wait_until="domcontentloaded", timeout=20000)
+                if rate and not from_cache and response and response.ok:
+                    rate.record(url, "ok")
+            except Exception as e:
+                if rate and isinstance(e, PlaywrightTimeoutError):
+                    rate.record(url, "timeout")
+                logger.warning(f"Timeout or error loading {url}: {e}")
+                # Try to continue if we have some content
         
         # Cookie consent handling - try a few common patterns
         try:
@@ -192,26 +242,89 @@ async def process_offers(input_file):
     df = pd.read_csv(input_file)
     logger.info(f"Loaded {len(df)} offers.")
 
-    max_year = 1960
+    config = load_config()
+    max_year = get_max_year(config)
+    cache = get_cache(config)
+    rate = get_controller(config)
     logger.info(f"Using max_year: {max_year}")
     
     # Ensure is_hidden column exists
     if "is_hidden" not in df.columns:
         df["is_hidden"] = False
     
-    updated_offers = []
+    updated_offers = [None] * len(df)
+    done = 0
+    concurrency = ConcurrencyController(config, "filter_by_year")
+    tracing.configure(config)
+    tracing.open_trace(time.strftime("filter_by_year_%Y%m%d_%H%M%S"))
     
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-             user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        )
-        page = await context.new_page()
-        
-        for index, row in df.iterrows():
+        governor = MemoryGovernor(p, config, args=[])
+        await governor.start()
+        recycle_after = int(config.get("memory", {}).get("page_recycle_after", 50))
+        contexts = {}  # browser generation -> context
+        # Idle (generation, page, pages served), reused by whichever check runs next
+        pages = []
+        network = NetworkMeter("filter_by_year")
+
+        async def get_page():
+            while pages:
+                generation, page, served = pages.pop()
+                if generation == governor.generation and served < recycle_after:
+                    return generation, page, served
+                # Served too many detail pages, or its browser was recycled
+                await close_quietly(page)
+            if governor.generation not in contexts:
+                contexts[governor.generation] = await browser_service.new_context(
+                     governor.browser, config,
+                     user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                )
+            page = await contexts[governor.generation].new_page()
+            if cache:
+                cache.attach(page)
+            rate.attach(page)
+            await network.attach(page)
+            return governor.generation, page, 0
+
+        async def check_offer(item):
+            nonlocal done
+            index, row = item
             url = str(row['url'])
             row_dict = row.to_dict()
 
+            host = host_of(url)
+            bind(portal=host)
+            failures = rate.get(host).failures
+            async with governor.lease():
+                generation, page, served = await get_page()
+                try:
+                    # Check year
+                    with tracing.span("detail page", lane=True, url=url) as span:
+                        year = await get_year_built(page, url, cache, rate)
+                        span.set(year=year)
+                finally:
+                    pages.append((generation, page, served + 1))
+                    governor.page_done()
+            # Blocks and timeouts seen by the rate control count as errors for the tuner
+            failed = rate.get(host).failures > failures
+            concurrency.record(host, pages=int(not failed), errors=int(failed))
+            
+            row_dict["is_hidden"], status = classify_year(year, max_year)
+            row_dict["year_built"] = year
+            
+            updated_offers[index] = row_dict
+            done += 1
+            logger.info("[%d/%d] %s - %.30s...", done, len(df), status, row.get("title", "No Title"), extra={"sampled": True})
+            
+            # Periodic save
+            if done % 10 == 0:
+                temp_df = pd.DataFrame([o for o in updated_offers if o is not None])
+                output_file = f"processed_{os.path.basename(input_file)}"
+                temp_df.to_csv(output_file, index=False)
+                logger.info(f"Saved progress to {output_file}")
+
+        to_check = []
+        for index, row in df.iterrows():
             # Check if likely already hidden
             is_already_hidden = False
             val = row.get("is_hidden")
@@ -220,44 +333,30 @@ async def process_offers(input_file):
 
             if is_already_hidden:
                 logger.info(f"[{index+1}/{len(df)}] ALREADY HIDDEN (SKIP) - {str(row.get('title', 'No Title'))[:30]}...")
+                row_dict = row.to_dict()
                 row_dict["is_hidden"] = True
-                updated_offers.append(row_dict)
+                updated_offers[index] = row_dict
+                done += 1
                 continue
+            to_check.append((index, row))
+
+        results = await concurrency.map(to_check, lambda item: host_of(str(item[1]["url"])), check_offer)
+        for (index, row), result in zip(to_check, results):
+            if isinstance(result, Exception):
+                # Kept unchanged rather than dropped from the output
+                updated_offers[index] = row.to_dict()
+        concurrency.save()
             
-            # Check year
-            year = await get_year_built(page, url)
-            
-            # Logic: 
-            # - If year < max_year: KEEP (is_hidden = False)
-            # - If year not found: KEEP (is_hidden = False)
-            # - If year >= max_year: HIDE (is_hidden = True)
-            
-            status = ""
-            
-            if year is None:
-                # Keep active
-                row_dict["is_hidden"] = False
-                status = "YEAR NOT FOUND (KEEP)"
-            elif year < max_year:
-                row_dict["is_hidden"] = False
-                status = f"YEAR {year} < {max_year} (KEEP)"
-            else:
-                row_dict["is_hidden"] = True
-                status = f"YEAR {year} >= {max_year} (HIDE)"
-            
-            # row_dict['scraped_year'] = year if year else ""
-            
-            updated_offers.append(row_dict)
-            logger.info(f"[{index+1}/{len(df)}] {status} - {str(row.get('title', 'No Title'))[:30]}...")
-            
-            # Periodic save
-            if (index + 1) % 10 == 0:
-                temp_df = pd.DataFrame(updated_offers)
-                output_file = f"processed_{os.path.basename(input_file)}"
-                temp_df.to_csv(output_file, index=False)
-                logger.info(f"Saved progress to {output_file}")
-            
-        await browser.close()
+        for _, page, _ in pages:
+            await close_quietly(page)
+        for context in contexts.values():
+            await close_quietly(context)
+        await governor.close()
+        usage = network.total.to_dict()
+        logger.info(f"Network: {usage['requests']} requests, {usage['bytes'] / 2**20:.1f} MiB, "
+                    f"{usage['cache_hits']} cache hits, by type: {usage['bytes_by_type']}")
+    rate.save()
+    tracing.flush()
         
     # Final Save
     new_df = pd.DataFrame(updated_offers)
@@ -266,7 +365,12 @@ async def process_offers(input_file):
     logger.info(f"\nDone! Saved {len(new_df)} offers to {output_file}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python filter_by_year.py <input_csv_file>")
-    else:
-        asyncio.run(process_offers(sys.argv[1]))
+    import argparse
+    parser = argparse.ArgumentParser(description="Check the build year of offers in a CSV and hide the too new ones")
+    parser.add_argument("input_file", help="CSV of offers, e.g. offers.csv")
+    parser.add_argument("--profile", choices=profiling.KINDS, default=None,
+                        help="Profile the check (sampled CPU stacks or tracemalloc allocation sites) into profiles/")
+    args = parser.parse_args()
+    name = time.strftime("filter_by_year_%Y%m%d_%H%M%S")
+    with profiling.profiled(args.profile, name, load_config()):
+        asyncio.run(process_offers(args.input_file))
@@ -0,0 +1,239 @@
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit, urlunsplit
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "cache/html"
+DEFAULT_MAX_SIZE_MB = 500
+DEFAULT_LISTING_MAX_AGE_MINUTES = 0  # listings change by the minute: not served from cache unless configured
+DEFAULT_DETAIL_MAX_AGE_HOURS = 24 * 7
+CACHE_HEADER = "x-scrappy-cache"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def canonical_url(url: str) -> str:
+    """url as the browser requests it: lowercase scheme and host, no default port or fragment, "/" for an empty path."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
+
+class HtmlCache:
+    """
+    On-disk cache of fetched HTML documents.
+
+    Blobs are content-addressed (sha256 of the HTML) and stored compressed
+    (zstd if installed, gzip otherwise), so a page that did not change between
+    runs is stored once. A small SQLite index maps URL -> content hash with
+    fetch time, raw/stored size and last access for LRU eviction.
+    """
+    def __init__(self, config: dict):
+        cache_conf = config.get("cache", {})
+        self.directory = cache_conf.get("directory", CACHE_DIR)
+        self.max_bytes = int(float(cache_conf.get("max_size_mb", DEFAULT_MAX_SIZE_MB)) * 1024 * 1024)
+        self.listing_max_age = float(cache_conf.get("listing_max_age_minutes", DEFAULT_LISTING_MAX_AGE_MINUTES)) * 60
+        self.detail_max_age = float(cache_conf.get("detail_max_age_hours", DEFAULT_DETAIL_MAX_AGE_HOURS)) * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_hash ON entries (content_hash)")
+        self._db.commit()
+
+    # --- Blob storage ---
+
+    def _blob_path(self, content_hash, codec):
+        return os.path.join(self.directory, content_hash[:2], f"{content_hash}.html.{codec}")
+
+    def _find_blob(self, content_hash):
+        for codec in ("zst", "gz"):
+            path = self._blob_path(content_hash, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None, None
+
+    def _write_blob(self, content_hash, data: bytes):
+        path, _ = self._find_blob(content_hash)
+        if path:
+            return os.path.getsize(path)
+        if zstandard:
+            codec, payload = "zst", zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            codec, payload = "gz", gzip.compress(data, compresslevel=6)
+        path = self._blob_path(content_hash, codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        return len(payload)
+
+    def _read_blob(self, content_hash):
+        path, codec = self._find_blob(content_hash)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            payload = f.read()
+        if codec == "zst":
+            if not zstandard:
+                return None
+            return zstandard.ZstdDecompressor().decompress(payload)
+        return gzip.decompress(payload)
+
+    # --- Public API ---
+
+    def put(self, url: str, html: str) -> str:
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            stored_size = self._write_blob(content_hash, data)
+            old = self._db.execute("SELECT content_hash FROM entries WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (url, content_hash, now, len(data), stored_size, now)
+            )
+            if old and old[0] != content_hash:
+                self._drop_blob_if_orphan(old[0])
+            self._db.commit()
+            self._evict()
+        return content_hash
+
+    def get(self, url: str, max_age: float = None):
+        """Returns the cached HTML for url, or None if missing or older than max_age seconds."""
+        with self._lock:
+            row = self._db.execute("SELECT content_hash, fetched_at FROM entries WHERE url = ?", (url,)).fetchone()
+            if not row or (max_age is not None and time.time() - row[1] > max_age):
+                self.misses += 1
+                return None
+            data = self._read_blob(row[0])
+            if data is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+            self.hits += 1
+        return data.decode("utf-8")
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size, stored = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "bytes": size, "stored_bytes": stored,
+                "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    def _drop_blob_if_orphan(self, content_hash):
+        if self._db.execute("SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return
+        path, _ = self._find_blob(content_hash)
+        if path:
+            os.remove(path)
+
+    def _evict(self):
+        # Stored size is counted per URL, so identical blobs are over-counted; that only makes eviction earlier.
+        total = self._db.execute("SELECT COALESCE(SUM(stored_size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for url, content_hash, stored_size in self._db.execute(
+                "SELECT url, content_hash, stored_size FROM entries ORDER BY last_access ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._drop_blob_if_orphan(content_hash)
+            total -= stored_size
+            evicted += 1
+        self._db.commit()
+        logger.info(f"HTML cache evicted {evicted} entries")
+
+    # --- Playwright integration ---
+
+    def attach(self, page):
+        """Stores every successfully fetched HTML document the page loads."""
+        async def on_response(response):
+            request = response.request
+            if request.resource_type != "document" or request.method != "GET" or response.status != 200:
+                return
+            if response.headers.get(CACHE_HEADER):
+                return  # served by us, keep the original fetch time
+            try:
+                html = await response.text()
+            except Exception:
+                return  # body not available (redirect, navigation aborted)
+            await asyncio.to_thread(self.put, response.url, html)
+        page.on("response", on_response)
+
+    @asynccontextmanager
+    async def serving(self, page, url: str, max_age: float, rate=None):
+        """
+        If a fresh copy of url is cached, answers the navigation to url made
+        inside the block from disk instead of the network, and yields True.
+        Sub-resources still load normally. The route is removed on leaving the
+        block, whether or not the navigation happened. If the route never
+        fired, the document came from the network after all and is counted
+        against the host's rate control (when given) on leaving the block.
+        """
+        html = await asyncio.to_thread(self.get, url, max_age)
+        if html is None:
+            yield False
+            return
+        target = canonical_url(url)
+        fired = False
+
+        def matches(request_url):
+            return canonical_url(request_url) == target
+
+        async def fulfill(route):
+            nonlocal fired
+            fired = True
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8",
+                                headers={CACHE_HEADER: "hit"}, body=html)
+        await page.route(matches, fulfill)
+        try:
+            yield True
+        finally:
+            try:
+                await page.unroute(matches, fulfill)
+            except Exception as e:
+                logger.debug(f"Removing cache route for {url} failed: {e}")  # page already closed
+        if not fired and rate:
+            await rate.acquire(url)
+
+_caches = {}
+
+def get_cache(config: dict):
+    """Returns the shared HtmlCache for this config, or None if caching is disabled."""
+    cache_conf = config.get("cache", {})
+    if not cache_conf.get("enabled", False):
+        return None
+    directory = cache_conf.get("directory", CACHE_DIR)
+    if directory not in _caches:
+        _caches[directory] = HtmlCache(config)
+    return _caches[directory]
@@ -1,14 +1,137 @@
-import logging
 import sys
+import json
+import copy
+import queue
+import atexit
+import logging
+import logging.handlers
+import threading
+import contextvars
+from collections import Counter
+
+CONFIG_FILE = "config.json"
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Structured fields a record carries from the code that logged it
+FIELDS = ("run_id", "portal", "district", "page")
 
-def setup_logging(level=logging.INFO):
+_fields = contextvars.ContextVar("log_fields", default={})
+_listener = None
+
+def bind(**fields):
+    """
+    Adds fields (run_id, portal, district, page) to every record logged from
+    the current asyncio task, and from tasks it creates afterwards.
     """
-    Sets up the logging configuration for the application.
+    _fields.set({**_fields.get(), **fields})
+
+class _ContextFilter(logging.Filter):
+    """Copies the bound fields onto the record while still in the logging task."""
+    def filter(self, record):
+        for key, value in _fields.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+class _SampleFilter(logging.Filter):
+    """
+    Lets through one in `every` records logged with extra={"sampled": True},
+    counted per call site, so per-card and per-offer messages stay readable
+    on long runs. The passed record notes how many it stands for.
+    """
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self.seen = Counter()
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.every <= 1 or not getattr(record, "sampled", False):
+            return True
+        with self.lock:
+            self.seen[(record.pathname, record.lineno)] += 1
+            count = self.seen[(record.pathname, record.lineno)]
+        if count % self.every != 1:
+            return False
+        record.sample_rate = self.every
+        return True
+
+class _QueueHandler(logging.handlers.QueueHandler):
     """
-    logging.basicConfig(
-        level=level,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    Hands records to the listener thread unformatted: message interpolation,
+    tracebacks and output all happen off the event loop. The queue never
+    leaves the process, so records need not be made picklable.
+    """
+    def prepare(self, record):
+        return copy.copy(record)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record):
+        line = super().formatMessage(record)
+        fields = " ".join(f"{key}={getattr(record, key)}" for key in FIELDS if getattr(record, key, None) is not None)
+        if getattr(record, "sample_rate", None):
+            fields += f" (1 in {record.sample_rate})"
+        return f"{line} [{fields.strip()}]" if fields else line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the structured fields as keys."""
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in FIELDS + ("sample_rate",):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+def _load_config() -> dict:
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            return json.load(f).get("logging", {})
+    except (OSError, ValueError):
+        return {}
+
+def setup_logging(level=logging.INFO, config: dict = None):
+    """
+    Sets up the logging configuration for the application: records go through
+    a queue to a listener thread that writes them to stdout, as text or as
+    JSON lines (logging.json). logging.levels sets per-logger levels, e.g.
+    {"scraper.otodom": "DEBUG"}, and logging.sample_every thins out records
+    logged with extra={"sampled": True}. Only the first call takes effect.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    conf = config.get("logging", {}) if config is not None else _load_config()
+    root = logging.getLogger()
+    root.setLevel(str(conf.get("level", logging.getLevelName(level))).upper())
+    for name, name_level in conf.get("levels", {}).items():
+        logging.getLogger(name).setLevel(name_level.upper())
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if conf.get("json", False) else TextFormatter())
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(_ContextFilter())
+    handler.addFilter(_SampleFilter(int(conf.get("sample_every", 1))))
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Writes out whatever is still queued; called at exit."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
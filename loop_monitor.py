@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import logging
+from collections import deque, Counter
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LAG_SECONDS = metrics.REGISTRY.histogram(
+    "scrappy_event_loop_lag_seconds", "How late the event loop woke up a timer.",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, float("inf")))
+LAG_QUANTILES = metrics.REGISTRY.gauge(
+    "scrappy_event_loop_lag_quantile_seconds", "Event loop lag percentiles over the recent window.", ["quantile"])
+BLOCKS = metrics.REGISTRY.counter(
+    "scrappy_event_loop_blocks_total", "Times the event loop was blocked beyond the threshold, by blocking function.", ["site"])
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def _quantile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+def _is_own_code(filename: str) -> bool:
+    return filename.startswith(os.getcwd()) and "site-packages" not in filename
+
+def _site(code) -> str:
+    """module.function of a frame: a bounded metric label, unlike file:line."""
+    path = os.path.relpath(code.co_filename) if _is_own_code(code.co_filename) else os.path.basename(code.co_filename)
+    return f"{os.path.splitext(path)[0].replace(os.sep, '.')}.{code.co_name}"
+
+class LoopMonitor:
+    """
+    Measures event loop lag with a timer that should fire every interval_ms,
+    and catches whatever blocks the loop: a watchdog thread that sees no tick
+    for block_threshold_ms captures the loop thread's stack, logs it once per
+    stall and counts the innermost function of our own code it was blocked in.
+    """
+    def __init__(self, config: dict):
+        conf = config.get("loop_monitor", {})
+        self.enabled = conf.get("enabled", True)
+        self.interval = float(conf.get("interval_ms", 100)) / 1000
+        self.threshold = float(conf.get("block_threshold_ms", 250)) / 1000
+        self.lags = deque(maxlen=int(conf.get("window", 600)))
+        self.sites = Counter()
+        self.stalls = deque(maxlen=20)  # most recent: {"site", "where", "stack", "blocked_ms", "at"}
+        self.last_tick = time.monotonic()
+        self.loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if not self.enabled or self._task:
+            return self
+        self.loop_thread = threading.get_ident()
+        self.last_tick = time.monotonic()
+        self._task = asyncio.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Event loop monitor started (block threshold {self.threshold * 1000:.0f} ms)")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+
+    async def _tick(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self.last_tick = now
+            self.lags.append(lag)
+            LAG_SECONDS.observe(lag)
+
+    def _watch(self):
+        stalled_since = None
+        while not self._stop.wait(self.interval):
+            since = self.last_tick
+            blocked = time.monotonic() - since
+            if blocked < self.threshold + self.interval:
+                if stalled_since is not None:
+                    self.stalls[-1]["blocked_ms"] = round((self.last_tick - stalled_since) * 1000)
+                    logger.warning(f"Event loop was blocked for {self.stalls[-1]['blocked_ms']} ms at {self.stalls[-1]['where']}")
+                    stalled_since = None
+                continue
+            if stalled_since == since:
+                continue  # same stall, already captured
+            stalled_since = since
+            self._capture(blocked)
+
+    def _capture(self, blocked: float):
+        frame = sys._current_frames().get(self.loop_thread)
+        stack = []
+        site = where = None
+        innermost = frame
+        while frame is not None:
+            code = frame.f_code
+            entry = f"{code.co_filename}:{frame.f_lineno} in {code.co_name}"
+            stack.append(entry)
+            if site is None and _is_own_code(code.co_filename):
+                site, where = _site(code), entry
+            frame = frame.f_back
+        if site is None:
+            # Blocked entirely outside our code
+            site = _site(innermost.f_code) if innermost else "unknown"
+            where = stack[0] if stack else site
+        stack.reverse()
+        self.sites[site] += 1
+        BLOCKS.inc(site)
+        self.stalls.append({"site": site, "where": where, "stack": stack[-15:], "blocked_ms": round(blocked * 1000),
+                            "at": time.strftime("%Y-%m-%d %H:%M:%S")})
+        logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms+ at {where}\n  " + "\n  ".join(stack[-15:]))
+
+    def percentiles(self) -> dict:
+        ordered = sorted(self.lags)
+        return {f"p{int(q * 100)}_ms": round(_quantile(ordered, q) * 1000, 1) for q in QUANTILES}
+
+    def update_metrics(self):
+        ordered = sorted(self.lags)
+        for q in QUANTILES:
+            LAG_QUANTILES.set(_quantile(ordered, q), str(q))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "lag": self.percentiles(),
+            "max_lag_ms": round(max(self.lags, default=0.0) * 1000, 1),
+            "block_threshold_ms": self.threshold * 1000,
+            "top_sites": self.sites.most_common(10),
+            "recent_stalls": list(self.stalls),
+        }
@@ -0,0 +1,158 @@
+import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import browser_service
+from concurrency import rss_mb
+
+try:
+    import psutil
+except ImportError:  # optional, /proc is read directly on Linux
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+def pid_rss_mb(pid: int):
+    if psutil:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2**20
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, IndexError, ValueError):
+        return None
+
+async def browser_memory(browser) -> dict:
+    """
+    RSS in MB of the browser's processes by type (browser, renderer, gpu, ...),
+    from the pids Chromium reports over CDP. Empty if they cannot be read.
+    """
+    by_type = {}
+    try:
+        session = await browser.new_browser_cdp_session()
+        try:
+            info = await session.send("SystemInfo.getProcessInfo")
+        finally:
+            await session.detach()
+    except Exception as e:
+        logger.debug(f"Process info unavailable: {e}")
+        return by_type
+    for proc in info.get("processInfo", []):
+        rss = pid_rss_mb(proc["id"])
+        if rss is not None:
+            by_type[proc["type"]] = by_type.get(proc["type"], 0) + rss
+    return by_type
+
+class MemoryGovernor:
+    """
+    Owns the run's browser and recycles it before it grows too large: after
+    memory.recycle_after_pages listing/detail pages, or when the browser's RSS
+    (sampled every memory.sample_interval_seconds) exceeds memory.max_browser_rss_mb.
+
+    Work runs inside lease(). A pending recycle lets running leases finish,
+    holds new ones back, restarts the browser and bumps `generation`, so
+    holders of long-lived pages (enrichment) know to reopen them.
+    A browser service instance is shared and is never restarted from here.
+    """
+    def __init__(self, p, config: dict, **launch_kwargs):
+        memory_conf = config.get("memory", {})
+        self.p = p
+        self.config = config
+        self.launch_kwargs = launch_kwargs
+        self.max_rss_mb = memory_conf.get("max_browser_rss_mb", 1500)
+        self.recycle_after_pages = int(memory_conf.get("recycle_after_pages", 300))
+        self.sample_interval = float(memory_conf.get("sample_interval_seconds", 10))
+        self.browser = None
+        self.generation = 0
+        self.pages = 0
+        self.recycles = 0
+        self.last_sample = {}
+        self.in_flight = 0
+        self._recycling = False
+        self._idle = asyncio.Condition()
+        self._sampler = None
+        self._recycle_task = None
+
+    async def start(self):
+        self.browser = await browser_service.get_browser(self.p, self.config, **dict(self.launch_kwargs))
+        if self.sample_interval > 0:
+            self._sampler = asyncio.create_task(self._sample_loop())
+        return self.browser
+
+    @property
+    def owns_browser(self) -> bool:
+        return not browser_service.is_service_browser(self.browser)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Yields the current browser; waits while a recycle is pending."""
+        async with self._idle:
+            await self._idle.wait_for(lambda: not self._recycling)
+            self.in_flight += 1
+        try:
+            yield self.browser
+        finally:
+            async with self._idle:
+                self.in_flight -= 1
+                self._idle.notify_all()
+
+    def page_done(self):
+        self.pages += 1
+        if self.recycle_after_pages and self.pages >= self.recycle_after_pages:
+            self.request_recycle(f"{self.pages} pages")
+
+    async def sample(self) -> dict:
+        by_type = await browser_memory(self.browser)
+        if not by_type and self.owns_browser:
+            # No pids over CDP; the local browser is part of our process tree
+            total = rss_mb()
+            by_type = {"process_tree": total} if total else {}
+        self.last_sample = {k: round(v, 1) for k, v in by_type.items()}
+        return self.last_sample
+
+    async def _sample_loop(self):
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            try:
+                total = sum((await self.sample()).values())
+            except Exception as e:
+                logger.debug(f"Memory sample failed: {e}")
+                continue
+            if self.max_rss_mb and total > self.max_rss_mb:
+                self.request_recycle(f"browser RSS {total:.0f} MB")
+
+    def request_recycle(self, reason: str):
+        if not self.owns_browser or (self._recycle_task and not self._recycle_task.done()):
+            return
+        logger.info(f"Recycling browser after {reason}")
+        self._recycle_task = asyncio.create_task(self._recycle())
+
+    async def _recycle(self):
+        async with self._idle:
+            self._recycling = True
+            await self._idle.wait_for(lambda: self.in_flight == 0)
+            try:
+                await asyncio.wait_for(self.browser.close(), 30)
+            except Exception as e:
+                logger.warning(f"Closing browser for recycle failed: {e}")
+            try:
+                self.browser = await browser_service.get_browser(self.p, self.config, **dict(self.launch_kwargs))
+            finally:
+                self.generation += 1
+                self.recycles += 1
+                self.pages = 0
+                self._recycling = False
+                self._idle.notify_all()
+
+    async def close(self):
+        if self._sampler:
+            self._sampler.cancel()
+        if self._recycle_task:
+            await asyncio.gather(self._recycle_task, return_exceptions=True)
+        await self.browser.close()
+
+    def stats(self) -> dict:
+        return {"recycles": self.recycles, "pages_since_recycle": self.pages,
+                "rss_mb": self.last_sample, "generation": self.generation}
@@ -0,0 +1,140 @@
+import math
+import threading
+
+# Upper bounds in seconds; page loads and storage writes span milliseconds to minutes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> value
+        self._lock = threading.Lock()  # storage writes report from worker threads
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {_number(value)}")
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += 1
+            entry[2] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items())
+        for values, (counts, count, total) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, [le])} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Scrapers (scrapers/base.py)
+PAGES_FETCHED = REGISTRY.counter("scrappy_pages_fetched_total", "Pages navigated to, by where the document came from.", ["portal", "source"])
+GOTO_SECONDS = REGISTRY.histogram("scrappy_goto_seconds", "page.goto latency, rate-limit wait excluded.", ["portal"])
+SELECTOR_WAIT_SECONDS = REGISTRY.histogram("scrappy_selector_wait_seconds", "Time until a listing page's cards settled.", ["portal"])
+CARDS_PARSED = REGISTRY.counter("scrappy_cards_parsed_total", "Listing cards handed to parse_card().", ["portal"])
+PARSE_FAILURES = REGISTRY.counter("scrappy_parse_failures_total", "Listing cards whose parse_card() raised.", ["portal"])
+EMPTY_PAGES = REGISTRY.counter("scrappy_empty_pages_total", "Listing pages that showed no cards.", ["portal"])
+
+# Runs (scraper.py)
+TASKS = REGISTRY.counter("scrappy_tasks_total", "Finished scrape tasks by outcome.", ["portal", "status"])
+TASK_SECONDS = REGISTRY.histogram("scrappy_task_seconds", "Scrape task duration.", ["portal"],
+                                  buckets=(5, 15, 30, 60, 120, 300, 600, 900, 1800, math.inf))
+OFFERS_SAVED = REGISTRY.counter("scrappy_offers_saved_total", "Offers written to storage after filtering.", ["portal"])
+OFFERS_NEW = REGISTRY.counter("scrappy_offers_new_total", "Saved offers that were not stored before.", ["portal"])
+
+PIPELINE_QUEUE_DEPTH = REGISTRY.gauge("scrappy_pipeline_queue_depth", "Entries waiting in an ingestion stage's queue.", ["stage"])
+PIPELINE_OFFERS = REGISTRY.gauge("scrappy_pipeline_offers_in", "Offers that entered an ingestion stage in the current run.", ["stage"])
+
+# Storage (storage.py)
+STORAGE_WRITE_SECONDS = REGISTRY.histogram("scrappy_storage_write_seconds", "Duration of one save_offers() CSV rewrite.")
+STORAGE_ROWS_WRITTEN = REGISTRY.counter("scrappy_storage_rows_written_total", "Offers passed to save_offers().")
+
+def update_pipeline(stats: dict):
+    """Copies pipeline.current_stats() into the pipeline gauges, called before rendering."""
+    for stage, stage_stats in stats.items():
+        PIPELINE_QUEUE_DEPTH.set(stage_stats["queue_depth"], stage)
+        PIPELINE_OFFERS.set(stage_stats["offers_in"], stage)
@@ -0,0 +1,125 @@
+import logging
+from collections import Counter
+import metrics
+from html_cache import CACHE_HEADER
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = metrics.REGISTRY.counter("scrappy_network_requests_total", "Finished browser requests per portal.", ["portal"])
+BYTES = metrics.REGISTRY.counter("scrappy_network_bytes_total", "Bytes transferred over the network, by resource type.", ["portal", "resource_type"])
+CACHE_HITS = metrics.REGISTRY.counter("scrappy_network_cache_hits_total", "Responses served from the browser or HTML cache.", ["portal"])
+BYTES_PER_NEW_OFFER = metrics.REGISTRY.gauge("scrappy_bytes_per_new_offer", "Bytes transferred per new offer found in the last run.", ["portal"])
+
+class _Usage:
+    def __init__(self):
+        self.requests = 0
+        self.failed = 0
+        self.cache_hits = 0
+        self.bytes = Counter()  # resource type -> bytes
+
+    def add(self, other):
+        self.requests += other.requests
+        self.failed += other.failed
+        self.cache_hits += other.cache_hits
+        self.bytes.update(other.bytes)
+
+    def to_dict(self) -> dict:
+        return {"requests": self.requests, "failed": self.failed, "cache_hits": self.cache_hits,
+                "bytes": sum(self.bytes.values()), "bytes_by_type": dict(self.bytes.most_common())}
+
+class NetworkMeter:
+    """
+    Counts requests, transferred bytes by resource type and cache hits of the
+    pages attached to it, per listing page (page_done()) and in total.
+    Sizes are the encoded (on the wire) lengths Chromium reports over CDP;
+    without CDP the Content-Length of responses is used.
+    """
+    def __init__(self, portal: str):
+        self.portal = portal
+        self.total = _Usage()
+        self.current = _Usage()
+        self.pages = []  # usage of each finished listing page
+        self._types = {}  # CDP requestId -> (resource type, served from cache)
+
+    async def attach(self, page):
+        try:
+            session = await page.context.new_cdp_session(page)
+            session.on("Network.responseReceived", self._on_response_received)
+            session.on("Network.loadingFinished", self._on_loading_finished)
+            session.on("Network.loadingFailed", self._on_loading_failed)
+            await session.send("Network.enable")
+        except Exception as e:
+            logger.debug(f"CDP network accounting unavailable, using Content-Length: {e}")
+            page.on("response", self._on_response)
+
+    def _record(self, resource_type: str, size: int, cached: bool):
+        for usage in (self.current, self.total):
+            usage.requests += 1
+            usage.bytes[resource_type] += size
+            usage.cache_hits += cached
+        REQUESTS.inc(self.portal)
+        if size:
+            BYTES.inc(self.portal, resource_type, amount=size)
+        if cached:
+            CACHE_HITS.inc(self.portal)
+
+    def _on_response_received(self, event):
+        response = event.get("response", {})
+        from_html_cache = any(name.lower() == CACHE_HEADER for name in response.get("headers", {}))
+        cached = bool(from_html_cache or response.get("fromDiskCache") or response.get("fromPrefetchCache")
+                      or response.get("fromServiceWorker"))
+        self._types[event["requestId"]] = (event.get("type", "Other").lower(), cached)
+
+    def _on_loading_finished(self, event):
+        resource_type, cached = self._types.pop(event["requestId"], ("other", False))
+        # A cached response crossed no network, whatever length Chromium reports for it
+        self._record(resource_type, 0 if cached else int(event.get("encodedDataLength", 0)), cached)
+
+    def _on_loading_failed(self, event):
+        self._types.pop(event["requestId"], None)
+        self.current.failed += 1
+        self.total.failed += 1
+
+    def _on_response(self, response):
+        cached = bool(response.headers.get(CACHE_HEADER) or response.from_service_worker)
+        length = response.headers.get("content-length")
+        size = int(length) if length and length.isdigit() and not cached else 0
+        self._record(response.request.resource_type, size, cached)
+
+    def page_done(self) -> dict:
+        """Closes the current listing page's usage and returns it."""
+        usage = self.current.to_dict()
+        self.pages.append(usage)
+        self.current = _Usage()
+        return usage
+
+class NetworkReport:
+    """Network usage of a run per portal, and what it cost per new offer."""
+    def __init__(self):
+        self.usage = {}
+        self.new_offers = Counter()
+        self.tasks = Counter()
+
+    def add(self, meter: NetworkMeter, new_offers: int = 0):
+        self.usage.setdefault(meter.portal, _Usage()).add(meter.total)
+        self.new_offers[meter.portal] += new_offers
+        self.tasks[meter.portal] += 1
+
+    def to_dict(self) -> dict:
+        report = {}
+        for portal, usage in sorted(self.usage.items(), key=lambda item: -sum(item[1].bytes.values())):
+            total_bytes = sum(usage.bytes.values())
+            new_offers = self.new_offers[portal]
+            report[portal] = {
+                **usage.to_dict(),
+                "tasks": self.tasks[portal],
+                "new_offers": new_offers,
+                "bytes_per_new_offer": round(total_bytes / new_offers) if new_offers else None,
+            }
+        return report
+
+    def publish(self):
+        """Sets the bytes-per-new-offer gauges; portals without new offers report their total bytes."""
+        for portal, usage in self.usage.items():
+            total_bytes = sum(usage.bytes.values())
+            BYTES_PER_NEW_OFFER.set(total_bytes / max(self.new_offers[portal], 1), portal)
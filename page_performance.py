@@ -0,0 +1,112 @@
+import math
+import logging
+import weakref
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CPU_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+SCRIPT_SECONDS = metrics.REGISTRY.histogram(
+    "scrappy_page_script_seconds", "Renderer time spent running JavaScript per listing page.", ["portal"], buckets=CPU_BUCKETS)
+LAYOUT_SECONDS = metrics.REGISTRY.histogram(
+    "scrappy_page_layout_seconds", "Renderer time spent on layout and style recalculation per listing page.", ["portal"], buckets=CPU_BUCKETS)
+JS_HEAP_BYTES = metrics.REGISTRY.gauge("scrappy_page_js_heap_bytes", "Used JS heap of the last listing page.", ["portal"])
+DOM_NODES = metrics.REGISTRY.gauge("scrappy_page_dom_nodes", "DOM nodes of the last listing page.", ["portal"])
+
+# Cumulative since Performance.enable: reported per page as the difference between samples
+DURATIONS = {"ScriptDuration": "script_seconds", "LayoutDuration": "layout_seconds",
+             "RecalcStyleDuration": "style_seconds", "TaskDuration": "task_seconds"}
+# Current values
+LEVELS = {"JSHeapUsedSize": "js_heap_bytes", "Nodes": "dom_nodes"}
+
+class PagePerformance:
+    """
+    Chromium's own accounting (CDP Performance.getMetrics) of the listing pages
+    of one task: script, layout and style time per page, JS heap and DOM size.
+    Pages are sampled by page_done(page) after each listing page; a disabled
+    instance, or a page without CDP, samples nothing.
+    """
+    def __init__(self, portal: str, config: dict):
+        self.portal = portal
+        self.enabled = config.get("page_performance", {}).get("enabled", False)
+        self.pages = 0
+        self.totals = dict.fromkeys(DURATIONS.values(), 0.0)
+        self.peaks = dict.fromkeys(LEVELS.values(), 0)
+        self._sessions = weakref.WeakKeyDictionary()  # page -> [CDP session, last sample]
+
+    async def attach(self, page):
+        if not self.enabled:
+            return
+        try:
+            session = await page.context.new_cdp_session(page)
+            await session.send("Performance.enable", {"timeDomain": "threadTicks"})
+            self._sessions[page] = [session, await self._sample(session)]
+        except Exception as e:
+            logger.debug(f"CDP performance metrics unavailable: {e}")
+
+    @staticmethod
+    async def _sample(session) -> dict:
+        result = await session.send("Performance.getMetrics")
+        return {m["name"]: m["value"] for m in result.get("metrics", [])}
+
+    async def page_done(self, page) -> dict:
+        """Metrics of the listing page loaded since the previous call, {} when not sampled."""
+        entry = self._sessions.get(page)
+        if entry is None:
+            return {}
+        session, last = entry
+        try:
+            sample = await self._sample(session)
+        except Exception as e:
+            logger.debug(f"Performance.getMetrics failed: {e}")
+            self._sessions.pop(page, None)
+            return {}
+        entry[1] = sample
+        usage = {key: round(sample.get(name, 0.0) - last.get(name, 0.0), 4) for name, key in DURATIONS.items()}
+        usage.update({key: int(sample.get(name, 0)) for name, key in LEVELS.items()})
+        self.pages += 1
+        for key in DURATIONS.values():
+            self.totals[key] += usage[key]
+        for key in LEVELS.values():
+            self.peaks[key] = max(self.peaks[key], usage[key])
+        SCRIPT_SECONDS.observe(usage["script_seconds"], self.portal)
+        LAYOUT_SECONDS.observe(usage["layout_seconds"] + usage["style_seconds"], self.portal)
+        JS_HEAP_BYTES.set(usage["js_heap_bytes"], self.portal)
+        DOM_NODES.set(usage["dom_nodes"], self.portal)
+        return usage
+
+    def to_dict(self) -> dict:
+        """Totals for the task span: summed durations, peak heap and DOM size."""
+        if not self.pages:
+            return {}
+        return {"sampled_pages": self.pages, **{k: round(v, 3) for k, v in self.totals.items()},
+                "max_js_heap_mb": round(self.peaks["js_heap_bytes"] / 2**20, 1), "max_dom_nodes": self.peaks["dom_nodes"]}
+
+class PerformanceReport:
+    """Per-portal averages over a run, to tell which portals are worth moving off the browser."""
+    def __init__(self):
+        self.portals = {}
+
+    def add(self, perf: PagePerformance):
+        if not perf.pages:
+            return
+        entry = self.portals.setdefault(perf.portal, {"pages": 0, **dict.fromkeys(DURATIONS.values(), 0.0),
+                                                       **dict.fromkeys(LEVELS.values(), 0)})
+        entry["pages"] += perf.pages
+        for key in DURATIONS.values():
+            entry[key] += perf.totals[key]
+        for key in LEVELS.values():
+            entry[key] = max(entry[key], perf.peaks[key])
+
+    def to_dict(self) -> dict:
+        report = {}
+        for portal, entry in sorted(self.portals.items(), key=lambda item: -item[1]["task_seconds"] / item[1]["pages"]):
+            pages = entry["pages"]
+            report[portal] = {
+                "pages": pages,
+                **{f"{key}_per_page": round(entry[key] / pages, 3) for key in DURATIONS.values()},
+                "max_js_heap_mb": round(entry["js_heap_bytes"] / 2**20, 1),
+                "max_dom_nodes": entry["dom_nodes"],
+            }
+        return report
@@ -0,0 +1,247 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # end of input, one per worker of a stage
+
+_current = None  # pipeline of the run in progress (or the last one), see current_stats()
+
+def current_stats() -> dict:
+    """Stage metrics of the running (or last) ingestion pipeline, empty before the first run."""
+    return _current.stats() if _current else {}
+
+class Job:
+    """
+    The offers one producer (a scrape task) sent into the pipeline. Stage
+    functions keep their per-task counters in `stats`; Pipeline.drain(job)
+    returns once everything the producer submitted was persisted or dropped.
+    """
+    def __init__(self, **stats):
+        self.stats = stats
+        self.in_flight = 0
+        self.errors = 0
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def _add(self):
+        self.in_flight += 1
+        self._drained.clear()
+
+    def _done(self):
+        self.in_flight -= 1
+        if not self.in_flight:
+            self._drained.set()
+
+class Stage:
+    """
+    One step of the pipeline: `workers` coroutines take (job, offers) entries
+    off a bounded queue and pass fn's result on to the next stage.
+    fn(job, offers) returns the offers to keep. With executor "thread" or
+    "process" fn(offers) runs off the event loop instead (it then gets no job).
+    """
+    def __init__(self, name: str, fn, queue_size: int, workers: int = 1, executor: str = "inline"):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.next = None
+        self.pipeline = None
+        self.tasks = []
+        self.batches = 0
+        self.offers_in = 0
+        self.offers_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at = None
+
+    def start(self, pipeline):
+        self.pipeline = pipeline
+        self.started_at = time.monotonic()
+        self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def _call(self, job, offers):
+        if self.executor == "thread":
+            return await asyncio.to_thread(self.fn, offers)
+        if self.executor == "process":
+            return await asyncio.get_running_loop().run_in_executor(self.pipeline.process_pool(), self.fn, offers)
+        result = self.fn(job, offers)
+        return await result if asyncio.iscoroutine(result) else result
+
+    async def _worker(self):
+        while True:
+            entry = await self.queue.get()
+            if entry is _STOP:
+                return
+            job, offers = entry
+            self.batches += 1
+            self.offers_in += len(offers)
+            started = time.monotonic()
+            try:
+                kept = await self._call(job, offers)
+            except Exception as e:
+                logger.error(f"[pipeline {self.name}] {e!r}")
+                self.errors += 1
+                job.errors += 1
+                kept = None
+            finally:
+                self.busy_seconds += time.monotonic() - started
+            if not kept:
+                job._done()
+                continue
+            self.offers_out += len(kept)
+            if self.next:
+                await self.next.queue.put((job, kept))
+            else:
+                job._done()
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self.started_at, 1e-9) if self.started_at else None
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "workers": self.workers,
+            "batches": self.batches,
+            "offers_in": self.offers_in,
+            "offers_out": self.offers_out,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "offers_per_second": round(self.offers_in / elapsed, 2) if elapsed else 0.0,
+            "utilization": round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed else 0.0,
+        }
+
+class BatchStage(Stage):
+    """
+    Terminal stage that collects offers until `batch_size` of them are waiting
+    or the oldest has waited `batch_seconds`, then hands all of them to
+    fn(entries) at once, [(job, offers)], in a thread. after(entries, result)
+    then runs on the event loop, e.g. to update the jobs' stats.
+    """
+    def __init__(self, name: str, fn, queue_size: int, batch_size: int, batch_seconds: float, after=None):
+        super().__init__(name, fn, queue_size)
+        self.after = after
+        self.batch_size = max(1, batch_size)
+        self.batch_seconds = batch_seconds
+        self.draining = 0  # producers waiting in Pipeline.drain(); batches are flushed right away for them
+        self._wake = asyncio.Event()
+
+    async def _next_entry(self, timeout):
+        """The next queued entry, or None after timeout or a wake-up."""
+        self._wake.clear()
+        getter = asyncio.ensure_future(self.queue.get())
+        waker = asyncio.ensure_future(self._wake.wait())
+        await asyncio.wait({getter, waker}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        waker.cancel()
+        if not getter.done():
+            getter.cancel()
+            try:
+                await getter
+            except asyncio.CancelledError:
+                pass
+        return None if getter.cancelled() else getter.result()
+
+    async def _worker(self):
+        pending, count, oldest = [], 0, None
+        while True:
+            if pending and (self.draining or count >= self.batch_size
+                            or time.monotonic() - oldest >= self.batch_seconds):
+                await self._flush(pending)
+                pending, count = [], 0
+                continue
+            timeout = max(0.0, oldest + self.batch_seconds - time.monotonic()) if pending else None
+            entry = await self._next_entry(timeout)
+            if entry is _STOP:
+                if pending:
+                    await self._flush(pending)
+                return
+            if entry is not None:
+                if not pending:
+                    oldest = time.monotonic()
+                pending.append(entry)
+                count += len(entry[1])
+
+    async def _flush(self, entries):
+        self.batches += 1
+        self.offers_in += sum(len(offers) for _, offers in entries)
+        started = time.monotonic()
+        try:
+            result = await asyncio.to_thread(self.fn, entries)
+            self.offers_out += sum(len(offers) for _, offers in entries)
+            if self.after:
+                self.after(entries, result)
+        except Exception as e:
+            logger.error(f"[pipeline {self.name}] batch of {len(entries)} failed: {e!r}")
+            self.errors += 1
+            for job, _ in entries:
+                job.errors += 1
+        finally:
+            self.busy_seconds += time.monotonic() - started
+            for job, _ in entries:
+                job._done()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "batch_size": self.batch_size, "batch_seconds": self.batch_seconds}
+
+class Pipeline:
+    """
+    Stages connected by bounded queues. submit() blocks while the first stage's
+    queue is full, so producers slow down to the pace of the slowest stage
+    instead of piling offers up in memory.
+    """
+    def __init__(self, stages: list):
+        global _current
+        self.stages = stages
+        for stage, following in zip(stages, stages[1:]):
+            stage.next = following
+        self._process_pool = None
+        self._closed = False
+        _current = self
+
+    def start(self):
+        for stage in self.stages:
+            stage.start(self)
+        return self
+
+    def process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=max(
+                s.workers for s in self.stages if s.executor == "process"))
+        return self._process_pool
+
+    async def submit(self, job: Job, offers: list):
+        job._add()
+        try:
+            await self.stages[0].queue.put((job, offers))
+        except BaseException:
+            job._done()
+            raise
+
+    async def drain(self, job: Job):
+        """Waits until all of the job's offers went through, flushing a partial batch for it."""
+        batching = [stage for stage in self.stages if isinstance(stage, BatchStage)]
+        for stage in batching:
+            stage.draining += 1
+            stage._wake.set()
+        try:
+            await job._drained.wait()
+        finally:
+            for stage in batching:
+                stage.draining -= 1
+
+    async def close(self):
+        """Lets every stage finish what it holds, in order, then stops the workers. Only the first call does anything."""
+        if self._closed:
+            return
+        self._closed = True
+        for stage in self.stages:
+            for _ in stage.tasks:
+                await stage.queue.put(_STOP)
+            await asyncio.gather(*stage.tasks)
+        if self._process_pool:
+            self._process_pool.shutdown()
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}
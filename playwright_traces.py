@@ -0,0 +1,174 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+import browser_service
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = "playwright_traces"
+TMP_DIR = "state/playwright_traces_tmp"
+
+# Browser contexts with a trace in progress; Playwright allows one per context
+_tracing_contexts = set()
+
+def _settings(config: dict) -> dict:
+    conf = config.get("playwright_trace", {})
+    return {
+        "enabled": conf.get("enabled", False),
+        "directory": conf.get("directory", TRACE_DIR),
+        "keep_pages": max(1, int(conf.get("keep_pages", 3))),
+        "screenshots": conf.get("screenshots", True),
+        "snapshots": conf.get("snapshots", True),
+        "slow_factor": float(conf.get("slow_factor", 2.0)),
+        "slow_seconds": float(conf.get("slow_seconds", 300)),
+        "max_traces": int(conf.get("max_traces", 50)),
+        "max_age_days": float(conf.get("max_age_days", 7)),
+    }
+
+class TraceRecorder:
+    """
+    Playwright tracing (screenshots, DOM snapshots, network) of one scrape
+    attempt, kept as a ring of the last playwright_trace.keep_pages listing
+    pages. finish(reason) keeps the ring in playwright_traces/<run_id>/ when
+    there is a reason (error, no cards, slow) and throws it away otherwise.
+    A disabled recorder does nothing, and neither does one whose context is
+    already being traced by another attempt (the shared browser_service
+    context is one context for all tasks).
+    """
+    def __init__(self, context, config: dict, run_id: str, label: str):
+        self.context = context
+        self.settings = _settings(config)
+        self.enabled = self.settings["enabled"]
+        self.run_id = run_id
+        self.label = label
+        self.tmp = os.path.join(TMP_DIR, uuid.uuid4().hex)
+        self.chunks = []
+        self.pages = 0
+        self.started = time.monotonic()
+        self._active = False
+        self._traced = None  # the real context while this recorder holds its trace
+
+    async def start(self):
+        if not self.enabled:
+            return
+        real = browser_service.unwrap(self.context)
+        if real in _tracing_contexts:
+            logger.info(f"[{self.label}] Not recording a Playwright trace, another attempt is tracing the shared context")
+            return
+        _tracing_contexts.add(real)
+        self._traced = real
+        try:
+            os.makedirs(self.tmp, exist_ok=True)
+            await self.context.tracing.start(screenshots=self.settings["screenshots"],
+                                             snapshots=self.settings["snapshots"], sources=False)
+            await self.context.tracing.start_chunk(title=f"{self.label} page 1")
+            self._active = True
+        except Exception as e:
+            logger.info(f"[{self.label}] Playwright tracing unavailable: {e}")
+            self._release()
+
+    def _release(self):
+        if self._traced is not None:
+            _tracing_contexts.discard(self._traced)
+            self._traced = None
+
+    async def page_done(self):
+        """Closes the current page's chunk; the oldest one leaves the ring."""
+        if not self._active:
+            return
+        self.pages += 1
+        path = os.path.join(self.tmp, f"page_{self.pages:03d}.zip")
+        try:
+            await self.context.tracing.stop_chunk(path=path)
+            self.chunks.append(path)
+            while len(self.chunks) > self.settings["keep_pages"]:
+                os.remove(self.chunks.pop(0))
+            await self.context.tracing.start_chunk(title=f"{self.label} page {self.pages + 1}")
+        except Exception as e:
+            logger.debug(f"Playwright trace chunk failed: {e}")
+            self._active = False
+            try:
+                await self.context.tracing.stop()
+            except Exception:
+                pass
+            self._release()
+
+    def is_slow(self, expected_seconds: float = None) -> bool:
+        elapsed = time.monotonic() - self.started
+        if expected_seconds:
+            return elapsed > expected_seconds * self.settings["slow_factor"]
+        return elapsed > self.settings["slow_seconds"]
+
+    async def finish(self, reason: str = None):
+        """Stops tracing; with a reason the kept pages are saved. Returns their directory, or None."""
+        if not self._active:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            return None
+        self._active = False
+        try:
+            if reason:
+                path = os.path.join(self.tmp, f"page_{self.pages + 1:03d}_last.zip")
+                await self.context.tracing.stop_chunk(path=path)
+                self.chunks.append(path)
+            else:
+                await self.context.tracing.stop_chunk()
+            await self.context.tracing.stop()
+        except Exception as e:
+            logger.debug(f"Stopping Playwright trace failed: {e}")
+        finally:
+            self._release()
+        try:
+            if not reason:
+                return None
+            slug = re.sub(r"[^a-z0-9]+", "_", self.label.lower()).strip("_")
+            target = os.path.join(self.settings["directory"], self.run_id, f"{slug}_{uuid.uuid4().hex[:6]}")
+            os.makedirs(target, exist_ok=True)
+            for chunk in self.chunks:
+                if os.path.exists(chunk):
+                    shutil.move(chunk, os.path.join(target, os.path.basename(chunk)))
+            with open(os.path.join(target, "reason.json"), "w") as f:
+                json.dump({"label": self.label, "reason": reason, "pages": self.pages,
+                           "seconds": round(time.monotonic() - self.started, 1), "saved_at": time.time()}, f, indent=2)
+            logger.warning(f"[{self.label}] Playwright trace kept ({reason}): {target} "
+                           f"(open with: playwright show-trace <file>)")
+            return target
+        finally:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+def prune(config: dict):
+    """Deletes kept traces older than max_age_days, then the oldest beyond max_traces."""
+    settings = _settings(config)
+    directory = settings["directory"]
+    shutil.rmtree(TMP_DIR, ignore_errors=True)  # leftovers of runs that crashed mid-attempt
+    if not os.path.isdir(directory):
+        return
+    traces = []
+    for run_dir in os.listdir(directory):
+        run_path = os.path.join(directory, run_dir)
+        if not os.path.isdir(run_path):
+            continue
+        for trace in os.listdir(run_path):
+            path = os.path.join(run_path, trace)
+            traces.append((os.path.getmtime(path), path))
+    traces.sort(reverse=True)
+    cutoff = time.time() - settings["max_age_days"] * 86400
+    for index, (mtime, path) in enumerate(traces):
+        if mtime < cutoff or index >= settings["max_traces"]:
+            shutil.rmtree(path, ignore_errors=True)
+    for run_dir in os.listdir(directory):
+        run_path = os.path.join(directory, run_dir)
+        if os.path.isdir(run_path) and not os.listdir(run_path):
+            os.rmdir(run_path)
+
+async def finish_quietly(recorder: TraceRecorder, reason: str = None, timeout: float = 10):
+    """finish() that never hangs or raises, for teardown paths."""
+    try:
+        return await asyncio.wait_for(recorder.finish(reason), timeout)
+    except Exception as e:
+        logger.debug(f"Saving Playwright trace failed: {e}")
+        return None
@@ -0,0 +1,219 @@
+import os
+import sys
+import time
+import threading
+import tracemalloc
+import logging
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = "profiles"
+KINDS = ("cpu", "memory")
+
+def _settings(config: dict) -> dict:
+    conf = config.get("profiling", {})
+    return {
+        "directory": conf.get("directory", PROFILE_DIR),
+        "interval": float(conf.get("interval_ms", 5)) / 1000,
+        "top_n": int(conf.get("top_n", 25)),
+        "snapshot_interval": float(conf.get("snapshot_interval_seconds", 5)),
+    }
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.relpath(code.co_filename) if code.co_filename.startswith(os.getcwd()) else os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+class StackSampler:
+    """
+    Sampling CPU profiler: a background thread records the stack of one thread
+    (by default the calling one, which runs the event loop) every `interval`
+    seconds. Samples are written in the collapsed-stack format read by
+    flamegraph.pl, speedscope and inferno.
+    """
+    def __init__(self, interval: float = 0.005, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def top_functions(self, n: int) -> list:
+        """(frame, samples) with the most samples at the top of the stack, i.e. own time."""
+        own = Counter()
+        for stack, count in self.samples.items():
+            own[stack.rsplit(";", 1)[-1]] += count
+        return own.most_common(n)
+
+class PeakSnapshots:
+    """
+    Keeps the tracemalloc snapshot taken closest to the peak: a background
+    thread checks the traced size every `interval` seconds and snapshots when
+    it grew 10% past the last snapshot. A run frees most of its memory before
+    it ends, so a final snapshot alone would miss what filled it.
+    """
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.snapshot = None
+        self.size = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        tracemalloc.start(25)
+        self._thread = threading.Thread(target=self._run, name="tracemalloc-peaks", daemon=True)
+        self._thread.start()
+        return self
+
+    def _take(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.size * 1.1:
+            self.snapshot, self.size = tracemalloc.take_snapshot(), current
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._take()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._take()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return self.snapshot, peak
+
+def _portal_of(traceback) -> str:
+    """The scraper module closest to the allocation, else "other"."""
+    for frame in reversed(traceback):
+        parts = frame.filename.replace("\\", "/").split("/")
+        if len(parts) >= 2 and parts[-2] == "scrapers" and parts[-1] not in ("base.py", "__init__.py"):
+            return parts[-1][:-3]
+    return "other"
+
+def write_memory_report(snapshot, path_prefix: str, top_n: int):
+    """Writes the top allocation sites, overall and per portal, plus size-weighted collapsed stacks."""
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    by_line = snapshot.statistics("lineno")
+    by_traceback = snapshot.statistics("traceback")
+    per_portal = {}
+    for stat in by_traceback:
+        per_portal.setdefault(_portal_of(stat.traceback), []).append(stat)
+    with open(path_prefix + ".txt", "w", encoding="utf-8") as f:
+        total = sum(stat.size for stat in by_line)
+        f.write(f"Alive at the largest snapshot: {total / 2**20:.1f} MB in {sum(s.count for s in by_line)} blocks\n\n")
+        f.write(f"Top {top_n} allocation sites\n")
+        for stat in by_line[:top_n]:
+            frame = stat.traceback[0]
+            f.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
+        for portal, stats in sorted(per_portal.items(), key=lambda item: -sum(s.size for s in item[1])):
+            f.write(f"\n[{portal}] {sum(s.size for s in stats) / 2**20:.1f} MB\n")
+            for stat in stats[:top_n]:
+                frame = stat.traceback[0]
+                f.write(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}\n")
+    with open(path_prefix + ".folded", "w", encoding="utf-8") as f:
+        for stat in by_traceback:
+            stack = ";".join(f"{os.path.basename(fr.filename)}:{fr.lineno}" for fr in reversed(stat.traceback))
+            f.write(f"{stack} {stat.size}\n")
+
+@contextmanager
+def profiled(kind: str, name: str, config: dict):
+    """
+    Profiles the enclosed code ("cpu" or "memory", None does nothing) and writes
+    the result to profiles/<name>_<kind>.*. Yields a list that receives the
+    paths of the written files.
+    """
+    written = []
+    if not kind:
+        yield written
+        return
+    if kind not in KINDS:
+        raise ValueError(f"Unknown profile kind {kind!r}, expected one of {KINDS}")
+    settings = _settings(config)
+    os.makedirs(settings["directory"], exist_ok=True)
+    prefix = os.path.join(settings["directory"], f"{name}_{kind}")
+    if kind == "cpu":
+        sampler = StackSampler(settings["interval"]).start()
+    else:
+        sampler = PeakSnapshots(settings["snapshot_interval"]).start()
+    started = time.monotonic()
+    try:
+        yield written
+    finally:
+        if kind == "cpu":
+            sampler.stop()
+            sampler.write(prefix + ".folded")
+            written.append(prefix + ".folded")
+            top = ", ".join(f"{frame} x{count}" for frame, count in sampler.top_functions(5))
+            logger.info(f"CPU profile: {sum(sampler.samples.values())} samples in {time.monotonic() - started:.0f}s, top: {top}")
+        else:
+            snapshot, peak = sampler.stop()
+            write_memory_report(snapshot, prefix, settings["top_n"])
+            written.extend([prefix + ".txt", prefix + ".folded"])
+            logger.info(f"Memory profile: peak {peak / 2**20:.1f} MB traced, sites at {sampler.size / 2**20:.1f} MB")
+        logger.info(f"Profile written to {', '.join(written)}")
+
+class SlowRequestProfiler:
+    """
+    Samples the event loop during requests to the given paths and keeps the
+    profile of those slower than threshold_ms, in profiles/request_<time>_<path>.folded.
+    Only one request is sampled at a time.
+    """
+    def __init__(self, config: dict):
+        conf = config.get("profiling", {})
+        self.settings = _settings(config)
+        self.threshold = float(conf.get("slow_request_ms", 0)) / 1000
+        self.paths = tuple(conf.get("request_paths", ["/api/offers"]))
+        self._busy = False
+
+    def wants(self, path: str) -> bool:
+        return bool(self.threshold) and not self._busy and path.startswith(self.paths)
+
+    async def __call__(self, request, call_next):
+        if not self.wants(request.url.path):
+            return await call_next(request)
+        self._busy = True
+        sampler = StackSampler(self.settings["interval"]).start()
+        started = time.monotonic()
+        try:
+            return await call_next(request)
+        finally:
+            sampler.stop()
+            self._busy = False
+            elapsed = time.monotonic() - started
+            if elapsed >= self.threshold:
+                os.makedirs(self.settings["directory"], exist_ok=True)
+                slug = request.url.path.strip("/").replace("/", "_") or "root"
+                path = os.path.join(self.settings["directory"], f"request_{time.strftime('%Y%m%d_%H%M%S')}_{slug}.folded")
+                sampler.write(path)
+                logger.warning(f"Slow request {request.method} {request.url.path}: {elapsed * 1000:.0f} ms, profile in {path}")
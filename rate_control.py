@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = "state/rate_limits.json"
+SAVE_INTERVAL_SECONDS = 30  # failures are written to the state file at most this often during a run
+
+# Outcomes that make a host back off, and how long to pause it entirely (seconds)
+BACKOFF_SIGNALS = {
+    "throttled": 30,  # HTTP 429 / 403
+    "captcha": 120,
+    "timeout": 0,
+    "empty": 0,  # listing page without cards
+}
+
+class HostPaused(Exception):
+    """The host is paused for longer than a request may wait (rate_control.max_wait_seconds)."""
+
+CAPTCHA_MARKERS = ["captcha", "cf-challenge", "challenge-platform", "px-captcha", "are you a robot", "access denied"]
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+class HostRate:
+    def __init__(self, host, rate, state=None):
+        state = state or {}
+        self.host = host
+        self.rate = float(state.get("rate", rate))  # requests per second
+        self.backoff_until = float(state.get("backoff_until", 0))
+        self.successes = int(state.get("successes", 0))
+        self.failures = int(state.get("failures", 0))
+        self.consecutive_failures = int(state.get("consecutive_failures", 0))
+        self.last_signal = state.get("last_signal")
+        self.updated_at = float(state.get("updated_at", 0))
+        self.next_allowed = 0.0
+        self.lock = asyncio.Lock()
+
+    def to_dict(self):
+        return {
+            "rate": round(self.rate, 4),
+            "delay_seconds": round(1 / self.rate, 3),
+            "backoff_until": self.backoff_until,
+            "backing_off": self.backoff_until > time.time(),
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "last_signal": self.last_signal,
+            "updated_at": self.updated_at,
+        }
+
+class RateController:
+    """
+    Per-host request pacing with AIMD: the request rate grows by a fixed step
+    after every healthy response and is multiplied down on 429/403, captcha
+    pages, timeouts and empty listing pages. Shared by every task in the
+    process and persisted to state/rate_limits.json between runs.
+    """
+    def __init__(self, config: dict):
+        rate_conf = config.get("rate_control", {})
+        min_delay = float(config.get("politeness", {}).get("min_delay_seconds", 0.5))
+        self.max_rate = 1 / min_delay if min_delay > 0 else float(rate_conf.get("max_rate", 10))
+        self.min_rate = float(rate_conf.get("min_rate", 0.05))  # one request per 20 s
+        self.initial_rate = min(float(rate_conf.get("initial_rate", self.max_rate)), self.max_rate)
+        self.increase_step = float(rate_conf.get("increase_step", 0.1))
+        self.decrease_factor = float(rate_conf.get("decrease_factor", 0.5))
+        # Below watchdog.page_timeout_seconds, so a paused host fails the attempt instead of stalling it
+        self.max_wait = float(rate_conf.get("max_wait_seconds", 60))
+        self.state_file = rate_conf.get("state_file", STATE_FILE)
+        self.hosts = {}
+        self._file_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.time()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                saved = json.load(f)
+            for host, state in saved.items():
+                self.hosts[host] = HostRate(host, self.initial_rate, state)
+                self._clamp(self.hosts[host])
+        except Exception as e:
+            logger.warning(f"Could not load rate state: {e}")
+
+    def save(self):
+        if not self._dirty:
+            return
+        with self._file_lock:
+            os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+            tmp = self.state_file + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({h: r.to_dict() for h, r in self.hosts.items()}, f, indent=4)
+            os.replace(tmp, self.state_file)
+            self._dirty = False
+            self._saved_at = time.time()
+
+    def _clamp(self, host_rate):
+        host_rate.rate = max(self.min_rate, min(self.max_rate, host_rate.rate))
+
+    def get(self, host: str) -> HostRate:
+        if host not in self.hosts:
+            self.hosts[host] = HostRate(host, self.initial_rate)
+        return self.hosts[host]
+
+    async def acquire(self, url_or_host: str):
+        """
+        Waits until the host may receive the next request. Each caller reserves
+        its own slot under the host's lock and sleeps outside it, so callers
+        queue in time without holding each other up. Raises HostPaused when
+        the wait would exceed max_wait_seconds.
+        """
+        host = host_of(url_or_host) if "/" in url_or_host else url_or_host
+        host_rate = self.get(host)
+        async with host_rate.lock:
+            now = time.time()
+            start = max(host_rate.next_allowed, host_rate.backoff_until, now)
+            if start - now > self.max_wait:
+                raise HostPaused(f"{host} paused for {start - now:.0f}s ({host_rate.last_signal})")
+            host_rate.next_allowed = start + 1 / host_rate.rate
+        wait = start - now
+        if wait > 5:
+            logger.info(f"[{host}] Backing off for {wait:.0f}s")
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, url_or_host: str, outcome: str):
+        """outcome: 'ok' or one of BACKOFF_SIGNALS."""
+        host = host_of(url_or_host) if "/" in url_or_host else url_or_host
+        if not host:
+            return
+        host_rate = self.get(host)
+        host_rate.updated_at = time.time()
+        if outcome == "ok":
+            host_rate.rate += self.increase_step
+            host_rate.successes += 1
+            host_rate.consecutive_failures = 0
+            self._clamp(host_rate)
+            self._dirty = True
+            return
+        host_rate.rate *= self.decrease_factor
+        host_rate.failures += 1
+        host_rate.consecutive_failures += 1
+        host_rate.last_signal = outcome
+        self._clamp(host_rate)
+        pause = BACKOFF_SIGNALS.get(outcome, 0)
+        if pause:
+            # Repeated blocks double the pause, capped at 30 minutes
+            pause = min(pause * 2 ** (host_rate.consecutive_failures - 1), 1800)
+            host_rate.backoff_until = time.time() + pause
+        logger.warning(f"[{host}] {outcome}: rate -> {host_rate.rate:.2f} req/s"
+                       + (f", pausing {pause:.0f}s" if pause else ""))
+        self._dirty = True
+        # Runs save at their end; in between, a crash loses at most SAVE_INTERVAL_SECONDS of backoff state
+        if time.time() - self._saved_at > SAVE_INTERVAL_SECONDS:
+            self.save()
+
+    def attach(self, page):
+        """Backs off hosts answering the page's documents or XHRs with 429/403."""
+        def on_response(response):
+            if response.status not in (429, 403):
+                return
+            if response.request.resource_type in ("document", "xhr", "fetch"):
+                self.record(response.url, "throttled")
+        page.on("response", on_response)
+
+    async def check_empty_page(self, page):
+        """Classifies a listing page without cards as a captcha/block page or just empty."""
+        try:
+            text = ((await page.title()) + " " + (await page.content())[:20000]).lower()
+        except Exception:
+            text = ""
+        outcome = "captcha" if any(m in text for m in CAPTCHA_MARKERS) else "empty"
+        self.record(page.url, outcome)
+        return outcome
+
+    def snapshot(self) -> dict:
+        return {h: r.to_dict() for h, r in sorted(self.hosts.items())}
+
+_controller = None
+
+def get_controller(config: dict) -> RateController:
+    """Process-wide RateController, shared by all tasks and tools."""
+    global _controller
+    if _controller is None:
+        _controller = RateController(config)
+    return _controller
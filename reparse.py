@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from playwright.async_api import async_playwright
+from card_archive import iter_records, ARCHIVE_DIR
+from storage import backfill_offers
+from logger_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = "config.json"
+CHUNK_SIZE = 500  # cards per offline document
+JOB_SIZE = 5000  # cards per process pool job
+BACKFILL_FIELDS = ["title", "price", "area", "price_per_m2", "location", "floor", "garden"]
+
+def load_config():
+    try:
+        with open(CONFIG_FILE, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+async def _reparse_job_async(portal, records, config):
+    from scraper import SCRAPERS
+    scraper = SCRAPERS[portal](config)
+    results = []
+    failures = 0
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context(java_script_enabled=False)
+        # Archived HTML still references images and scripts; nothing may hit the network
+        await context.route("**/*", lambda route: route.abort())
+        page = await context.new_page()
+
+        for start in range(0, len(records), CHUNK_SIZE):
+            chunk = records[start:start + CHUNK_SIZE]
+            # Many cards per offline document, each in its own wrapper
+            body = "".join(f'<div data-scrappy-card="{i}">{r["html"]}</div>' for i, r in enumerate(chunk))
+            await page.set_content(f"<html><body>{body}</body></html>")
+
+            for i, record in enumerate(chunk):
+                try:
+                    if scraper.CARD_TYPE == "locator":
+                        card = page.locator(f"[data-scrappy-card='{i}'] > *").first
+                    else:
+                        card = await page.query_selector(f"[data-scrappy-card='{i}'] > *")
+                    offer = await scraper.parse_card(card) if card else None
+                    if offer and offer.get("url"):
+                        results.append((record["archived_at"], offer))
+                except Exception:
+                    failures += 1
+        await browser.close()
+    return results, failures
+
+def reparse_job(portal, records, config):
+    """Process pool entry point: re-runs the current parse_card() over archived cards."""
+    return asyncio.run(_reparse_job_async(portal, records, config))
+
+def reparse(days=7, portal=None, workers=None, stale_only=False, dry_run=False):
+    config = load_config()
+    directory = config.get("archive", {}).get("directory", ARCHIVE_DIR)
+    since = time.time() - days * 86400 if days else None
+
+    from scraper import SCRAPERS
+    by_portal = {}
+    total = 0
+    for record in iter_records(directory, since=since, portal=portal):
+        name = record["portal"]
+        if name not in SCRAPERS:
+            continue
+        if stale_only and record.get("scraper_version") == SCRAPERS[name].SCRAPER_VERSION:
+            continue
+        by_portal.setdefault(name, []).append(record)
+        total += 1
+    logger.info(f"Re-parsing {total} archived cards from {len(by_portal)} portals")
+    if not total:
+        return 0
+
+    # One browser per job, so jobs are large; small portals still get their own job
+    jobs = []
+    for name, records in by_portal.items():
+        for start in range(0, len(records), JOB_SIZE):
+            jobs.append((name, records[start:start + JOB_SIZE]))
+
+    latest = {}
+    failures = 0
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(reparse_job, name, records, config) for name, records in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                results, job_failures = future.result()
+            except Exception as e:
+                logger.error(f"Re-parse job failed: {e}")
+                continue
+            failures += job_failures
+            # Newest archived card wins for each offer
+            for archived_at, offer in results:
+                prev = latest.get(offer["url"])
+                if prev is None or prev[0] <= archived_at:
+                    latest[offer["url"]] = (archived_at, offer)
+            logger.info(f"[{done}/{len(futures)}] jobs done")
+
+    logger.info(f"Parsed {len(latest)} offers ({failures} cards failed) in {time.time() - started:.1f}s")
+    offers = [offer for _, offer in latest.values()]
+    if dry_run:
+        logger.info("Dry run, storage not updated.")
+        return 0
+    return backfill_offers(offers, BACKFILL_FIELDS)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse archived listing cards with the current scrapers and backfill offers.csv")
+    parser.add_argument("--days", type=float, default=7, help="Only cards archived in the last N days (0 = all)")
+    parser.add_argument("--portal", help="Only this portal, e.g. trojmiasto")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--stale-only", action="store_true", help="Skip cards archived by the current SCRAPER_VERSION")
+    parser.add_argument("--dry-run", action="store_true", help="Parse but do not write to storage")
+    args = parser.parse_args()
+    setup_logging()
+    changed = reparse(args.days, args.portal, args.workers, args.stale_only, args.dry_run)
+    print(f"Updated {changed} offers.")
@@ -0,0 +1,192 @@
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+SKIP, QUEUE = "skip", "queue"
+CHECK_SECONDS = 60  # longest sleep, so edits to the schedule section are picked up
+QUEUE_POLL_SECONDS = 5  # how soon a queued run notices the lock is free
+
+# (lowest, highest) of each cron field: minute, hour, day of month, month, day of week (0 or 7 = Sunday)
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+def _parse_field(text: str, lowest: int, highest: int) -> set:
+    values = set()
+    for part in text.split(","):
+        part, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if part == "*":
+            start, end = lowest, highest
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = highest if step > 1 else start
+        if not lowest <= start <= end <= highest or step < 1:
+            raise ValueError(f"Cron field {text!r} out of range {lowest}-{highest}")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronExpression:
+    """
+    Standard five-field cron expression: minute, hour, day of month, month,
+    day of week. Fields take *, numbers, ranges (a-b), steps (*/n, a-b/n) and
+    lists. As in cron, when both day fields are restricted either may match.
+    """
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression {expression!r} needs 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(field, *bounds) for field, bounds in zip(fields, FIELD_RANGES))
+        self.weekdays = {d % 7 for d in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """The first matching minute after moment."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression {self.expression!r} never matches")
+
+class ScheduledJob:
+    """One entry of schedule.jobs: a cron expression and the run it starts."""
+    def __init__(self, conf: dict, jitter_seconds: float):
+        self.cron = CronExpression(conf["cron"])
+        self.name = conf.get("name") or self.cron.expression
+        self.portals = conf.get("portals")  # None: every enabled portal
+        self.max_pages = conf.get("max_pages")
+        self.budget_minutes = conf.get("budget_minutes")
+        self.jitter = float(conf.get("jitter_seconds", jitter_seconds))
+        self.due = None  # time.time() of the next start, jitter included
+        self.last = {}  # {"at", "outcome"} of the last time it came due
+
+    def plan(self, after: float):
+        slot = self.cron.next_after(datetime.fromtimestamp(after)).timestamp()
+        # Several instances on the same cron would otherwise hit the portals in the same second
+        self.due = slot + random.uniform(0, self.jitter)
+
+    def run_kwargs(self) -> dict:
+        return {"portals": self.portals, "max_pages": self.max_pages,
+                "budget_seconds": self.budget_minutes * 60 if self.budget_minutes else None}
+
+    def status(self) -> dict:
+        return {"name": self.name, "cron": self.cron.expression, "portals": self.portals, "max_pages": self.max_pages,
+                "budget_minutes": self.budget_minutes, "next_run": self.due, "last": self.last}
+
+class Scheduler:
+    """
+    Starts unattended runs from the cron expressions in config.json's schedule
+    section. A run only starts through start_run(**kwargs), which returns False
+    while another run holds the single-run lock; a job that comes due then is
+    skipped, or with on_overrun "queue" started as soon as the lock frees (one
+    pending start per job). The schedule is re-read from load_config() every
+    minute, so edits through /api/config apply without a restart.
+    """
+    def __init__(self, load_config, start_run):
+        self.load_config = load_config
+        self.start_run = start_run
+        self.conf = None
+        self.jobs = []
+        self.on_overrun = SKIP
+        self.queued = []  # jobs waiting for the running run to finish
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+        return self
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    def _reload(self):
+        conf = self.load_config().get("schedule", {})
+        if conf == self.conf:
+            return
+        self.conf = conf
+        self.on_overrun = conf.get("on_overrun", SKIP)
+        jobs = []
+        if conf.get("enabled", False):
+            for job_conf in conf.get("jobs", []):
+                try:
+                    jobs.append(ScheduledJob(job_conf, float(conf.get("jitter_seconds", 60))))
+                except (KeyError, ValueError) as e:
+                    logger.error(f"Ignoring schedule entry {job_conf}: {e}")
+        now = time.time()
+        for job in jobs:
+            job.plan(now)
+        self.jobs = jobs
+        self.queued = [job for job in self.queued if job.name in {j.name for j in jobs}]
+        if jobs:
+            logger.info("Schedule: " + ", ".join(f"{job.name} ({job.cron.expression})" for job in jobs))
+
+    def _start(self, job, outcome: str) -> bool:
+        if not self.start_run(**job.run_kwargs()):
+            return False
+        logger.info(f"Scheduled run {job.name} started{' (was queued)' if outcome == 'started late' else ''}")
+        job.last = {"at": time.time(), "outcome": outcome}
+        return True
+
+    def _tick(self):
+        now = time.time()
+        if self.queued and self._start(self.queued[0], "started late"):
+            self.queued.pop(0)
+        for job in self.jobs:
+            if job.due > now:
+                continue
+            job.plan(now)
+            if self._start(job, "started"):
+                continue
+            if self.on_overrun == QUEUE:
+                if job not in self.queued:
+                    self.queued.append(job)
+                job.last = {"at": now, "outcome": "queued"}
+                logger.info(f"Scheduled run {job.name} queued, a run is still in progress")
+            else:
+                job.last = {"at": now, "outcome": "skipped"}
+                logger.warning(f"Scheduled run {job.name} skipped, a run is still in progress")
+
+    async def _loop(self):
+        while True:
+            try:
+                self._reload()
+                self._tick()
+            except Exception as e:
+                logger.error(f"Scheduler error: {e}")
+            if self.queued:
+                delay = QUEUE_POLL_SECONDS
+            else:
+                wake = min([job.due for job in self.jobs], default=time.time() + CHECK_SECONDS)
+                delay = min(max(wake - time.time(), 1), CHECK_SECONDS)
+            await asyncio.sleep(delay)
+
+    def status(self) -> dict:
+        return {
+            "enabled": bool(self.jobs),
+            "on_overrun": self.on_overrun,
+            "jobs": [job.status() for job in self.jobs],
+            "queued": [job.name for job in self.queued],
+        }
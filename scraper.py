@@ -1,9 +1,31 @@
 import asyncio
+import time
 import json
 import re
 import logging
 from playwright.async_api import async_playwright
 from storage import save_offers
+from enrichment import EnrichmentWorker
+from html_cache import get_cache
+import card_archive
+from card_archive import get_archive
+from rate_control import get_controller
+from concurrency import ConcurrencyController
+from task_history import TaskHistory
+from supervisor import TaskSupervisor, PortalSkipped, close_quietly
+from memory_governor import MemoryGovernor
+import metrics
+import tracing
+import profiling
+import playwright_traces
+from playwright_traces import TraceRecorder
+from network import NetworkMeter, NetworkReport
+from page_performance import PagePerformance, PerformanceReport
+from pipeline import Pipeline, Stage, BatchStage, Job
+from checkpoint import RunCheckpoint, RUNNING, INTERRUPTED, SKIPPED, DONE, FAILED, CUT_SHORT
+import consent
+from datetime import datetime
+from scrapers.base import observe_pages
 from scrapers.olx import OlxScraper
 from scrapers.otodom import OtodomScraper
 from scrapers.morizon import MorizonScraper
@@ -17,7 +39,7 @@ from scrapers.gethome import GethomeScraper
 from scrapers.okolica import OkolicaScraper
 from scrapers.tabelaofert import TabelaofertScraper
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
-from logger_config import setup_logging
+from logger_config import setup_logging, bind
 
 SCRAPERS = {
     "trojmiasto": TrojmiastoScraper,
@@ -40,6 +62,11 @@ logger = logging.getLogger(__name__)
 
 CONFIG_FILE = "config.json"
 
+# Task phases; budgeted runs split every task into a first-page pass and a deep pass
+ALL_PAGES = "all pages"
+FIRST_PAGES = "first page"
+DEEP_PAGES = "deep pages"
+
 TROJMIASTO_DISTRICT_MAP = {
     "wrzeszcz": "https://ogloszenia.trojmiasto.pl/nieruchomosci-sprzedam-rynek-wtorny/mieszkanie/gdansk/wrzeszcz/",
     "wrzeszcz górny": "https://ogloszenia.trojmiasto.pl/nieruchomosci-sprzedam-rynek-wtorny/mieszkanie/gdansk/wrzeszcz/",
@@ -204,6 +231,43 @@ def check_filters(offer, filters):
                 
     return True
 
+def normalize_offers(offers):
+    """
+    Cleans scraped offers for storage: trims whitespace in text fields, fills in
+    a missing price per m2 and drops offers without a URL. Runs off the event loop.
+    """
+    normalized = []
+    for offer in offers:
+        url = (offer.get("url") or "").strip()
+        if not url:
+            continue
+        offer = {**offer, "url": url}
+        for field in ("title", "location"):
+            if isinstance(offer.get(field), str):
+                offer[field] = " ".join(offer[field].split())
+        price, area = offer.get("price"), offer.get("area")
+        if not offer.get("price_per_m2") and price and area:
+            offer["price_per_m2"] = round(price / area, 2)
+        normalized.append(offer)
+    return normalized
+
+def filter_offers(offers, district_context, filters):
+    """Offers that mention one of the task's districts and pass the config filters."""
+    kept = []
+    for offer in offers:
+        # 1. District Check
+        if district_context:
+            offer_loc_str = (str(offer.get("location", "")) + " " + str(offer.get("title", ""))).lower()
+            if not any(d.lower() in offer_loc_str for d in district_context):
+                continue
+
+        # 2. Config Filters Check
+        if not check_filters(offer, filters):
+            continue
+
+        kept.append(offer)
+    return kept
+
 async def build_url(base_url, filters, portal):
     parsed = urlparse(base_url)
     query = parse_qs(parsed.query)
@@ -359,9 +423,30 @@ async def build_url(base_url, filters, portal):
     new_query = urlencode(query, doseq=True)
     return urlunparse((parsed.scheme, parsed.netloc, parsed.path, parsed.params, new_query, parsed.fragment))
 
-async def run_scraper(progress_callback=None):
+def _first_seen(offers: list, seen: set) -> list:
+    """The offers whose URL is not in seen yet, each URL once; adds them to seen."""
+    fresh = []
+    for offer in offers:
+        if offer["url"] not in seen:
+            seen.add(offer["url"])
+            fresh.append(offer)
+    return fresh
+
+async def run_scraper(progress_callback=None, enrich=None, budget_seconds=None, resume=False, portals=None, max_pages=None):
+    """
+    Scrapes all enabled portals and saves new offers. With budget_seconds the run
+    first scrapes page 1 of every task, then deeper pages while time remains, and
+    stops paginating at the deadline. Returns a run report with skipped coverage.
+    With resume the newest unfinished run (see checkpoint.py) is continued instead:
+    only its tasks that did not finish are scraped again. portals limits the
+    run to those portals, max_pages caps their pagination (scheduled runs).
+    """
     with open(CONFIG_FILE, 'r') as f:
         config = json.load(f)
+
+    # Build-year enrichment of new offers, on by config unless overridden
+    if enrich is None:
+        enrich = config.get("enrichment", {}).get("enabled", False)
         
     filters = config.get("filters", {})
     portals_config = config.get("portals", config)
@@ -372,8 +457,31 @@ async def run_scraper(progress_callback=None):
         districts = [d.strip() for d in raw_district if d and isinstance(d, str)]
     else:
         districts = [d.strip() for d in raw_district.split(';')] if raw_district else []
-    districts = [d for d in districts if d] 
+    # A district listed twice would run the same task twice
+    districts = list(dict.fromkeys(d for d in districts if d))
     
+    cache = get_cache(config)
+    rate = get_controller(config)
+    concurrency = ConcurrencyController(config, "scrape")
+    history = TaskHistory(config)
+    supervisor = TaskSupervisor(config, history, concurrency=concurrency)
+    started_at = time.time()
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    checkpoint = RunCheckpoint.latest_unfinished(config) if resume else None
+    resumed = checkpoint is not None
+    if checkpoint:
+        run_id = checkpoint.run_id
+        logger.info(f"Resuming run {run_id}")
+    elif resume:
+        logger.info("No unfinished run to resume, starting a new one")
+    bind(run_id=run_id)
+    card_archive.prune(config)
+    archive = get_archive(run_id, config)
+    tracing.configure(config)
+    tracing.open_trace(run_id)
+    playwright_traces.prune(config)
+    run_span = tracing.span("run", run_id=run_id, resumed=resumed, budget_seconds=budget_seconds)
+
     scrapers = {
         "olx": OlxScraper(config),
         "otodom": OtodomScraper(config),
@@ -389,119 +497,416 @@ async def run_scraper(progress_callback=None):
         "okolica": OkolicaScraper(config),
         "tabelaofert": TabelaofertScraper(config),
     }
+    for scraper in scrapers.values():
+        scraper.archive = archive
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True, args=["--disable-blink-features=AutomationControlled"])
+        governor = MemoryGovernor(p, config)
+        await governor.start()
+        enricher = ingest = None
+        try:
+            if enrich:
+                enricher = EnrichmentWorker(governor, config)
+                enricher.start()
         
-        items_to_scrape = []
-        if "filters" in config:
-             for p_name, p_conf in portals_config.items():
-                 if p_conf.get("enabled", True):
-                     base_url = p_conf.get("base_url")
-                     max_pages = p_conf.get("max_pages", 0)
+            items_to_scrape = []
+            if "filters" in config:
+                 for p_name, p_conf in portals_config.items():
+                     if p_conf.get("enabled", True) and (not portals or p_name in portals):
+                         base_url = p_conf.get("base_url")
+                         portal_max_pages = p_conf.get("max_pages", 0)
+                         if max_pages:
+                             portal_max_pages = min(portal_max_pages, max_pages) if portal_max_pages else max_pages
                      
-                     if base_url:
-                         if districts:
-                             for d in districts:
-                                 iter_filters = filters.copy()
-                                 iter_filters["district"] = d
+                         if base_url:
+                             if districts:
+                                 for d in districts:
+                                     iter_filters = filters.copy()
+                                     iter_filters["district"] = d
                                  
-                                 current_base_url = base_url
-                                 if p_name == "trojmiasto":
-                                     d_lower = d.lower().strip()
-                                     if d_lower in TROJMIASTO_DISTRICT_MAP:
-                                         current_base_url = TROJMIASTO_DISTRICT_MAP[d_lower]
-                                 elif p_name == "nieruchomosci_online":
-                                     d_lower = d.lower().strip()
-                                     if d_lower in NIERUCHOMOSCI_ONLINE_DISTRICT_MAP:
-                                         current_base_url = NIERUCHOMOSCI_ONLINE_DISTRICT_MAP[d_lower]
-                                 elif p_name == "gratka":
-                                     if d_lower in GRATKA_DISTRICT_MAP:
-                                         current_base_url = GRATKA_DISTRICT_MAP[d_lower]
-                                 elif p_name == "domiporta":
-                                     d_lower = d.lower().strip()
-                                     if d_lower in DOMIPORTA_DISTRICT_MAP:
-                                         current_base_url = DOMIPORTA_DISTRICT_MAP[d_lower]
-                                 elif p_name == "adresowo":
-                                     if d_lower in ADRESOWO_DISTRICT_MAP:
-                                         current_base_url = ADRESOWO_DISTRICT_MAP[d_lower]
-                                 elif p_name == "szybko":
-                                     d_lower = d.lower().strip()
-                                     if d_lower in SZYBKO_DISTRICT_MAP:
-                                         current_base_url = SZYBKO_DISTRICT_MAP[d_lower]
-                                 elif p_name == "gethome":
-                                     d_lower = d.lower().strip()
-                                     if d_lower in GETHOME_DISTRICT_MAP:
-                                         current_base_url = GETHOME_DISTRICT_MAP[d_lower]
+                                     current_base_url = base_url
+                                     if p_name == "trojmiasto":
+                                         d_lower = d.lower().strip()
+                                         if d_lower in TROJMIASTO_DISTRICT_MAP:
+                                             current_base_url = TROJMIASTO_DISTRICT_MAP[d_lower]
+                                     elif p_name == "nieruchomosci_online":
+                                         d_lower = d.lower().strip()
+                                         if d_lower in NIERUCHOMOSCI_ONLINE_DISTRICT_MAP:
+                                             current_base_url = NIERUCHOMOSCI_ONLINE_DISTRICT_MAP[d_lower]
+                                     elif p_name == "gratka":
+                                         if d_lower in GRATKA_DISTRICT_MAP:
+                                             current_base_url = GRATKA_DISTRICT_MAP[d_lower]
+                                     elif p_name == "domiporta":
+                                         d_lower = d.lower().strip()
+                                         if d_lower in DOMIPORTA_DISTRICT_MAP:
+                                             current_base_url = DOMIPORTA_DISTRICT_MAP[d_lower]
+                                     elif p_name == "adresowo":
+                                         if d_lower in ADRESOWO_DISTRICT_MAP:
+                                             current_base_url = ADRESOWO_DISTRICT_MAP[d_lower]
+                                     elif p_name == "szybko":
+                                         d_lower = d.lower().strip()
+                                         if d_lower in SZYBKO_DISTRICT_MAP:
+                                             current_base_url = SZYBKO_DISTRICT_MAP[d_lower]
+                                     elif p_name == "gethome":
+                                         d_lower = d.lower().strip()
+                                         if d_lower in GETHOME_DISTRICT_MAP:
+                                             current_base_url = GETHOME_DISTRICT_MAP[d_lower]
                                          
-                                 final_url = await build_url(current_base_url, iter_filters, p_name)
-                                 items_to_scrape.append((p_name, final_url, max_pages, [d]))
-                         else:
-                             final_url = await build_url(base_url, filters, p_name)
-                             items_to_scrape.append((p_name, final_url, max_pages, []))
+                                     final_url = await build_url(current_base_url, iter_filters, p_name)
+                                     items_to_scrape.append((p_name, final_url, portal_max_pages, [d]))
+                             else:
+                                 final_url = await build_url(base_url, filters, p_name)
+                                 items_to_scrape.append((p_name, final_url, portal_max_pages, []))
+
+            items_to_scrape = [item for item in items_to_scrape if item[0] in scrapers]
+            completed = 0
+            saved_total = 0
+
+            # Scraped pages flow through bounded queues: normalize -> screen (district and
+            # config filters) -> dedupe -> persist in batches. A scraper that gets ahead of
+            # the slowest stage waits before loading its next page.
+            pipeline_conf = config.get("pipeline", {})
+            queue_size = int(pipeline_conf.get("queue_size", 20))
+            sent_urls = set()
+
+            def screen(job, offers):
+                # Hedged and retried attempts scrape the same pages again, and a page may list an offer twice
+                fresh = _first_seen(offers, job.stats["seen"])
+                job.stats["offers"] += len(fresh)
+                kept = filter_offers(fresh, job.stats["districts"], filters)
+                job.stats["kept"] += len(kept)
+                return kept
+
+            def dedupe(job, offers):
+                # The same listing often turns up in several district searches
+                return _first_seen(offers, sent_urls)
+
+            def persist(entries):
+                return save_offers([offer for _, offers in entries for offer in offers])
+
+            def persisted(entries, new_urls):
+                nonlocal saved_total
+                new_set = set(new_urls)
+                for job, offers in entries:
+                    saved_total += len(offers)
+                    job.stats["saved"] += len(offers)
+                    new_offers = [o for o in offers if o["url"] in new_set]
+                    job.stats["new"] += len(new_offers)
+                    metrics.OFFERS_SAVED.inc(job.stats["portal"], amount=len(offers))
+                    metrics.OFFERS_NEW.inc(job.stats["portal"], amount=len(new_offers))
+                    if enricher and new_offers:
+                        enricher.submit(new_offers)
+
+            ingest = Pipeline([
+                Stage("normalize", normalize_offers, queue_size, workers=int(pipeline_conf.get("normalize_workers", 1)),
+                      executor=pipeline_conf.get("normalize_executor", "thread")),
+                Stage("screen", screen, queue_size),
+                Stage("dedupe", dedupe, queue_size),
+                BatchStage("persist", persist, queue_size, batch_size=int(pipeline_conf.get("batch_size", 200)),
+                           batch_seconds=float(pipeline_conf.get("batch_seconds", 2)), after=persisted),
+            ]).start()
+
+            def task_key(item):
+                return item[0], item[3][0] if item[3] else None
+
+            deadline = time.monotonic() + budget_seconds if budget_seconds else None
+            supervisor.deadline = deadline
+            for scraper in scrapers.values():
+                scraper.deadline = deadline
 
-        all_gathered = []
-        total_tasks = len(items_to_scrape)
+            # Slow tasks first, so none of them is left to run alone at the end
+            items_to_scrape = history.order(items_to_scrape, task_key)
+            if deadline:
+                # New listings concentrate on first pages: all of those first, then deep pagination by yield
+                # The deep pass of a task starts at page 2, after its first-page pass is done (see scrape_task)
+                phases = [(FIRST_PAGES, (p_name, url, 1, d)) for p_name, url, _, d in items_to_scrape]
+                phases += [(DEEP_PAGES, item) for item in history.order(items_to_scrape, task_key, by="yield") if item[2] != 1]
+            else:
+                phases = [(ALL_PAGES, item) for item in items_to_scrape]
+            if checkpoint:
+                # Planned tasks of the interrupted run; offers of its finished tasks are already saved
+                phases = checkpoint.phases()
+                for _, _, item in phases:
+                    if item[0] not in scrapers:
+                        raise ValueError(f"Cannot resume run {run_id}: unknown portal {item[0]}")
+            else:
+                checkpoint = RunCheckpoint.create(run_id, phases, config, budget_seconds=budget_seconds, enrich=enrich,
+                                                  portals=portals, max_pages=max_pages)
+                phases = checkpoint.phases()
+            total_tasks = len(phases)
+            pending = [task_key(item) for _, _, item in phases]
+            running = {}  # task_id -> ((portal, district), started_at)
+            coverage = {"skipped": [], "cut_short": [], "failed": []}
+            new_total = 0
+            network = NetworkReport()
+            performance = PerformanceReport()
+            # Set when a task's first-page pass ends; its deep pass waits for it
+            first_pages_done = {task_key(item): asyncio.Event() for _, phase, item in phases if phase == FIRST_PAGES}
+            deep_keys = {task_key(item) for _, phase, item in phases if phase == DEEP_PAGES}
+            first_passes = {}  # key -> measurements of a first-page pass whose deep pass is still to come
+
+            def report(task_desc):
+                if progress_callback:
+                    eta = history.remaining_seconds(pending, running.values(), concurrency.total.level)
+                    if deadline:
+                        eta = min(eta, max(deadline - time.monotonic(), 0))
+                    progress_callback(completed, total_tasks, task_desc, eta_seconds=int(eta))
 
-        for i, (portal_name, url, max_pages, district_context) in enumerate(items_to_scrape):
-            if portal_name not in scrapers: continue
+            async def scrape_task(phased_item):
+                nonlocal completed, new_total
+                task_id, phase, item = phased_item
+                portal_name, url, max_pages, district_context = item
+                key = task_key(item)
+                label = f"{portal_name.title()} - {district_context[0] if district_context else 'All'}"
+                if phase != ALL_PAGES:
+                    label += f" ({phase})"
+                if phase == DEEP_PAGES and key in first_pages_done:
+                    await first_pages_done[key].wait()
+                pending.remove(key)
+                if supervisor.is_open(portal_name) or supervisor.out_of_time():
+                    reason = "time budget spent" if supervisor.out_of_time() else "portal failed repeatedly this run"
+                    logger.warning(f"[{portal_name.upper()}] Skipping {label}, {reason}")
+                    coverage["skipped"].append(label)
+                    checkpoint.update(task_id, status=SKIPPED)
+                    metrics.TASKS.inc(portal_name, SKIPPED)
+                    if phase == FIRST_PAGES:
+                        first_pages_done[key].set()
+                    completed += 1
+                    report(f"{label} skipped")
+                    return
+                task_started = time.time()
+                running[task_id] = (key, task_started)
+                bind(portal=portal_name, district=key[1])
+                task_span = tracing.span("task", lane=True, portal=portal_name, district=key[1], phase=phase, url=url)
+                checkpoint.start_task(task_id)
+                job = Job(portal=portal_name, districts=district_context, seen=set(), offers=0, kept=0, saved=0, new=0)
+                status = FAILED
+                attempt_errors = 0
+                stats = job.stats
+                meter = NetworkMeter(portal_name)  # shared by retries and hedges: they all cost bytes
+                perf = PagePerformance(portal_name, config)
             
-            # Report Progress
-            if progress_callback:
-                task_desc = f"{portal_name.title()} - {district_context[0] if district_context else 'All'}"
-                progress_callback(i, total_tasks, task_desc)
+                # Report Progress
+                report(label)
+
+                async def attempt(on_progress):
+                    nonlocal attempt_errors
+                    context = await consent.new_context(
+                        governor.browser, portal_name, config,
+                        user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+                    )
+                    page = None
+                    pages_done = 0
+                    page_started = time.time()
+                    bind(page=1)
 
-            context = await browser.new_context(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            )
-            page = await context.new_page()
+                    def on_page(has_cards):
+                        nonlocal pages_done, page_started
+                        usage = meter.page_done()
+                        tracing.record("page", page_started, portal=portal_name, page=pages_done + 1,
+                                       url=page.url if page else None, has_cards=has_cards,
+                                       requests=usage["requests"], bytes=usage["bytes"], cache_hits=usage["cache_hits"])
+                        page_started = time.time()
+                        on_progress()
+                        if has_cards:
+                            pages_done += 1
+                            checkpoint.page_done(task_id, pages_done)
+                            governor.page_done()
+                            bind(page=pages_done + 1)
+                        concurrency.record(portal_name, pages=int(has_cards), errors=int(not has_cards))
+
+                    # Screenshots, DOM and network of the last pages, kept only if the attempt goes wrong
+                    recorder = TraceRecorder(context, config, run_id, label)
+                    reason = None
+                    try:
+                        await recorder.start()
+                        page = await context.new_page()
+                        if cache and cache.listing_max_age:
+                            cache.attach(page)
+                        rate.attach(page)
+                        await meter.attach(page)
+                        await perf.attach(page)
+                        observe_pages(page, on_page)
+                        start_page = 2 if phase == DEEP_PAGES else 1
+                        async for page_offers in scrapers[portal_name].scrape_from(page, url, max_pages, start_page):
+                            await perf.page_done(page)
+                            await ingest.submit(job, page_offers)
+                            await recorder.page_done()
+                        if not pages_done:
+                            reason = "no cards"
+                        elif recorder.is_slow(history.estimate(*key) if history.has(*key) else None):
+                            reason = "slow"
+                    except asyncio.CancelledError:
+                        reason = "cancelled (deadline, stall or lost hedge)"
+                        raise
+                    except Exception as e:
+                        attempt_errors += 1
+                        reason = f"error: {e!r}"[:300]
+                        raise
+                    finally:
+                        await playwright_traces.finish_quietly(recorder, reason)
+                        try:
+                            await asyncio.wait_for(consent.save_if_accepted(context, portal_name, config), 10)
+                        except Exception:
+                            pass
+                        if page:
+                            await close_quietly(page)
+                        await close_quietly(context)
             
-            try:
-                scraper = scrapers[portal_name]
-                site_offers = await scraper.scrape(page, url, max_pages)
-                
-                logger.info(f"[{portal_name.upper()}] Found {len(site_offers)} offers.")
-                
-                offers_to_save = []
-                original_count = len(site_offers)
-                for offer in site_offers:
-                    # 1. District Check
-                    if district_context:
-                        offer_loc_str = (str(offer.get("location", "")) + " " + str(offer.get("title", ""))).lower()
-                        match = False
-                        for d in district_context:
-                            if d.lower() in offer_loc_str:
-                                match = True
-                                break
-                        if not match:
-                            continue
-
-                    # 2. Config Filters Check
-                    if not check_filters(offer, filters):
-                        continue
-                        
-                    offers_to_save.append(offer)
-                
-                if len(offers_to_save) < original_count:
-                    logger.info(f"[{portal_name.upper()}] Filtered {original_count} -> {len(offers_to_save)} offers.")
-                
-                if offers_to_save:
-                    await asyncio.to_thread(save_offers, offers_to_save)
-                    all_gathered.extend(offers_to_save)
+                try:
+                    # A browser recycle waits for this lease, so the task is never cut off by it
+                    async with governor.lease():
+                        await supervisor.run(portal_name, key[1], attempt, label)
+                    # The task's last pages may still be waiting to be saved
+                    await ingest.drain(job)
+                    if job.errors:
+                        raise RuntimeError(f"{job.errors} page(s) of offers could not be saved")
+
+                    logger.info(f"[{portal_name.upper()}] Found {stats['offers']} offers.")
+                    if stats["kept"] < stats["offers"]:
+                        logger.info(f"[{portal_name.upper()}] Filtered {stats['offers']} -> {stats['kept']} offers.")
+                    new_total += stats["new"]
+
+                    page_times = supervisor.page_times.get(label, [])
+                    cut_short = supervisor.out_of_time() and phase != FIRST_PAGES
+                    status = CUT_SHORT if cut_short else DONE
+                    checkpoint.update(task_id, status=status)
+                    if cut_short:
+                        coverage["cut_short"].append(f"{label}: stopped after {len(page_times)} page(s)")
+                    else:
+                        # History estimates whole tasks: a budgeted task's two passes are recorded as one, cut-short ones not at all
+                        measured = (time.time() - task_started, len(page_times), stats["offers"], stats["new"], page_times)
+                        if phase == FIRST_PAGES and key in deep_keys:
+                            first_passes[key] = measured
+                        elif phase != DEEP_PAGES:
+                            history.record(*key, *measured)
+                        elif key in first_passes:
+                            first = first_passes.pop(key)
+                            history.record(*key, *(a + b for a, b in zip(first, measured)))
                     
-            except Exception as e:
-                logger.error(f"Error scraping {portal_name}: {e}")
-            finally:
-                await page.close()
-                await context.close()
+                except PortalSkipped:
+                    logger.warning(f"[{portal_name.upper()}] Skipped {label}, portal circuit open")
+                    coverage["skipped"].append(label)
+                    checkpoint.update(task_id, status=SKIPPED)
+                    status = SKIPPED
+                except Exception as e:
+                    logger.error(f"Error scraping {portal_name}: {e}")
+                    concurrency.record(portal_name, pages=0, errors=1)
+                    coverage["failed"].append(label)
+                    checkpoint.update(task_id, status=FAILED, error=str(e)[:500])
+                finally:
+                    # The run ledger: what the task cost and what it brought in, whatever its outcome
+                    checkpoint.update(task_id, seconds=round(time.time() - task_started, 1),
+                                      pages=checkpoint.tasks[task_id]["last_page"], offers=stats["offers"],
+                                      kept=stats["kept"], saved=stats["saved"], new_offers=stats["new"],
+                                      updated_offers=stats["saved"] - stats["new"], errors=attempt_errors + job.errors,
+                                      network=meter.total.to_dict())
+                    network.add(meter, stats["new"])
+                    performance.add(perf)
+                    task_span.set(status=status, offers=stats["offers"], new_offers=stats["new"],
+                                  requests=meter.total.requests, bytes=sum(meter.total.bytes.values()), **perf.to_dict())
+                    task_span.end()
+                    metrics.TASKS.inc(portal_name, status)
+                    metrics.TASK_SECONDS.observe(time.time() - task_started, portal_name)
+                    running.pop(task_id, None)
+                    if phase == FIRST_PAGES:
+                        first_pages_done[key].set()
+                    completed += 1
+                    report(f"{label} done")
+
+            results = await concurrency.map(phases, lambda phased_item: phased_item[2][0], scrape_task)
+            for (_, phase, item), result in zip(phases, results):
+                if isinstance(result, Exception):
+                    # scrape_task handles its own errors; this one escaped it, but the other tasks ran on
+                    coverage["failed"].append(f"{item[0].title()} - {item[3][0] if item[3] else 'All'} ({phase}): {result!r}")
+            await ingest.close()
+            logger.info(f"Ingestion pipeline: {ingest.stats()}")
+            checkpoint.finish()
         
-        # Final update
-        if progress_callback:
-            progress_callback(total_tasks, total_tasks, "Done")
+            enrichment_skipped = 0
+            if enricher:
+                if progress_callback:
+                    progress_callback(max(total_tasks - 1, 0), total_tasks, f"Enriching {enricher.queue.qsize()} new offers")
+                enrichment_skipped = await enricher.close(drain=not supervisor.out_of_time())
+                network.add(enricher.network)
 
-        await browser.close()
-        logger.info(f"Total offers: {len(all_gathered)}")
+            run_report = {
+                "run_id": run_id,
+                "resumed": resumed,
+                "unfinished_tasks": sum(1 for t in checkpoint.tasks if t["status"] != DONE),
+                "budget_seconds": budget_seconds,
+                "elapsed_seconds": round(time.time() - started_at, 1),
+                "tasks": total_tasks,
+                "offers": saved_total,
+                "new_offers": new_total,
+                **coverage,
+                "enrichment_skipped": enrichment_skipped,
+                "pipeline": ingest.stats(),
+                "network": network.to_dict(),
+            }
+            if performance.portals:
+                run_report["page_performance"] = performance.to_dict()
+            checkpoint.record_report(run_report)
+            network.publish()
+            summary = ", ".join(f"{len(coverage[k])} {k.replace('_', ' ')}" for k in coverage if coverage[k])
+
+            # Final update
+            if progress_callback:
+                progress_callback(total_tasks, total_tasks, f"Done ({summary})" if summary else "Done")
+
+            logger.info(f"Total offers: {saved_total}")
+            logger.info(f"Browser memory: {governor.stats()}")
+            for portal, usage in run_report["network"].items():
+                per_offer = f"{usage['bytes_per_new_offer'] / 1024:.0f} KiB per new offer" if usage["bytes_per_new_offer"] else "no new offers"
+                logger.info(f"Network [{portal}]: {usage['requests']} requests, {usage['bytes'] / 2**20:.1f} MiB, "
+                            f"{usage['cache_hits']} cache hits, {per_offer}")
+            for portal, perf_stats in run_report.get("page_performance", {}).items():
+                logger.info(f"Renderer [{portal}]: {perf_stats['script_seconds_per_page']}s script, "
+                            f"{perf_stats['layout_seconds_per_page'] + perf_stats['style_seconds_per_page']:.3f}s layout/style per page, "
+                            f"JS heap up to {perf_stats['max_js_heap_mb']} MB, {perf_stats['max_dom_nodes']} DOM nodes")
+            if cache:
+                logger.info(f"HTML cache: {cache.stats()}")
+            if archive:
+                logger.info(f"Archived {archive.count} cards to {archive.directory}")
+            run_span.set(offers=saved_total, new_offers=new_total)
+            for kind in coverage:
+                for label in coverage[kind]:
+                    logger.warning(f"Coverage {kind.replace('_', ' ')}: {label}")
+            if enrichment_skipped:
+                logger.warning(f"Coverage: {enrichment_skipped} new offers not enriched (time budget)")
+        finally:
+            # Also on errors and cancellation: stop the workers, free the browser and keep what the run learned
+            if ingest:
+                await ingest.close()
+            if enricher:
+                await enricher.close(drain=False)
+            if checkpoint:
+                if checkpoint.data.get("status") == RUNNING:
+                    checkpoint.finish(INTERRUPTED)
+                await checkpoint.flush()
+            concurrency.save()
+            history.save()
+            rate.save()
+            await governor.close()
+            run_span.end()
+            tracing.flush()
+    return run_report
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run all enabled portal scrapers")
+    parser.add_argument("--enrich", action=argparse.BooleanOptionalAction, default=None,
+                        help="Check build year of new offers (default: config 'enrichment.enabled')")
+    parser.add_argument("--budget-minutes", type=float, default=None,
+                        help="Finish within this many minutes: first pages of every task first, then deeper pages while time remains")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the newest interrupted run (state/runs) instead of starting over")
+    parser.add_argument("--profile", choices=profiling.KINDS, default=None,
+                        help="Profile the run (sampled CPU stacks or tracemalloc allocation sites) into profiles/")
+    args = parser.parse_args()
     setup_logging()
-    asyncio.run(run_scraper())
+    budget = args.budget_minutes * 60 if args.budget_minutes else None
+    with open(CONFIG_FILE, 'r') as f:
+        cli_config = json.load(f)
+    with profiling.profiled(args.profile, datetime.now().strftime("run_%Y%m%d_%H%M%S"), cli_config):
+        asyncio.run(run_scraper(enrich=args.enrich, budget_seconds=budget, resume=args.resume))
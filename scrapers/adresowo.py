@@ -2,31 +2,30 @@ from scrapers.base import BaseScraper
 from playwright.async_api import Page, Locator
 import logging
 import re
+from typing import AsyncIterator
 
 class AdresowoScraper(BaseScraper):
+    CARD_TYPE = "locator"
+
     def __init__(self, config):
         super().__init__("adresowo", config)
         # Assuming base_url is something like "https://adresowo.pl/mieszkania/gdansk/"
         # We will dynamically build it, but config might have the city base.
 
-    async def scrape(self, page: Page, url: str, max_pages: int = 0) -> list:
-        offers = []
+    async def scrape_pages(self, page: Page, url: str, max_pages: int = 0) -> AsyncIterator[list]:
         current_url = url
         page_num = 1
         
         while True:
             self.logger.info(f"Scraping page {page_num}: {current_url}")
             try:
-                await page.goto(current_url, wait_until="domcontentloaded", timeout=60000)
+                await self.goto(page, current_url, wait_until="domcontentloaded", timeout=60000)
             except Exception as e:
                 self.logger.error(f"Failed to load page {current_url}: {e}")
                 break
             
-            # Wait for results or empty list
-            try:
-                await page.wait_for_selector(".result-list, .search-no-results", timeout=5000)
-            except:
-                pass
+            # Wait for results; an empty list ends pagination below
+            await self.wait_until_ready(page, "a[href^='/o/']", timeout=5000)
             
             # Use specific offer link structure
             offer_locators = await page.locator("a[href^='/o/']").all()
@@ -36,15 +35,18 @@ class AdresowoScraper(BaseScraper):
                 self.logger.info("No more offers found.")
                 break
 
+            page_offers = []
             for offer_loc in offer_locators:
                 try:
-                    offer = await self.parse_offer(offer_loc)
+                    offer = await self.parse_card(offer_loc)
                     if offer:
-                        offers.append(offer)
+                        page_offers.append(offer)
                 except Exception as e:
-                    self.logger.error(f"Error parsing offer: {e}")
+                    self.logger.error("Error parsing offer: %s", e, extra={"sampled": True})
+            await self.archive_cards(page, offer_locators)
+            yield page_offers
             
-            if max_pages > 0 and page_num >= max_pages:
+            if self.should_stop(page_num, max_pages):
                 break
 
             # Pagination: /_l2, /_l3 etc appended to base
@@ -62,10 +64,8 @@ class AdresowoScraper(BaseScraper):
             
             # If no next button, stop
             break
-            
-        return offers
 
-    async def parse_offer(self, link_el: Locator):
+    async def parse_card(self, link_el: Locator):
         # The element itself is the <a> link
         href = await link_el.get_attribute("href")
         full_url = "https://adresowo.pl" + href if href and not href.startswith("http") else href
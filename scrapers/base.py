@@ -1,17 +1,305 @@
 import re
+import time
+import asyncio
 import logging
-from playwright.async_api import Page
+import functools
+import weakref
+import contextlib
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 from abc import ABC, abstractmethod
+from typing import AsyncIterator
+from urllib.parse import urlparse, parse_qs, urlencode
+from html_cache import get_cache
+from rate_control import get_controller
+import consent
+import metrics
+import tracing
+
+READY_SCRIPT = """
+([selector, quietMs, timeoutMs]) => new Promise(resolve => {
+    const count = () => selector
+        ? Array.from(document.querySelectorAll(selector)).filter(el => !el.hasAttribute('data-scrappy-stale')).length
+        : -1;
+    let last = count();
+    let quietTimer = null;
+    const finish = () => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(deadline);
+        resolve(count());
+    };
+    const arm = () => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => {
+            if (selector && count() === 0) { arm(); return; }
+            finish();
+        }, quietMs);
+    };
+    const observer = new MutationObserver(() => {
+        if (!selector) { arm(); return; }
+        const now = count();
+        if (now !== last) { last = now; arm(); }
+    });
+    observer.observe(document.documentElement || document, { childList: true, subtree: true });
+    const deadline = setTimeout(finish, timeoutMs);
+    arm();
+})
+"""
+
+# page -> callback(has_cards), see observe_pages()
+_page_observers = weakref.WeakKeyDictionary()
+# page -> time.time() its cards settled, the start of the parse span
+_cards_ready = weakref.WeakKeyDictionary()
+
+def observe_pages(page: Page, callback):
+    """Calls callback(has_cards) for every listing page scraped on page, and for every empty one."""
+    _page_observers[page] = callback
+
+def _counted(parse_card):
+    """Wraps a scraper's parse_card() to count cards and parse failures per portal."""
+    @functools.wraps(parse_card)
+    async def wrapper(self, card):
+        metrics.CARDS_PARSED.inc(self.portal_name)
+        try:
+            return await parse_card(self, card)
+        except Exception:
+            metrics.PARSE_FAILURES.inc(self.portal_name)
+            raise
+    return wrapper
 
 class BaseScraper(ABC):
+    """
+    A portal scraper implements parse_card() and either scrape_pages() or,
+    for legacy scrapers, scrape(), which scrape_pages() then wraps.
+    """
+    # Bump when parse_card() output changes, so archived cards can be told apart
+    SCRAPER_VERSION = "1"
+    # parse_card() expects an ElementHandle ("handle") or a Locator ("locator")
+    CARD_TYPE = "handle"
+    # Query parameter that opens listing page N directly; None where pages are only reached by clicking "next"
+    PAGE_PARAM = None
+
     def __init__(self, portal_name: str, config: dict):
         self.portal_name = portal_name
         self.config = config
         self.logger = logging.getLogger(f"scraper.{portal_name}")
-        
-    @abstractmethod
+        self.cache = get_cache(config)
+        self.rate = get_controller(config)
+        self.archive = None  # CardArchive, set per run by run_scraper
+        self.deadline = None  # time.monotonic() at which a budgeted run stops paginating
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "parse_card" in cls.__dict__:
+            cls.parse_card = _counted(cls.__dict__["parse_card"])
+
+    async def scrape_pages(self, page: Page, url: str, max_pages: int = 0) -> AsyncIterator[list]:
+        """
+        Yields the offers of each listing page as soon as it is parsed, so the
+        caller can persist them while the next page loads. Scrapers that only
+        implement scrape() yield all their offers once, at the end.
+        """
+        if type(self).scrape is BaseScraper.scrape:
+            raise NotImplementedError(f"{type(self).__name__} implements neither scrape_pages() nor scrape()")
+        yield await self.scrape(page, url, max_pages)
+
+    def page_url(self, url: str, number: int):
+        """URL of listing page `number` of the search, or None if the portal has no page parameter."""
+        if not self.PAGE_PARAM:
+            return None
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        query[self.PAGE_PARAM] = [str(number)]
+        return parsed._replace(query=urlencode(query, doseq=True)).geturl()
+
+    async def scrape_from(self, page: Page, url: str, max_pages: int = 0, start_page: int = 1) -> AsyncIterator[list]:
+        """
+        scrape_pages() from listing page start_page on, for a pass that follows
+        one which already scraped the earlier pages. Portals with a PAGE_PARAM
+        open start_page directly; the others click through the earlier pages
+        and leave their offers out.
+        """
+        if max_pages and start_page > max_pages:
+            return
+        target = self.page_url(url, start_page) if start_page > 1 else url
+        if target:
+            remaining = max_pages - start_page + 1 if max_pages else 0
+            async for page_offers in self.scrape_pages(page, target, remaining):
+                yield page_offers
+            return
+        seen = 0
+        async for page_offers in self.scrape_pages(page, url, max_pages):
+            seen += 1
+            if seen >= start_page:
+                yield page_offers
+
     async def scrape(self, page: Page, url: str, max_pages: int = 0) -> list:
-        pass
+        """All offers of the search at once."""
+        offers = []
+        async for page_offers in self.scrape_pages(page, url, max_pages):
+            offers.extend(page_offers)
+        return offers
+
+    @abstractmethod
+    async def parse_card(self, card) -> dict:
+        """Parses a single listing card into an offer dict (or None to skip it)."""
+        raise NotImplementedError
+
+    def should_stop(self, pages_done: int, max_pages: int) -> bool:
+        """True once max_pages listing pages are scraped (0 = no limit) or the run's time budget is spent."""
+        if max_pages > 0 and pages_done >= max_pages:
+            return True
+        if self.deadline and time.monotonic() >= self.deadline:
+            self.logger.info(f"Time budget spent, stopping after {pages_done} page(s)")
+            return True
+        return False
+
+    async def archive_cards(self, page: Page, cards):
+        """
+        Stores the raw HTML of the page's cards for offline re-parsing (see reparse.py).
+        Every scraper calls this once per listing page, so it also reports the page to observe_pages().
+        """
+        ready_at = _cards_ready.pop(page, None)
+        if ready_at:
+            tracing.record("parse cards", ready_at, portal=self.portal_name, cards=len(cards))
+        observer = _page_observers.get(page)
+        if observer and cards:
+            observer(True)
+        if not self.archive or not cards:
+            return
+        try:
+            with tracing.span("archive cards", cards=len(cards)):
+                htmls = await asyncio.gather(*(card.evaluate("el => el.outerHTML") for card in cards), return_exceptions=True)
+                htmls = [h if isinstance(h, str) else "" for h in htmls]
+                await asyncio.to_thread(self.archive.add, self.portal_name, self.SCRAPER_VERSION, page.url, htmls)
+        except Exception as e:
+            self.logger.warning(f"Could not archive cards: {e}")
+
+    async def accept_consent(self, page: Page, selector: str, timeout: int = 3000, wait: bool = True) -> bool:
+        """
+        Clicks the portal's consent button, unless this context already carries the
+        saved consent state (see consent.py) or consent was given earlier in it.
+        With wait=False the button is only clicked if it is already in the DOM.
+        Returns True only if a click happened now.
+        """
+        if consent.is_handled(page.context, self.portal_name):
+            return False
+        try:
+            with tracing.span("consent", portal=self.portal_name, wait=wait):
+                if wait:
+                    await page.click(selector, timeout=timeout)
+                else:
+                    button = await page.query_selector(selector)
+                    if not button:
+                        return False
+                    await button.click(timeout=timeout)
+        except Exception:
+            return False
+        consent.mark_accepted(page.context, self.portal_name)
+        self.logger.info("Consent accepted")
+        return True
+
+    async def remove_overlays(self, page: Page, selector: str):
+        """Removes blocking CMP overlays, not needed when the context suppresses them."""
+        if consent.is_primed(page.context, self.portal_name):
+            return
+        await page.evaluate("""
+            (selector) => {
+                document.querySelectorAll(selector).forEach(el => el.remove());
+            }
+        """, selector)
+
+    async def wait_until_ready(self, page: Page, selector: str = None, timeout: int = 10000, quiet_ms: int = 300) -> int:
+        """
+        Waits for the listing to settle instead of sleeping a fixed time.
+        With a selector: until at least one matching card exists (ignoring cards
+        marked by mark_stale()) and the count has not changed for quiet_ms.
+        Without: until the DOM has had no mutations for quiet_ms.
+        Gives up after timeout ms and returns the current card count (-1 without selector).
+        With a selector the outcome also feeds the host's rate control: cards
+        found count as a healthy page, none as an empty or captcha page.
+        """
+        started = time.monotonic()
+        with tracing.span("wait for cards", portal=self.portal_name, selector=selector) as span:
+            count = await self._wait_for_cards(page, selector, timeout, quiet_ms)
+            span.set(cards=count)
+        if selector:
+            metrics.SELECTOR_WAIT_SECONDS.observe(time.monotonic() - started, self.portal_name)
+            if tracing.is_enabled():
+                _cards_ready[page] = time.time()
+            if count > 0:
+                self.rate.record(page.url, "ok")
+            else:
+                metrics.EMPTY_PAGES.inc(self.portal_name)
+                outcome = await self.rate.check_empty_page(page)
+                self.logger.warning(f"No cards on {page.url} ({outcome})")
+                observer = _page_observers.get(page)
+                if observer:
+                    observer(False)
+        return count
+
+    async def _wait_for_cards(self, page: Page, selector: str, timeout: int, quiet_ms: int) -> int:
+        try:
+            return await page.evaluate(READY_SCRIPT, [selector, quiet_ms, timeout])
+        except Exception as e:
+            # Navigation replaced the document mid-wait; settle on the new one
+            self.logger.debug(f"Readiness wait interrupted: {e}")
+            try:
+                await page.wait_for_load_state("domcontentloaded", timeout=timeout)
+                return await page.evaluate(READY_SCRIPT, [selector, quiet_ms, timeout])
+            except Exception:
+                return 0
+
+    async def mark_stale(self, page: Page, selector: str):
+        """Tags the current cards, so wait_until_ready() after an in-page pagination waits for new ones."""
+        try:
+            await page.evaluate("(selector) => document.querySelectorAll(selector).forEach(el => el.setAttribute('data-scrappy-stale', '1'))", selector)
+        except Exception:
+            pass
+
+    async def click_and_wait(self, page: Page, element, response_pattern: str, timeout: int = 10000, **click_kwargs):
+        """Clicks and waits for the listing XHR matching response_pattern (regex) to complete."""
+        try:
+            async with page.expect_response(lambda r: re.search(response_pattern, r.url) is not None, timeout=timeout):
+                await element.click(**click_kwargs)
+            metrics.PAGES_FETCHED.inc(self.portal_name, "click")
+        except Exception as e:
+            self.logger.debug(f"No listing response after click: {e}")
+
+    async def polite_delay(self, page: Page):
+        """
+        Waits for the page's host to accept the next request (see rate_control.py).
+        The adaptive rate never exceeds 1 / 'politeness.min_delay_seconds'.
+        """
+        await self.rate.acquire(page.url)
+
+    async def goto(self, page: Page, url: str, **kwargs):
+        """
+        page.goto that answers the document from the HTML cache when a fresh copy
+        exists (cache.listing_max_age_minutes, off by default), and otherwise
+        waits for the host's rate control first.
+        """
+        source = "network"
+        serving = contextlib.nullcontext(False)
+        if self.cache and self.cache.listing_max_age:
+            serving = self.cache.serving(page, url, self.cache.listing_max_age, rate=self.rate)
+        async with serving as from_cache:
+            if from_cache:
+                self.logger.debug(f"Serving {url} from HTML cache")
+                source = "cache"
+            else:
+                await self.rate.acquire(url)
+            started = time.monotonic()
+            try:
+                with tracing.span("goto", portal=self.portal_name, url=url, source=source):
+                    response = await page.goto(url, **kwargs)
+            except PlaywrightTimeoutError:
+                self.rate.record(url, "timeout")
+                raise
+            finally:
+                metrics.GOTO_SECONDS.observe(time.monotonic() - started, self.portal_name)
+        metrics.PAGES_FETCHED.inc(self.portal_name, source)
+        return response
 
     def safe_text(self, text: str) -> str:
         if not text:
@@ -2,13 +2,16 @@ from scrapers.base import BaseScraper
 from playwright.async_api import Page, Locator
 import logging
 import re
+from typing import AsyncIterator
 
 class DomiportaScraper(BaseScraper):
+    CARD_TYPE = "locator"
+    PAGE_PARAM = "PageNumber"
+
     def __init__(self, config):
         super().__init__("domiporta", config)
 
-    async def scrape(self, page: Page, url: str, max_pages: int = 0) -> list:
-        offers = []
+    async def scrape_pages(self, page: Page, url: str, max_pages: int = 0) -> AsyncIterator[list]:
         current_url = url
         page_num = 1
         
@@ -16,23 +19,17 @@ class DomiportaScraper(BaseScraper):
             self.logger.info(f"Scraping page {page_num}: {current_url}")
             try:
                 # Domiporta can be slow or use client-side rendering
-                await page.goto(current_url, wait_until="domcontentloaded", timeout=60000)
+                await self.goto(page, current_url, wait_until="domcontentloaded", timeout=60000)
             except Exception as e:
                 self.logger.error(f"Failed to load page {current_url}: {e}")
                 break
 
             # Cookie consent - Try to close it if it exists
-            try:
-                # Common cookie selectors
-                await page.locator("button#onetrust-accept-btn-handler, button[class*='audit-allow-all']").click(timeout=2000)
-            except:
-                pass
+            # Common cookie selectors
+            await self.accept_consent(page, "button#onetrust-accept-btn-handler, button[class*='audit-allow-all']", timeout=2000)
 
             # Wait for articles to appear
-            try:
-                await page.wait_for_selector("article.sneakpeak", timeout=5000)
-            except:
-                self.logger.warning("No offers found on page (selector timeout).")
+            if not await self.wait_until_ready(page, "article.sneakpeak", timeout=5000):
                 break
 
             articles = await page.locator("article.sneakpeak").all()
@@ -41,15 +38,18 @@ class DomiportaScraper(BaseScraper):
             if not articles:
                 break
 
+            page_offers = []
             for article in articles:
                 try:
-                    offer = await self.parse_offer(article)
+                    offer = await self.parse_card(article)
                     if offer:
-                        offers.append(offer)
+                        page_offers.append(offer)
                 except Exception as e:
-                    self.logger.error(f"Error parsing offer: {e}")
+                    self.logger.error("Error parsing offer: %s", e, extra={"sampled": True})
+            await self.archive_cards(page, articles)
+            yield page_offers
             
-            if max_pages > 0 and page_num >= max_pages:
+            if self.should_stop(page_num, max_pages):
                 break
             
             # Pagination
@@ -64,10 +64,8 @@ class DomiportaScraper(BaseScraper):
                         continue
             
             break
-                 
-        return offers
 
-    async def parse_offer(self, article: Locator):
+    async def parse_card(self, article: Locator):
         id_val = await article.get_attribute("data-detail-id")
         
         # Title
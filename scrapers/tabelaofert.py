@@ -1,45 +1,40 @@
-import asyncio
-import re
 from .base import BaseScraper
 from playwright.async_api import Page
+from typing import AsyncIterator
 
 class TabelaofertScraper(BaseScraper):
     def __init__(self, config):
         super().__init__("tabelaofert", config)
 
-    async def scrape(self, page: Page, url: str, max_pages: int = 0) -> list:
+    async def scrape_pages(self, page: Page, url: str, max_pages: int = 0) -> AsyncIterator[list]:
         self.logger.info(f"Scraping Tabelaofert: {url}")
         
         # Build URL with filters if not already present
         # Note: scraper.py calls build_url which we will update later
         # For now, let's assume the URL is already prepared or we handle it here if it's a base URL
         
-        await page.goto(url, wait_until="domcontentloaded")
+        await self.goto(page, url, wait_until="domcontentloaded")
         
         # Accept cookies
-        try:
-            # Often it's an overlay or specific button
-            await page.click("button#onetrust-accept-btn-handler", timeout=3000)
-        except:
-            pass
+        # Often it's an overlay or specific button
+        await self.accept_consent(page, "button#onetrust-accept-btn-handler")
             
-        all_offers = []
         current_page = 1
         
         while True:
-            if max_pages > 0 and current_page > max_pages:
+            if self.should_stop(current_page - 1, max_pages):
                 break
                 
-            self.logger.info(f"Tabelaofert Page {current_page}")
+            self.logger.info("Tabelaofert Page %d", current_page)
             # Wait for dynamic content (React)
-            await asyncio.sleep(2)
+            await self.wait_until_ready(page, 'div[class*="Oferta-module"]')
 
             # Selector for offer cards based on subagent research
-            cards = await page.query_selector_all('div[class*="Oferta-module-scss-module__D3hq-q__oferta"]')
+            cards = await page.query_selector_all('div[class*="Oferta-module-scss-module__D3hq-q__oferta"]:not([data-scrappy-stale])')
             
             if not cards:
                 # Fallback if class changes slightly
-                cards = await page.query_selector_all('div[class*="Oferta-module"]')
+                cards = await page.query_selector_all('div[class*="Oferta-module"]:not([data-scrappy-stale])')
             
             if not cards:
                 self.logger.warning("No offers found on page.")
@@ -48,50 +43,15 @@ class TabelaofertScraper(BaseScraper):
             page_offers = []
             for card in cards:
                 try:
-                    # Extracts using identified selectors
-                    title_el = await card.query_selector('a[class*="OfertaNazwa-module-scss-module__lEAnAW__link"] h3')
-                    link_el = await card.query_selector('a[class*="OfertaNazwa-module-scss-module__lEAnAW__link"]')
-                    price_el = await card.query_selector('div[class*="OfertaCena-module-scss-module__38hH9S__cena"]')
-                    area_el = await card.query_selector('div[class*="Metraz-module-scss-module__nEYmRG__metraz"]')
-                    loc_el = await card.query_selector('div[class*="OfertaLokalizacja-module-scss-module__"]')
-
-                    title = self.safe_text(await title_el.inner_text()) if title_el else "Tabelaofert Offer"
-                    link = await link_el.get_attribute("href") if link_el else ""
-                    if link and not link.startswith("http"):
-                        link = "https://tabelaofert.pl" + link
-                    
-                    price_text = await price_el.inner_text() if price_el else ""
-                    area_text = await area_el.inner_text() if area_el else ""
-                    location = self.safe_text(await loc_el.inner_text()) if loc_el else "N/A"
-
-                    # Normalize
-                    price = self.normalize_price(price_text)
-                    area = self.normalize_area(area_text)
-                    
-                    # Area matches "50.5 m²" usually, normalize_area handles m2/m²
-                    
-                    # Extract floor/garden from text if available 
-                    # Usually Tabelaofert has icons or specific text for these items
-                    full_text = await card.inner_text()
-                    floor = self.parse_floor(full_text)
-                    garden = self.check_garden(full_text)
-
-                    if link:
-                        page_offers.append({
-                            "url": link,
-                            "title": title,
-                            "price": price,
-                            "area": area,
-                            "price_per_m2": round(price / area, 2) if price and area else None,
-                            "location": location,
-                            "source": "tabelaofert",
-                            "floor": floor,
-                            "garden": garden
-                        })
+                    offer = await self.parse_card(card)
+                    if offer:
+                        page_offers.append(offer)
                 except Exception as e:
-                    self.logger.debug(f"Error parsing card: {e}")
+                    self.logger.debug("Error parsing card: %s", e, extra={"sampled": True})
             
-            all_offers.extend(page_offers)
+            await self.archive_cards(page, cards)
+            
+            yield page_offers
             
             # Pagination
             try:
@@ -106,11 +66,54 @@ class TabelaofertScraper(BaseScraper):
                     if is_disabled:
                         break
                         
+                    await self.polite_delay(page)
+                    # In-page pagination, the next loop waits for fresh cards
+                    await self.mark_stale(page, 'div[class*="Oferta-module"]')
                     await next_btn.click()
                     current_page += 1
                 else:
                     break
             except:
                 break
-                
-        return all_offers
+
+    async def parse_card(self, card):
+        # Extracts using identified selectors
+        title_el = await card.query_selector('a[class*="OfertaNazwa-module-scss-module__lEAnAW__link"] h3')
+        link_el = await card.query_selector('a[class*="OfertaNazwa-module-scss-module__lEAnAW__link"]')
+        price_el = await card.query_selector('div[class*="OfertaCena-module-scss-module__38hH9S__cena"]')
+        area_el = await card.query_selector('div[class*="Metraz-module-scss-module__nEYmRG__metraz"]')
+        loc_el = await card.query_selector('div[class*="OfertaLokalizacja-module-scss-module__"]')
+
+        title = self.safe_text(await title_el.inner_text()) if title_el else "Tabelaofert Offer"
+        link = await link_el.get_attribute("href") if link_el else ""
+        if link and not link.startswith("http"):
+            link = "https://tabelaofert.pl" + link
+
+        price_text = await price_el.inner_text() if price_el else ""
+        area_text = await area_el.inner_text() if area_el else ""
+        location = self.safe_text(await loc_el.inner_text()) if loc_el else "N/A"
+
+        # Normalize
+        price = self.normalize_price(price_text)
+        area = self.normalize_area(area_text)
+
+        # Area matches "50.5 m²" usually, normalize_area handles m2/m²
+
+        # Extract floor/garden from text if available
+        # Usually Tabelaofert has icons or specific text for these items
+        full_text = await card.inner_text()
+        floor = self.parse_floor(full_text)
+        garden = self.check_garden(full_text)
+
+        if link:
+            return {
+                "url": link,
+                "title": title,
+                "price": price,
+                "area": area,
+                "price_per_m2": round(price / area, 2) if price and area else None,
+                "location": location,
+                "source": "tabelaofert",
+                "floor": floor,
+                "garden": garden
+            }
@@ -1,14 +1,22 @@
 import pandas as pd
 import os
 import logging
+import threading
+import time
 from datetime import datetime
 from logger_config import setup_logging
+import metrics
+import tracing
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 CSV_FILE = "offers.csv"
-COLUMNS = ["no", "url", "title", "price", "area", "price_per_m2", "location", "floor", "garden", "source", "scraped_at", "is_favorite", "is_hidden"]
+COLUMNS = ["no", "url", "title", "price", "area", "price_per_m2", "location", "floor", "garden", "year_built", "source", "scraped_at", "is_favorite", "is_hidden"]
+
+# Scraper, enrichment worker and API handlers all write the same CSV from
+# different threads (asyncio.to_thread), so read-modify-write must be serialized.
+_write_lock = threading.RLock()
 
 def load_offers():
     if not os.path.exists(CSV_FILE):
@@ -26,16 +34,26 @@ def load_offers():
         logger.error(f"Error loading CSV: {e}")
         return pd.DataFrame(columns=COLUMNS)
 
-def save_offers(new_offers: list[dict]):
+def save_offers(new_offers: list[dict]) -> list[str]:
     """
     Saves new offers to the CSV file with deduplication based on URL.
     Preserves existing 'is_favorite' and 'is_hidden' flags.
+    Returns the URLs that were not in the CSV before this call.
     """
-    existing_df = load_offers()
-    
     if not new_offers:
         logger.info("No new offers to save.")
-        return
+        return []
+
+    with _write_lock, tracing.span("save offers", rows=len(new_offers)):
+        started = time.monotonic()
+        try:
+            return _save_offers(new_offers)
+        finally:
+            metrics.STORAGE_WRITE_SECONDS.observe(time.monotonic() - started)
+            metrics.STORAGE_ROWS_WRITTEN.inc(amount=len(new_offers))
+
+def _save_offers(new_offers: list[dict]) -> list[str]:
+    existing_df = load_offers()
 
     new_df = pd.DataFrame(new_offers)
     
@@ -59,6 +77,7 @@ def save_offers(new_offers: list[dict]):
     existing_dict = existing_df.set_index("url").to_dict(orient="index")
     
     merged_list = []
+    added_urls = []
     
     # Process new offers
     for index, row in new_df.iterrows():
@@ -71,6 +90,11 @@ def save_offers(new_offers: list[dict]):
             # Maybe keep original scraped_at? Or update it? Let's update it to show it's still active.
             # But user might want to know when it was FIRST found. Let's keep original scraped_at.
             row["scraped_at"] = existing_row.get("scraped_at", row["scraped_at"])
+            # Keep enrichment results, the listing card never carries them
+            if pd.isna(row.get("year_built")):
+                row["year_built"] = existing_row.get("year_built")
+        else:
+            added_urls.append(url)
         
         merged_list.append(row.to_dict())
         
@@ -103,11 +127,74 @@ def save_offers(new_offers: list[dict]):
     final_df = final_df[COLUMNS] # Reorder
     final_df.to_csv(CSV_FILE, index=False)
     logger.info(f"Saved {len(final_df)} offers to {CSV_FILE}")
+    return added_urls
 
 def update_offer_status(url: str, field: str, value: bool):
-    df = load_offers()
-    if url in df["url"].values:
-        df.loc[df["url"] == url, field] = value
-        df.to_csv(CSV_FILE, index=False)
-        return True
-    return False
+    return update_offer_fields(url, {field: value})
+
+def update_offer_fields(url: str, fields: dict):
+    """
+    Updates several columns of a single offer in place.
+    Returns False if the URL is not in the CSV.
+    """
+    return update_offers_fields({url: fields}) == 1
+
+def update_offers_fields(updates: dict) -> int:
+    """
+    Applies {url: {field: value}} to many offers with one read and one write of
+    the CSV. Unknown URLs are ignored; returns the number of offers updated.
+    """
+    if not updates:
+        return 0
+    with _write_lock:
+        df = load_offers()
+        index = {url: i for i, url in zip(df.index, df["url"])}
+        updated = 0
+        for url, fields in updates.items():
+            i = index.get(url)
+            if i is None:
+                continue
+            for field, value in fields.items():
+                if field not in df.columns:
+                    df[field] = None
+                if df[field].dtype != object:
+                    df[field] = df[field].astype(object)
+                df.at[i, field] = value
+            updated += 1
+        if updated:
+            df.to_csv(CSV_FILE, index=False)
+        return updated
+
+def backfill_offers(offers: list[dict], fields: list[str]) -> int:
+    """
+    Overwrites the given fields of offers that are already in the CSV.
+    Unknown URLs are ignored and None values never replace stored data.
+    Returns the number of offers that changed.
+    """
+    if not offers:
+        return 0
+    with _write_lock:
+        df = load_offers()
+        index = {url: i for i, url in zip(df.index, df["url"])}
+        changed = 0
+        for field in fields:
+            if field in df.columns:
+                df[field] = df[field].astype(object)
+        for offer in offers:
+            i = index.get(offer.get("url"))
+            if i is None:
+                continue
+            row_changed = False
+            for field in fields:
+                value = offer.get(field)
+                if value is None or field not in df.columns:
+                    continue
+                current = df.at[i, field]
+                if pd.isna(current) or current != value:
+                    df.at[i, field] = value
+                    row_changed = True
+            changed += row_changed
+        if changed:
+            df.to_csv(CSV_FILE, index=False)
+            logger.info(f"Backfilled {changed} offers in {CSV_FILE}")
+        return changed
@@ -0,0 +1,177 @@
+import time
+import random
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_GRACE = 30  # seconds a budgeted run gives running attempts to finish their current page
+
+class TaskTimeout(Exception):
+    pass
+
+class PortalSkipped(Exception):
+    pass
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failed tasks of a portal and stays open for the run."""
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.failures = 0
+        self.open = False
+
+    def success(self):
+        self.failures = 0
+
+    def failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.open = True
+
+async def close_quietly(closable, timeout: float = 10):
+    """Closes a page or context without letting a wedged browser hang the caller."""
+    try:
+        await asyncio.wait_for(closable.close(), timeout)
+    except Exception:
+        pass
+
+class TaskSupervisor:
+    """
+    Runs scrape attempts under deadlines:
+    - the whole task must finish within watchdog.task_timeout_seconds (or 3x its
+      historical duration when that is shorter, but never below min_task_timeout_seconds),
+    - each listing page must follow the previous one within page_timeout_seconds,
+    - an attempt stuck on a page longer than the portal's historical p95 page
+      time gets one hedged attempt running next to it, if the concurrency
+      controller has a free slot for the portal; the first to finish wins,
+    - failed attempts are retried with exponential backoff,
+    - a portal whose tasks keep failing is skipped for the rest of the run.
+
+    attempt(on_page) must tear down its own page/context in a finally block;
+    expired attempts are cancelled, which runs that teardown.
+    """
+    def __init__(self, config: dict, history=None, deadline: float = None, concurrency=None):
+        conf = config.get("watchdog", {})
+        self.history = history
+        self.concurrency = concurrency  # hedged attempts hold a slot of their own
+        self.deadline = deadline  # time.monotonic() at which a budgeted run ends
+        self.task_timeout = float(conf.get("task_timeout_seconds", 900))
+        self.min_task_timeout = float(conf.get("min_task_timeout_seconds", 120))
+        self.page_timeout = float(conf.get("page_timeout_seconds", 90))
+        self.retries = int(conf.get("retries", 2))
+        self.backoff = float(conf.get("backoff_seconds", 5))
+        self.hedge = conf.get("hedge", True)
+        self.breaker_failures = int(conf.get("breaker_failures", 3))
+        self.breakers = {}
+        self.page_times = {}  # task label -> page load times of the winning attempt
+
+    def breaker(self, portal: str) -> CircuitBreaker:
+        if portal not in self.breakers:
+            self.breakers[portal] = CircuitBreaker(self.breaker_failures)
+        return self.breakers[portal]
+
+    def is_open(self, portal: str) -> bool:
+        return self.breaker(portal).open
+
+    def _deadline(self, portal, district):
+        if self.history and self.history.has(portal, district):
+            timeout = max(self.min_task_timeout, min(self.task_timeout, 3 * self.history.estimate(portal, district)))
+        else:
+            timeout = self.task_timeout
+        if self.deadline:
+            timeout = min(timeout, self.deadline + DEADLINE_GRACE - time.monotonic())
+        return timeout
+
+    def _hedge_slot(self, portal) -> bool:
+        return self.concurrency is None or self.concurrency.try_acquire(portal)
+
+    def out_of_time(self) -> bool:
+        return bool(self.deadline) and time.monotonic() >= self.deadline
+
+    async def run(self, portal: str, district: str, attempt, label: str = None):
+        """Returns the result of the first successful attempt, or raises the last error."""
+        label = label or portal
+        breaker = self.breaker(portal)
+        error = None
+        for attempt_no in range(self.retries + 1):
+            if breaker.open:
+                raise PortalSkipped(f"{portal} circuit open")
+            try:
+                result = await self._supervised(portal, district, attempt, label)
+                breaker.success()
+                return result
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = e
+                logger.warning(f"[{label}] Attempt {attempt_no + 1} failed: {e!r}")
+            if self.out_of_time():
+                # Cut off by the run's time budget, not the portal's fault
+                raise error
+            if attempt_no < self.retries:
+                delay = self.backoff * 2 ** attempt_no * random.uniform(0.8, 1.2)
+                await asyncio.sleep(delay)
+        breaker.failure()
+        if breaker.open:
+            logger.error(f"[{portal.upper()}] {breaker.failures} failed tasks in a row, skipping portal for this run")
+        raise error
+
+    async def _supervised(self, portal, district, attempt, label):
+        started = time.monotonic()
+        deadline = self._deadline(portal, district)
+        p95 = self.history.page_p95(portal) if self.history and self.hedge else None
+        progress = {}  # task -> [last progress time, page times]
+
+        def launch(hedge=False):
+            times = []
+            state = [time.monotonic(), times]
+
+            def on_page(*_):
+                now = time.monotonic()
+                times.append(now - state[0])
+                state[0] = now
+
+            task = asyncio.create_task(attempt(on_page))
+            if hedge and self.concurrency:
+                task.add_done_callback(lambda _: self.concurrency.release(portal))
+            progress[task] = state
+            return task
+
+        tasks = {launch()}
+        abandoned = []
+        hedged = False
+        error = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(tasks, timeout=1)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        self.page_times[label] = progress[task][1]
+                        return task.result()
+                    error = task.exception()
+                if not tasks:
+                    break
+                now = time.monotonic()
+                if now - started > deadline:
+                    raise TaskTimeout(f"task exceeded {deadline:.0f}s")
+                for task in list(tasks):
+                    stalled = now - progress[task][0]
+                    if stalled > self.page_timeout:
+                        logger.warning(f"[{label}] No page progress for {stalled:.0f}s, tearing down attempt")
+                        task.cancel()
+                        tasks.discard(task)
+                        abandoned.append(task)
+                        error = TaskTimeout(f"page exceeded {self.page_timeout:.0f}s")
+                    elif p95 and not hedged and stalled > p95 and not self.out_of_time() and self._hedge_slot(portal):
+                        logger.info(f"[{label}] Page slower than p95 ({p95:.1f}s), starting hedged attempt")
+                        hedged = True
+                        tasks.add(launch(hedge=True))
+            raise error or TaskTimeout("no attempt finished")
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Let cancelled attempts run their teardown before the slot is released
+            leftovers = tasks | set(abandoned)
+            if leftovers:
+                await asyncio.gather(*leftovers, return_exceptions=True)
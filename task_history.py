@@ -0,0 +1,108 @@
+import os
+import json
+import time
+import statistics
+
+STATE_FILE = "state/task_history.json"
+DEFAULT_DURATION = 60.0  # seconds, for tasks never seen before and no history at all
+SMOOTHING = 0.5  # weight of the newest run in the moving averages
+PAGE_SAMPLES = 20  # page load times kept per task
+
+class TaskHistory:
+    """
+    Duration, page count and yield of each (portal, district) task, as moving
+    averages over past runs. Used to start long tasks first and to estimate
+    the remaining time of a run.
+    """
+    def __init__(self, config: dict):
+        sched_conf = config.get("scheduling", {})
+        self.order_by = sched_conf.get("order", "longest_first")
+        self.state_file = sched_conf.get("state_file", STATE_FILE)
+        self.tasks = self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    @staticmethod
+    def key(portal: str, district: str = None) -> str:
+        return f"{portal}|{district or ''}"
+
+    def _default_duration(self, portal):
+        # Unknown district: the portal's typical task, else the typical task overall
+        same_portal = [t["duration"] for k, t in self.tasks.items() if k.startswith(f"{portal}|")]
+        known = same_portal or [t["duration"] for t in self.tasks.values()]
+        return statistics.median(known) if known else DEFAULT_DURATION
+
+    def has(self, portal: str, district: str = None) -> bool:
+        return self.key(portal, district) in self.tasks
+
+    def estimate(self, portal: str, district: str = None) -> float:
+        """Expected duration in seconds."""
+        task = self.tasks.get(self.key(portal, district))
+        return task["duration"] if task else self._default_duration(portal)
+
+    def yield_rate(self, portal: str, district: str = None) -> float:
+        """Expected new offers per second; unknown tasks rank first so they get measured."""
+        task = self.tasks.get(self.key(portal, district))
+        if not task:
+            return float("inf")
+        return task.get("new_offers", 0) / max(task["duration"], 1)
+
+    def order(self, items: list, key_fn, by: str = None) -> list:
+        """
+        Sorts tasks for dispatch: longest expected duration first, or with
+        scheduling.order (or by) "yield", most new offers per second first.
+        key_fn(item) returns (portal, district).
+        """
+        if (by or self.order_by) == "yield":
+            return sorted(items, key=lambda item: self.yield_rate(*key_fn(item)), reverse=True)
+        return sorted(items, key=lambda item: self.estimate(*key_fn(item)), reverse=True)
+
+    def page_p95(self, portal: str, min_samples: int = 10):
+        """95th percentile of the portal's listing page load times, or None with too few samples."""
+        samples = sorted(t for k, task in self.tasks.items() if k.startswith(f"{portal}|")
+                         for t in task.get("page_times", []))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+    def record(self, portal: str, district: str, duration: float, pages: int, offers: int, new_offers: int,
+               page_times: list = None):
+        key = self.key(portal, district)
+        task = self.tasks.get(key)
+        measured = {"duration": duration, "pages": pages, "offers": offers, "new_offers": new_offers}
+        if task:
+            for field, value in measured.items():
+                task[field] = SMOOTHING * value + (1 - SMOOTHING) * task.get(field, value)
+            task["runs"] = task.get("runs", 0) + 1
+        else:
+            task = self.tasks[key] = {**measured, "runs": 1}
+        task["last_duration"] = duration
+        if page_times:
+            task["page_times"] = [round(t, 2) for t in (task.get("page_times", []) + page_times)[-PAGE_SAMPLES:]]
+        task["updated_at"] = time.time()
+
+    def remaining_seconds(self, pending: list, running, parallelism: int) -> float:
+        """
+        Estimated time left: the expected work of pending tasks plus the unfinished
+        part of running ones, spread over the tasks in flight. The longest single
+        task is a lower bound.
+        pending: [(portal, district)], running: [((portal, district), started_at)]
+        """
+        now = time.time()
+        left = [self.estimate(*task) for task in pending]
+        left += [max(self.estimate(*task) - (now - started), 0) for task, started in running]
+        if not left:
+            return 0.0
+        return max(sum(left) / max(parallelism, 1), max(left))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.tasks, f, indent=4)
+        os.replace(tmp, self.state_file)
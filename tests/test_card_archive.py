@@ -0,0 +1,29 @@
+import os
+import time
+
+import card_archive
+from card_archive import CardArchive
+
+def make_run(directory, run_id, age_days):
+    archive = CardArchive(run_id, str(directory))
+    archive.add("otodom", "1", "https://example.test/search", ["<article>flat</article>"])
+    stamp = time.time() - age_days * 86400
+    for name in os.listdir(archive.directory):
+        os.utime(os.path.join(archive.directory, name), (stamp, stamp))
+    os.utime(archive.directory, (stamp, stamp))
+
+def test_prune_drops_old_runs_then_keeps_the_newest(tmp_path):
+    for run_id, age in (("run_a", 40), ("run_b", 3), ("run_c", 2), ("run_d", 1)):
+        make_run(tmp_path, run_id, age)
+
+    card_archive.prune({"archive": {"directory": str(tmp_path), "max_age_days": 30, "max_runs": 2}})
+
+    assert sorted(os.listdir(tmp_path)) == ["run_c", "run_d"]
+
+def test_recent_appends_keep_a_run(tmp_path):
+    make_run(tmp_path, "run_a", 40)
+    CardArchive("run_a", str(tmp_path)).add("otodom", "1", "https://example.test/search", ["<article>flat</article>"])
+
+    card_archive.prune({"archive": {"directory": str(tmp_path), "max_age_days": 30}})
+
+    assert os.listdir(tmp_path) == ["run_a"]
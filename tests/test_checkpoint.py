@@ -0,0 +1,75 @@
+import json
+import time
+import asyncio
+import threading
+
+import checkpoint
+from checkpoint import RunCheckpoint, DONE
+
+PHASES = [("all pages", ("otodom", "https://example.test/search", 0, ["Oliwa"]))]
+
+def make_run(run_id, config, status=None, age_hours=0):
+    run = RunCheckpoint.create(run_id, PHASES, config)
+    if status:
+        run.finish(status)
+    run.data["updated_at"] = time.time() - age_hours * 3600
+    with open(run.path, "w") as f:
+        json.dump(run.data, f)
+    return run
+
+def test_resumes_interrupted_run(tmp_path):
+    config = {"checkpoint": {"directory": str(tmp_path)}}
+    make_run("20260101_080000", config, status=DONE)
+    make_run("20260101_090000", config)
+
+    assert RunCheckpoint.latest_unfinished(config).run_id == "20260101_090000"
+
+def test_does_not_resume_runs_that_ended(tmp_path):
+    config = {"checkpoint": {"directory": str(tmp_path)}}
+    make_run("20260101_080000", config)
+    make_run("20260101_090000", config, status="incomplete")  # budget ran out, not a crash
+
+    assert RunCheckpoint.latest_unfinished(config) is None
+
+def test_does_not_resume_stale_run(tmp_path):
+    config = {"checkpoint": {"directory": str(tmp_path), "resume_max_age_hours": 6}}
+    make_run("20260101_090000", config, age_hours=7)
+
+    assert RunCheckpoint.latest_unfinished(config) is None
+    config["checkpoint"]["resume_max_age_hours"] = 8
+    assert RunCheckpoint.latest_unfinished(config).run_id == "20260101_090000"
+
+def test_task_updates_are_throttled(tmp_path, monkeypatch):
+    config = {"checkpoint": {"directory": str(tmp_path)}}
+    run = RunCheckpoint.create("20260101_090000", PHASES, config)
+    writes = []
+    real_replace = checkpoint.os.replace
+    monkeypatch.setattr(checkpoint.os, "replace", lambda *args: (writes.append(args), real_replace(*args)))
+
+    for page in range(1, 6):
+        run.page_done(0, page)
+    assert len(writes) == 0
+    assert RunCheckpoint.load(run.path).tasks[0]["last_page"] == 0
+
+    run.finish()
+    saved = RunCheckpoint.load(run.path).data
+    assert saved["status"] == "incomplete"
+    assert saved["tasks"][0]["last_page"] == 5
+
+def test_saves_inside_the_loop_are_written_off_it(tmp_path):
+    config = {"checkpoint": {"directory": str(tmp_path)}}
+    threads = []
+
+    async def run():
+        run = RunCheckpoint.create("20260101_090000", PHASES, config)
+        write = run._write
+        run._write = lambda payload: (threads.append(threading.current_thread()), write(payload))
+        run.save()
+        run.finish()
+        assert not threads  # nothing written on the loop
+        await run.flush()
+        return run
+
+    run = asyncio.run(run())
+    assert threads and threading.main_thread() not in threads
+    assert RunCheckpoint.load(run.path).data["status"] == "incomplete"
@@ -0,0 +1,119 @@
+import json
+import asyncio
+
+import pytest
+
+import concurrency
+from concurrency import ConcurrencyController, ConcurrencyTuner, TOTAL
+
+def make_controller(tmp_path, **conf):
+    return ConcurrencyController({"concurrency": {"state_file": str(tmp_path / "concurrency.json"), **conf}}, "scrape")
+
+def test_enabled_by_default_with_starting_levels(tmp_path):
+    controller = make_controller(tmp_path)
+    assert controller.enabled
+    assert controller.total.level == 2
+    assert controller.tuner("olx").level == 1
+
+def test_starting_levels_come_from_the_state_file(tmp_path):
+    (tmp_path / "concurrency.json").write_text(json.dumps({"scrape": {TOTAL: {"level": 3}, "olx": {"level": 9}}}))
+    controller = make_controller(tmp_path, max_per_portal=2)
+    assert controller.total.level == 3
+    assert controller.tuner("olx").level == 2  # capped at max_per_portal
+
+def test_disabled_runs_one_at_a_time(tmp_path):
+    (tmp_path / "concurrency.json").write_text(json.dumps({"scrape": {TOTAL: {"level": 3}}}))
+    controller = make_controller(tmp_path, enabled=False)
+    assert controller.total.level == 1 and controller.tuner("olx").level == 1
+
+def test_save_keeps_the_best_level(tmp_path):
+    controller = make_controller(tmp_path)
+    controller.total.best = (5.0, 3)
+    controller.save()
+    assert json.loads((tmp_path / "concurrency.json").read_text())["scrape"][TOTAL]["level"] == 3
+
+def adjust(tuner, pages, errors=0, seconds=10.0):
+    tuner.pages, tuner.errors, tuner.peak = pages, errors, tuner.level
+    tuner._adjust(seconds)
+
+def test_tuner_climbs_while_throughput_improves_and_turns_around():
+    tuner = ConcurrencyTuner("olx", 1, 5, 20, 0.2)
+    adjust(tuner, 10)
+    assert tuner.level == 2
+    adjust(tuner, 20)
+    assert tuner.level == 3
+    adjust(tuner, 15)  # slower at 3: back down
+    assert tuner.level == 2
+    assert tuner.chosen_level() == 2
+
+def test_tuner_does_not_raise_an_unreached_limit():
+    tuner = ConcurrencyTuner("olx", 2, 5, 20, 0.2)
+    tuner.pages, tuner.errors, tuner.peak = 10, 0, 1
+    tuner._adjust(10)
+    assert tuner.level == 2
+
+def test_tuner_steps_down_and_caps_on_errors():
+    tuner = ConcurrencyTuner("olx", 3, 5, 20, 0.2)
+    adjust(tuner, 5, errors=5)
+    assert tuner.level == 2 and tuner.max_level == 2
+
+def test_tuner_steps_down_over_the_memory_ceiling(monkeypatch):
+    monkeypatch.setattr(concurrency, "rss_mb", lambda: 4096)
+    tuner = ConcurrencyTuner(TOTAL, 3, 5, 20, 0.2, max_rss_mb=2048)
+    adjust(tuner, 10)
+    assert tuner.level == 2
+
+def test_map_respects_levels_and_keeps_order(tmp_path):
+    controller = make_controller(tmp_path)
+    in_flight = {"olx": 0, "otodom": 0}
+    peaks = {"olx": 0, "otodom": 0}
+
+    async def job(item):
+        portal, number = item
+        in_flight[portal] += 1
+        peaks[portal] = max(peaks[portal], in_flight[portal])
+        await asyncio.sleep(0.01)
+        in_flight[portal] -= 1
+        return number
+
+    items = [("olx", 1), ("olx", 2), ("otodom", 3), ("olx", 4)]
+    results = asyncio.run(controller.map(items, lambda item: item[0], job))
+    assert results == [1, 2, 3, 4]
+    assert peaks == {"olx": 1, "otodom": 1}
+
+def test_map_returns_exceptions_and_runs_the_other_items(tmp_path):
+    controller = make_controller(tmp_path)
+    done = []
+
+    async def job(item):
+        await asyncio.sleep(0.01)
+        if item == "bad":
+            raise ValueError("bad item")
+        done.append(item)
+        return item
+
+    results = asyncio.run(controller.map(["a", "bad", "b", "c"], lambda item: item, job))
+    assert isinstance(results[1], ValueError)
+    assert results[0] == "a" and results[2:] == ["b", "c"]
+    assert sorted(done) == ["a", "b", "c"]
+    assert controller.total.in_flight == 0
+
+def test_cancelled_map_cancels_and_awaits_its_jobs(tmp_path):
+    controller = make_controller(tmp_path)
+    finished = []
+
+    async def job(item):
+        try:
+            await asyncio.sleep(10)
+        finally:
+            finished.append(item)
+
+    async def main():
+        task = asyncio.create_task(controller.map(["a", "b"], lambda item: item, job))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert sorted(finished) == ["a", "b"]
+
+    asyncio.run(main())
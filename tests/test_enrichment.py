@@ -0,0 +1,64 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+import pandas as pd
+
+import enrichment
+import storage
+from enrichment import EnrichmentWorker
+
+class FakeGovernor:
+    generation = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        yield object()
+
+    def page_done(self):
+        pass
+
+class FakeContext:
+    async def close(self):
+        pass
+
+def test_batched_updates_and_worker_survives_page_errors(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "CSV_FILE", str(tmp_path / "offers.csv"))
+    urls = [f"https://www.example.test/oferta/{i}" for i in range(5)]
+    storage.save_offers([{"url": url, "title": f"Flat {i}"} for i, url in enumerate(urls)])
+
+    writes = []
+    real_update = enrichment.update_offers_fields
+    monkeypatch.setattr(enrichment, "update_offers_fields", lambda updates: (writes.append(len(updates)), real_update(updates))[1])
+    opened = []
+
+    async def open_page(browser):
+        opened.append(browser)
+        if len(opened) == 1:
+            raise RuntimeError("browser went away")
+        return FakeContext(), object()
+
+    async def get_year_built(page, url, cache=None, rate=None):
+        return 1930 + int(url.rsplit("/", 1)[1]) * 10
+
+    monkeypatch.setattr(enrichment, "get_year_built", get_year_built)
+    config = {"enrichment": {"max_year": 1960, "batch_size": 2, "batch_seconds": 600}, "cache": {"enabled": False}}
+
+    async def run():
+        worker = EnrichmentWorker(FakeGovernor(), config)
+        worker._open_page = open_page
+        worker.start()
+        worker.submit([{"url": url} for url in urls])
+        await worker.close()
+        return worker
+
+    worker = asyncio.run(run())
+
+    assert worker.processed == 4  # the first offer was lost with the page that failed to open
+    assert writes == [2, 2]
+    df = storage.load_offers().set_index("url")
+    assert pd.isna(df.loc[urls[0], "year_built"])
+    assert df.loc[urls[1], "year_built"] == 1940
+    assert not df.loc[urls[1], "is_hidden"]
+    assert df.loc[urls[3], "year_built"] == 1960
+    assert df.loc[urls[3], "is_hidden"]
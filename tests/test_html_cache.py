@@ -0,0 +1,114 @@
+import time
+import asyncio
+
+import pytest
+
+import html_cache
+from html_cache import HtmlCache
+
+URL = "https://www.example.test/oferta/1"
+
+@pytest.fixture
+def cache(tmp_path):
+    return HtmlCache({"cache": {"directory": str(tmp_path / "html")}})
+
+def test_listings_are_not_served_by_default(cache):
+    assert cache.listing_max_age == 0
+    assert cache.detail_max_age == 7 * 24 * 3600
+
+def test_fresh_copy_is_served_and_stale_one_is_not(cache, monkeypatch):
+    cache.put(URL, "<html>flat</html>")
+    assert cache.get(URL, max_age=60) == "<html>flat</html>"
+
+    later = time.time() + 120
+    monkeypatch.setattr(html_cache.time, "time", lambda: later)
+    assert cache.get(URL, max_age=60) is None
+    assert cache.get(URL) == "<html>flat</html>"  # no age limit
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_identical_pages_share_one_blob(cache):
+    first = cache.put(URL, "<html>same</html>")
+    second = cache.put(URL.replace("1", "2"), "<html>same</html>")
+    assert first == second
+    assert cache.stats()["entries"] == 2
+
+class FakePage:
+    def __init__(self):
+        self.routes = []
+
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+    async def unroute(self, pattern, handler):
+        self.routes.remove((pattern, handler))
+
+    async def goto(self, url):
+        raise RuntimeError("navigation failed")
+
+def test_route_is_removed_when_navigation_fails(cache):
+    cache.put(URL, "<html>flat</html>")
+    page = FakePage()
+
+    async def navigate():
+        async with cache.serving(page, URL, 60) as from_cache:
+            assert from_cache and len(page.routes) == 1
+            await page.goto(URL)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(navigate())
+    assert page.routes == []
+
+def test_nothing_is_routed_without_a_fresh_copy(cache):
+    page = FakePage()
+
+    async def navigate():
+        async with cache.serving(page, URL, 60) as from_cache:
+            return from_cache, list(page.routes)
+
+    assert asyncio.run(navigate()) == (False, [])
+
+class FakeRoute:
+    def __init__(self):
+        self.fulfilled = None
+
+    async def fulfill(self, **kwargs):
+        self.fulfilled = kwargs
+
+class RoutingPage(FakePage):
+    """Runs the first matching route handler, as Playwright does, for the URL the browser requests."""
+    async def goto(self, url):
+        for matches, handler in self.routes:
+            if matches(url):
+                route = FakeRoute()
+                await handler(route)
+                return route.fulfilled
+
+class FakeRate:
+    def __init__(self):
+        self.acquired = []
+
+    async def acquire(self, url):
+        self.acquired.append(url)
+
+def test_route_matches_the_url_as_the_browser_requests_it(cache):
+    cache.put("https://WWW.otodom.pl:443", "<html>flat</html>")
+    page, rate = RoutingPage(), FakeRate()
+
+    async def navigate():
+        async with cache.serving(page, "https://WWW.otodom.pl:443", 60, rate=rate):
+            return await page.goto("https://www.otodom.pl/")
+
+    assert asyncio.run(navigate())["body"] == "<html>flat</html>"
+    assert rate.acquired == []
+
+def test_rate_is_acquired_when_the_route_never_fires(cache):
+    cache.put(URL, "<html>flat</html>")
+    page, rate = RoutingPage(), FakeRate()
+
+    async def navigate():
+        async with cache.serving(page, URL, 60, rate=rate) as from_cache:
+            assert from_cache
+            await page.goto(URL + "&redirected=1")
+
+    asyncio.run(navigate())
+    assert rate.acquired == [URL]
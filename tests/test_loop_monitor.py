@@ -0,0 +1,25 @@
+import os
+import threading
+
+from loop_monitor import LoopMonitor
+
+def blocking_call(started, release):
+    started.set()
+    release.wait(5)
+
+def test_block_is_counted_by_function_not_line(monkeypatch):
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    started, release = threading.Event(), threading.Event()
+    monitor = LoopMonitor({"loop_monitor": {"enabled": False}})
+    thread = threading.Thread(target=blocking_call, args=(started, release))
+    thread.start()
+    started.wait(5)
+    try:
+        monitor.loop_thread = thread.ident
+        monitor._capture(0.5)
+    finally:
+        release.set()
+        thread.join()
+
+    assert list(monitor.sites) == ["tests.test_loop_monitor.blocking_call"]
+    assert monitor.stalls[-1]["where"].endswith("in blocking_call")
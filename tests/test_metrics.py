@@ -0,0 +1,47 @@
+import math
+
+from metrics import Registry
+
+def test_counter_and_gauge_exposition():
+    registry = Registry()
+    pages = registry.counter("scrappy_pages_total", "Pages.", ["portal", "source"])
+    depth = registry.gauge("scrappy_queue_depth", "Depth.")
+    pages.inc("otodom", "network")
+    pages.inc("otodom", "network", amount=2)
+    pages.inc("olx", "cache")
+    depth.set(3)
+
+    assert registry.render().splitlines() == [
+        "# HELP scrappy_pages_total Pages.",
+        "# TYPE scrappy_pages_total counter",
+        'scrappy_pages_total{portal="olx",source="cache"} 1',
+        'scrappy_pages_total{portal="otodom",source="network"} 3',
+        "# HELP scrappy_queue_depth Depth.",
+        "# TYPE scrappy_queue_depth gauge",
+        "scrappy_queue_depth 3",
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    seconds = registry.histogram("scrappy_goto_seconds", "Goto.", ["portal"], buckets=(0.5, 1, math.inf))
+    for value in (0.2, 0.7, 0.9, 5.0):
+        seconds.observe(value, "otodom")
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'scrappy_goto_seconds_bucket{portal="otodom",le="0.5"} 1',
+        'scrappy_goto_seconds_bucket{portal="otodom",le="1"} 3',
+        'scrappy_goto_seconds_bucket{portal="otodom",le="+Inf"} 4',
+        'scrappy_goto_seconds_count{portal="otodom"} 4',
+        'scrappy_goto_seconds_sum{portal="otodom"} 6.8',
+    ]
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("scrappy_errors_total", "Errors.", ["error"]).inc('say "hi"\\\n')
+    assert registry.render().splitlines()[-1] == 'scrappy_errors_total{error="say \\"hi\\"\\\\\\n"} 1'
+
+def test_registering_a_name_twice_returns_the_first_metric():
+    registry = Registry()
+    first = registry.counter("scrappy_x_total", "X.")
+    assert registry.counter("scrappy_x_total", "X again.") is first
@@ -0,0 +1,116 @@
+import asyncio
+
+from pipeline import Pipeline, Stage, BatchStage, Job
+from scraper import _first_seen
+
+def offers(*urls):
+    return [{"url": url} for url in urls]
+
+def make_pipeline(saved, sent_urls, batch_size=100, batch_seconds=60, fail_on=None):
+    def screen(job, batch):
+        if fail_on and any(o["url"] == fail_on for o in batch):
+            raise ValueError("bad card")
+        return _first_seen(batch, job.stats["seen"])
+
+    def dedupe(job, batch):
+        return _first_seen(batch, sent_urls)
+
+    def persist(entries):
+        saved.append([o["url"] for _, batch in entries for o in batch])
+
+    return Pipeline([
+        Stage("screen", screen, 2),
+        Stage("dedupe", dedupe, 2),
+        BatchStage("persist", persist, 2, batch_size=batch_size, batch_seconds=batch_seconds),
+    ]).start()
+
+def test_drain_flushes_a_partial_batch_and_dedupes_across_jobs():
+    saved = []
+
+    async def run():
+        ingest = make_pipeline(saved, set())
+        first, second = Job(seen=set()), Job(seen=set())
+        await ingest.submit(first, offers("a", "b", "a"))
+        await ingest.submit(first, offers("b", "c"))  # a retried attempt scraping the page again
+        await asyncio.wait_for(ingest.drain(first), 1)  # far below batch_seconds
+        await ingest.submit(second, offers("c", "d"))
+        await asyncio.wait_for(ingest.drain(second), 1)
+        await ingest.close()
+        return ingest.stats()
+
+    stats = asyncio.run(run())
+    assert [url for batch in saved for url in batch] == ["a", "b", "c", "d"]
+    assert stats["dedupe"]["offers_out"] == 4
+    assert stats["persist"]["batches"] == len(saved)
+
+def test_failed_batch_does_not_block_drain():
+    saved = []
+
+    async def run():
+        ingest = make_pipeline(saved, set(), fail_on="x")
+        job = Job(seen=set())
+        await ingest.submit(job, offers("x", "y"))
+        await ingest.submit(job, offers("z"))
+        await asyncio.wait_for(ingest.drain(job), 1)
+        await ingest.close()
+        return job, ingest.stats()
+
+    job, stats = asyncio.run(run())
+    assert job.errors == 1 and job.in_flight == 0
+    assert stats["screen"]["errors"] == 1
+    assert saved == [["z"]]
+
+def test_close_persists_what_is_still_batched():
+    saved = []
+
+    async def run():
+        ingest = make_pipeline(saved, set(), batch_size=100, batch_seconds=60)
+        job = Job(seen=set())
+        for url in "abcde":
+            await ingest.submit(job, offers(url))
+        await ingest.close()
+        return job
+
+    job = asyncio.run(run())
+    assert sorted(url for batch in saved for url in batch) == list("abcde")
+    assert job.in_flight == 0
+
+def test_full_batch_is_written_without_waiting():
+    saved = []
+
+    async def run():
+        ingest = make_pipeline(saved, set(), batch_size=2, batch_seconds=60)
+        job = Job(seen=set())
+        await ingest.submit(job, offers("a", "b"))
+        for _ in range(50):
+            if saved:
+                break
+            await asyncio.sleep(0.01)
+        result = list(saved)
+        await ingest.close()
+        return result
+
+    assert asyncio.run(run()) == [["a", "b"]]
+
+def test_submit_waits_while_the_first_queue_is_full():
+    async def run():
+        gate = asyncio.Event()
+
+        async def slow(job, batch):
+            await gate.wait()
+            return batch
+
+        ingest = Pipeline([Stage("slow", slow, 1)]).start()
+        job = Job()
+        await ingest.submit(job, offers("a"))  # taken by the worker
+        await ingest.submit(job, offers("b"))  # fills the queue
+        blocked = asyncio.create_task(ingest.submit(job, offers("c")))
+        await asyncio.sleep(0.05)
+        was_blocked = not blocked.done()
+        gate.set()
+        await blocked
+        await ingest.drain(job)
+        await ingest.close()
+        return was_blocked
+
+    assert asyncio.run(run())
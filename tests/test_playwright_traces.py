@@ -0,0 +1,65 @@
+import asyncio
+
+import browser_service
+from playwright_traces import TraceRecorder
+
+class FakeTracing:
+    def __init__(self):
+        self.running = False
+
+    async def start(self, **kwargs):
+        if self.running:
+            raise RuntimeError("Tracing has already been started")
+        self.running = True
+
+    async def start_chunk(self, **kwargs):
+        pass
+
+    async def stop_chunk(self, path=None):
+        if path:
+            open(path, "wb").close()
+
+    async def stop(self):
+        self.running = False
+
+class FakeContext:
+    def __init__(self):
+        self.tracing = FakeTracing()
+
+CONFIG = {"playwright_trace": {"enabled": True}}
+
+def test_one_trace_at_a_time_on_a_shared_context(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    shared = FakeContext()
+
+    async def run():
+        first = TraceRecorder(browser_service.SharedContext(shared), CONFIG, "run", "Otodom - Oliwa")
+        second = TraceRecorder(browser_service.SharedContext(shared), CONFIG, "run", "Otodom - Zaspa")
+        await first.start()
+        await second.start()
+        assert first._active and not second._active
+        await second.finish("error: boom")  # must not stop the first attempt's trace
+        assert shared.tracing.running
+        assert await first.finish() is None
+        assert not shared.tracing.running
+
+        third = TraceRecorder(browser_service.SharedContext(shared), CONFIG, "run", "Otodom - Oliwa")
+        await third.start()
+        assert third._active
+        return await third.finish("no cards")
+
+    assert (tmp_path / asyncio.run(run()) / "reason.json").exists()
+
+def test_separate_contexts_trace_concurrently(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def run():
+        recorders = [TraceRecorder(FakeContext(), CONFIG, "run", f"task {i}") for i in range(2)]
+        for recorder in recorders:
+            await recorder.start()
+        active = [recorder._active for recorder in recorders]
+        for recorder in recorders:
+            await recorder.finish()
+        return active
+
+    assert asyncio.run(run()) == [True, True]
@@ -0,0 +1,101 @@
+import json
+import time
+import asyncio
+
+import pytest
+
+import rate_control
+from rate_control import RateController, HostPaused
+
+HOST = "www.example.test"
+
+def make_controller(tmp_path, min_delay=0.5, **rate_conf):
+    config = {
+        "politeness": {"min_delay_seconds": min_delay},
+        "rate_control": {"state_file": str(tmp_path / "rate_limits.json"), "increase_step": 0.1,
+                         "decrease_factor": 0.5, "min_rate": 0.05, **rate_conf},
+    }
+    return RateController(config)
+
+def test_additive_increase_up_to_politeness_ceiling(tmp_path):
+    rate = make_controller(tmp_path, initial_rate=1)
+    for _ in range(3):
+        rate.record(f"https://{HOST}/a", "ok")
+    assert rate.get(HOST).rate == pytest.approx(1.3)
+    for _ in range(20):
+        rate.record(HOST, "ok")
+    assert rate.get(HOST).rate == 2  # 1 / min_delay_seconds
+
+def test_multiplicative_decrease_down_to_min_rate(tmp_path):
+    rate = make_controller(tmp_path, initial_rate=2)
+    rate.record(HOST, "timeout")
+    assert rate.get(HOST).rate == 1
+    assert rate.get(HOST).backoff_until == 0  # timeouts slow down without pausing
+    for _ in range(10):
+        rate.record(HOST, "empty")
+    assert rate.get(HOST).rate == 0.05
+    assert rate.get(HOST).consecutive_failures == 11
+
+def test_repeated_blocks_double_the_pause(tmp_path):
+    rate = make_controller(tmp_path)
+    rate.record(HOST, "throttled")
+    first = rate.get(HOST).backoff_until - time.time()
+    rate.record(HOST, "throttled")
+    second = rate.get(HOST).backoff_until - time.time()
+    assert first == pytest.approx(30, abs=1)
+    assert second == pytest.approx(60, abs=1)
+    rate.record(HOST, "ok")
+    assert rate.get(HOST).consecutive_failures == 0
+
+def test_state_is_written_at_most_every_interval(tmp_path, monkeypatch):
+    rate = make_controller(tmp_path)
+    state_file = tmp_path / "rate_limits.json"
+    rate.record(HOST, "timeout")
+    assert not state_file.exists()
+    monkeypatch.setattr(rate_control, "SAVE_INTERVAL_SECONDS", 0)
+    rate.record(HOST, "timeout")
+    assert json.loads(state_file.read_text())[HOST]["failures"] == 2
+    assert make_controller(tmp_path).get(HOST).failures == 2
+
+def test_concurrent_waiters_are_spaced_by_the_rate(tmp_path):
+    rate = make_controller(tmp_path, min_delay=0.1)  # 0.1 s apart
+
+    async def run():
+        started = time.monotonic()
+        offsets = []
+
+        async def request():
+            await rate.acquire(f"https://{HOST}/x")
+            offsets.append(time.monotonic() - started)
+
+        await asyncio.gather(*(request() for _ in range(4)))
+        return sorted(offsets)
+
+    offsets = asyncio.run(run())
+    assert offsets[-1] == pytest.approx(0.3, abs=0.08)
+    assert all(b - a == pytest.approx(0.1, abs=0.05) for a, b in zip(offsets, offsets[1:]))
+
+def test_paused_host_fails_fast_instead_of_waiting(tmp_path):
+    rate = make_controller(tmp_path, max_wait_seconds=60)
+    rate.record(HOST, "captcha")  # 120 s pause
+
+    async def run():
+        started = time.monotonic()
+        with pytest.raises(HostPaused):
+            await rate.acquire(HOST)
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) < 0.1
+
+def test_short_pause_does_not_block_other_waiters_behind_the_lock(tmp_path):
+    rate = make_controller(tmp_path, initial_rate=2)
+    rate.get(HOST).backoff_until = time.time() + 0.3
+
+    async def run():
+        first = asyncio.create_task(rate.acquire(HOST))
+        await asyncio.sleep(0.05)
+        # The first caller is asleep waiting for the pause; the lock is already free
+        assert not rate.get(HOST).lock.locked()
+        await first
+
+    asyncio.run(run())
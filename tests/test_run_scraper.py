@@ -0,0 +1,229 @@
+import json
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+import scraper
+from scrapers.base import BaseScraper
+
+class FakePage:
+    url = "https://example.test/listing"
+
+    def __init__(self, context):
+        self.context = context
+
+    def on(self, event, handler):
+        pass
+
+    async def close(self):
+        pass
+
+class FakeContext:
+    async def new_page(self):
+        return FakePage(self)
+
+    async def new_cdp_session(self, page):
+        raise RuntimeError("no CDP in tests")
+
+    async def close(self):
+        pass
+
+class FakeGovernor:
+    closed = False
+
+    def __init__(self, p, config, **kwargs):
+        self.browser = object()
+        self.generation = 0
+
+    async def start(self):
+        pass
+
+    @asynccontextmanager
+    async def lease(self):
+        yield self.browser
+
+    def page_done(self):
+        pass
+
+    async def close(self):
+        FakeGovernor.closed = True
+
+    def stats(self):
+        return {}
+
+class FakeScraper(BaseScraper):
+    """Two listing pages per task, slow enough for tasks to overlap."""
+    in_flight = 0
+    peak = 0
+
+    def __init__(self, config):
+        super().__init__("otodom", config)
+
+    async def scrape_pages(self, page, url, max_pages):
+        FakeScraper.in_flight += 1
+        FakeScraper.peak = max(FakeScraper.peak, FakeScraper.in_flight)
+        try:
+            district = url.rsplit("q=", 1)[-1]
+            for number in (1, 2):
+                await asyncio.sleep(0.05)
+                yield [{"url": f"https://example.test/{district}/{number}", "title": f"Flat {district}",
+                        "location": district, "price": 400000, "area": 50}]
+        finally:
+            FakeScraper.in_flight -= 1
+
+    async def parse_card(self, card):
+        return None
+
+@asynccontextmanager
+async def fake_playwright():
+    yield object()
+
+async def new_context(browser, portal, config=None, **kwargs):
+    return FakeContext()
+
+async def save_if_accepted(context, portal, config=None):
+    pass
+
+@pytest.fixture
+def fake_browser(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {
+        "filters": {"district": ["Zaspa", "Zaspa", "Oliwa"]},
+        "portals": {"otodom": {"enabled": True, "base_url": "https://example.test/search", "max_pages": 0}},
+        "concurrency": {"max_in_flight": 4, "max_per_portal": 2},
+        "enrichment": {"enabled": False},
+        "cache": {"enabled": False},
+        "archive": {"enabled": False},
+        "playwright_trace": {"enabled": False},
+        "consent": {"enabled": False},
+    }
+    (tmp_path / "config.json").write_text(json.dumps(config))
+    (tmp_path / "state").mkdir()
+    (tmp_path / "state" / "concurrency.json").write_text(json.dumps({"scrape": {"*": {"level": 4}, "otodom": {"level": 2}}}))
+    monkeypatch.setattr(scraper, "async_playwright", fake_playwright)
+    monkeypatch.setattr(scraper, "MemoryGovernor", FakeGovernor)
+    monkeypatch.setattr(scraper.consent, "new_context", new_context)
+    monkeypatch.setattr(scraper.consent, "save_if_accepted", save_if_accepted)
+    monkeypatch.setattr(scraper, "OtodomScraper", FakeScraper)
+    FakeScraper.peak = 0
+    return tmp_path
+
+def test_duplicate_districts_at_portal_level_two(fake_browser):
+    report = asyncio.run(scraper.run_scraper())
+
+    assert FakeScraper.peak == 2
+    assert report["tasks"] == 2  # "Zaspa" twice is one task
+    assert report["failed"] == []
+    assert report["offers"] == 4
+    checkpoint = json.loads(next((fake_browser / "state" / "runs").glob("*.json")).read_text())
+    assert checkpoint["status"] == "done"
+    assert all(task["seconds"] >= 0 for task in checkpoint["tasks"])
+
+class PagedFakeScraper(FakeScraper):
+    """FakeScraper with a page parameter, noting which URL each pass opened and when."""
+    PAGE_PARAM = "page"
+    passes = []
+
+    async def scrape_pages(self, page, url, max_pages):
+        entry = {"url": url, "start": asyncio.get_running_loop().time()}
+        PagedFakeScraper.passes.append(entry)
+        async for offers in super().scrape_pages(page, url, max_pages):
+            yield offers
+        entry["end"] = asyncio.get_running_loop().time()
+
+def test_budgeted_deep_pass_starts_at_page_two_after_first_pass(fake_browser, monkeypatch):
+    monkeypatch.setattr(scraper, "OtodomScraper", PagedFakeScraper)
+    PagedFakeScraper.passes = []
+
+    report = asyncio.run(scraper.run_scraper(budget_seconds=600))
+
+    assert report["failed"] == []
+    first = [p for p in PagedFakeScraper.passes if "page=" not in p["url"]]
+    deep = [p for p in PagedFakeScraper.passes if "page=2" in p["url"]]
+    assert len(first) == len(deep) == 2
+    for deep_pass in deep:
+        district = deep_pass["url"].split("q=")[1].split("&")[0]
+        first_pass = next(p for p in first if p["url"].endswith(f"q={district}"))
+        assert first_pass["end"] <= deep_pass["start"]
+
+def test_budgeted_passes_are_recorded_as_one_task(fake_browser, monkeypatch):
+    monkeypatch.setattr(scraper, "OtodomScraper", PagedFakeScraper)
+    PagedFakeScraper.passes = []
+
+    asyncio.run(scraper.run_scraper(budget_seconds=600))
+
+    history = json.loads((fake_browser / "state" / "task_history.json").read_text())
+    assert sorted(history) == ["otodom|Oliwa", "otodom|Zaspa"]
+    # One offer per page and two pages per pass: the first and deep pass add up to one run
+    assert all(task["offers"] == 4 and task["runs"] == 1 for task in history.values())
+
+def test_scrape_from_without_page_param_leaves_out_earlier_pages():
+    async def collect():
+        return [offers async for offers in FakeScraper({}).scrape_from(None, "https://example.test/search?q=Oliwa", 0, 2)]
+
+    pages = asyncio.run(collect())
+    assert [offer["url"] for offers in pages for offer in offers] == ["https://example.test/Oliwa/2"]
+
+def test_page_url_sets_the_page_parameter():
+    scraper_ = PagedFakeScraper({})
+    assert scraper_.page_url("https://example.test/search?q=Oliwa&page=1", 2) == "https://example.test/search?q=Oliwa&page=2"
+    assert FakeScraper({}).page_url("https://example.test/search", 2) is None
+
+def test_scraper_without_parse_card_cannot_be_created():
+    class Incomplete(BaseScraper):
+        async def scrape_pages(self, page, url, max_pages):
+            yield []
+
+    with pytest.raises(TypeError, match="parse_card"):
+        Incomplete("otodom", {})
+
+def test_legacy_scrape_is_wrapped_as_one_page():
+    class Legacy(BaseScraper):
+        async def scrape(self, page, url, max_pages=0):
+            return [{"url": url}]
+
+        async def parse_card(self, card):
+            return None
+
+    async def collect():
+        legacy = Legacy("otodom", {})
+        return [offers async for offers in legacy.scrape_pages(None, "https://example.test/search", 0)], await legacy.scrape(None, "https://example.test/a")
+
+    pages, offers = asyncio.run(collect())
+    assert pages == [[{"url": "https://example.test/search"}]]
+    assert offers == [{"url": "https://example.test/a"}]
+
+class OverlappingFakeScraper(FakeScraper):
+    """Every district search lists the same two offers, one of them twice."""
+    async def scrape_pages(self, page, url, max_pages):
+        await asyncio.sleep(0.01)
+        yield [{"url": f"https://example.test/shared/{n}", "title": "Flat", "location": "Zaspa, Oliwa", "price": 400000, "area": 50}
+               for n in (1, 1, 2)]
+
+def test_offers_found_by_several_tasks_are_saved_once(fake_browser, monkeypatch):
+    monkeypatch.setattr(scraper, "OtodomScraper", OverlappingFakeScraper)
+
+    report = asyncio.run(scraper.run_scraper())
+
+    assert report["offers"] == 2
+    assert report["pipeline"]["persist"]["offers_in"] == 2
+
+def test_cancelled_run_is_torn_down(fake_browser):
+    FakeGovernor.closed = False
+    (fake_browser / "state" / "concurrency.json").unlink()
+
+    async def run():
+        task = asyncio.create_task(scraper.run_scraper())
+        await asyncio.sleep(0.07)  # tasks are on their first page
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    checkpoint = json.loads(next((fake_browser / "state" / "runs").glob("*.json")).read_text())
+    assert checkpoint["status"] == "interrupted"
+    assert FakeGovernor.closed
+    assert (fake_browser / "state" / "concurrency.json").exists()
+    assert scraper.RunCheckpoint.latest_unfinished({}).run_id == checkpoint["run_id"]
@@ -0,0 +1,101 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from scheduler import CronExpression, Scheduler
+
+def test_steps_ranges_and_lists():
+    cron = CronExpression("*/15 8-10,18 * * 1-5")
+    assert cron.minutes == {0, 15, 30, 45}
+    assert cron.hours == {8, 9, 10, 18}
+    assert cron.weekdays == {1, 2, 3, 4, 5}
+
+def test_next_after_skips_to_the_next_matching_weekday():
+    cron = CronExpression("30 7 * * 1-5")
+    friday_evening = datetime(2026, 10, 16, 20, 0)
+    assert cron.next_after(friday_evening) == datetime(2026, 10, 19, 7, 30)  # Monday
+
+def test_seven_is_sunday():
+    assert CronExpression("0 12 * * 7").next_after(datetime(2026, 10, 19)) == datetime(2026, 10, 25, 12, 0)
+
+def test_restricted_day_fields_match_either():
+    cron = CronExpression("0 0 1 * 1")  # the 1st, or any Monday
+    assert cron.next_after(datetime(2026, 10, 19, 1, 0)) == datetime(2026, 10, 26, 0, 0)
+    assert cron.next_after(datetime(2026, 10, 26, 1, 0)) == datetime(2026, 11, 1, 0, 0)
+
+def test_next_after_is_strictly_later():
+    cron = CronExpression("0 * * * *")
+    assert cron.next_after(datetime(2026, 10, 19, 9, 0, 0)) == datetime(2026, 10, 19, 10, 0)
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "5-1 * * * *", "*/0 * * * *"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+def test_never_matching_expression():
+    with pytest.raises(ValueError):
+        CronExpression("0 0 31 2 *").next_after(datetime(2026, 1, 1))
+
+class FakeRuns:
+    def __init__(self):
+        self.busy = False
+        self.started = []
+
+    def __call__(self, **kwargs):
+        if self.busy:
+            return False
+        self.started.append(kwargs)
+        return True
+
+def make_scheduler(runs, on_overrun="skip", jobs=None):
+    config = {"schedule": {"enabled": True, "on_overrun": on_overrun, "jitter_seconds": 0, "jobs": jobs or [
+        {"name": "morning", "cron": "0 7 * * *", "portals": ["otodom"], "budget_minutes": 10},
+    ]}}
+    scheduler = Scheduler(lambda: config, runs)
+    scheduler._reload()
+    return scheduler
+
+def test_due_job_starts_a_run_and_plans_the_next():
+    runs = FakeRuns()
+    scheduler = make_scheduler(runs)
+    job = scheduler.jobs[0]
+    job.due = time.time() - 1
+    scheduler._tick()
+    assert runs.started == [{"portals": ["otodom"], "max_pages": None, "budget_seconds": 600}]
+    assert job.last["outcome"] == "started"
+    assert job.due > time.time()
+
+def test_overrun_is_skipped_by_default():
+    runs = FakeRuns()
+    runs.busy = True
+    scheduler = make_scheduler(runs)
+    scheduler.jobs[0].due = time.time() - 1
+    scheduler._tick()
+    assert scheduler.jobs[0].last["outcome"] == "skipped"
+    runs.busy = False
+    scheduler._tick()
+    assert runs.started == []
+
+def test_overrun_is_queued_once_and_started_when_the_lock_frees():
+    runs = FakeRuns()
+    runs.busy = True
+    scheduler = make_scheduler(runs, on_overrun="queue")
+    job = scheduler.jobs[0]
+    for _ in range(2):
+        job.due = time.time() - 1
+        scheduler._tick()
+    assert scheduler.queued == [job]
+    runs.busy = False
+    scheduler._tick()
+    assert len(runs.started) == 1
+    assert job.last["outcome"] == "started late"
+    assert scheduler.queued == []
+
+def test_invalid_entries_are_ignored_and_disabled_schedule_has_no_jobs():
+    runs = FakeRuns()
+    scheduler = make_scheduler(runs, jobs=[{"cron": "bad"}, {"name": "ok", "cron": "0 7 * * *"}])
+    assert [job.name for job in scheduler.jobs] == ["ok"]
+    scheduler.load_config = lambda: {"schedule": {"enabled": False}}
+    scheduler._reload()
+    assert scheduler.jobs == [] and scheduler.status()["enabled"] is False
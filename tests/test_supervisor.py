@@ -0,0 +1,60 @@
+import asyncio
+
+from concurrency import ConcurrencyController
+from supervisor import TaskSupervisor
+
+class FakeHistory:
+    def has(self, portal, district):
+        return False
+
+    def page_p95(self, portal):
+        return 0.5
+
+def make_supervisor(tmp_path, max_per_portal):
+    config = {
+        "watchdog": {"retries": 0, "page_timeout_seconds": 30},
+        "concurrency": {"state_file": str(tmp_path / "concurrency.json"), "max_per_portal": max_per_portal},
+    }
+    controller = ConcurrencyController(config, "scrape")
+    return TaskSupervisor(config, FakeHistory(), concurrency=controller), controller
+
+def test_hedged_attempt_holds_a_concurrency_slot(tmp_path):
+    supervisor, controller = make_supervisor(tmp_path, max_per_portal=2)
+    controller.tuner("olx").level = 2
+    held = []
+
+    async def attempt(on_page):
+        if not held:
+            held.append(controller.tuner("olx").in_flight)
+            await asyncio.sleep(60)  # stuck on its first page
+        held.append(controller.tuner("olx").in_flight)
+        return "hedge"
+
+    async def run():
+        assert controller.try_acquire("olx")  # the task's own slot, as map() takes it
+        result = await supervisor.run("olx", "Oliwa", attempt)
+        controller.release("olx")
+        return result
+
+    assert asyncio.run(run()) == "hedge"
+    assert held == [1, 2]
+    assert controller.tuner("olx").in_flight == 0 and controller.total.in_flight == 0
+
+def test_no_hedged_attempt_without_a_free_slot(tmp_path):
+    supervisor, controller = make_supervisor(tmp_path, max_per_portal=1)
+    calls = []
+
+    async def attempt(on_page):
+        calls.append(1)
+        await asyncio.sleep(1.5)
+        return "slow"
+
+    async def run():
+        assert controller.try_acquire("olx")
+        try:
+            return await supervisor.run("olx", "Oliwa", attempt)
+        finally:
+            controller.release("olx")
+
+    assert asyncio.run(run()) == "slow"
+    assert len(calls) == 1
@@ -0,0 +1,34 @@
+import time
+
+from task_history import TaskHistory
+
+def make_history(tmp_path):
+    history = TaskHistory({"scheduling": {"state_file": str(tmp_path / "task_history.json")}})
+    history.record("otodom", "Oliwa", 120, 4, 80, 5)
+    history.record("olx", "Oliwa", 30, 2, 40, 10)
+    return history
+
+def test_longest_first_and_yield_order(tmp_path):
+    history = make_history(tmp_path)
+    items = [("olx", "Oliwa"), ("otodom", "Oliwa"), ("gratka", "Oliwa")]
+    assert history.order(items, lambda item: item) == [("otodom", "Oliwa"), ("gratka", "Oliwa"), ("olx", "Oliwa")]
+    # Never measured tasks rank first by yield, so they get measured
+    assert history.order(items, lambda item: item, by="yield")[0] == ("gratka", "Oliwa")
+
+def test_moving_average(tmp_path):
+    history = make_history(tmp_path)
+    history.record("otodom", "Oliwa", 60, 4, 80, 5)
+    assert history.estimate("otodom", "Oliwa") == 90
+
+def test_remaining_seconds_counts_running_tasks_with_the_same_key(tmp_path):
+    history = make_history(tmp_path)
+    now = time.time()
+    running = [(("otodom", "Oliwa"), now - 20), (("otodom", "Oliwa"), now - 100)]
+    # 100 s + 20 s left of the running ones, 30 s pending: the longest task bounds it
+    assert round(history.remaining_seconds([("olx", "Oliwa")], running, parallelism=3)) == 100
+    assert round(history.remaining_seconds([("olx", "Oliwa")] * 10, running, parallelism=2)) == (100 + 20 + 300) // 2
+
+def test_save_and_reload(tmp_path):
+    history = make_history(tmp_path)
+    history.save()
+    assert TaskHistory({"scheduling": {"state_file": str(tmp_path / "task_history.json")}}).has("olx", "Oliwa")
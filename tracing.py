@@ -0,0 +1,195 @@
+import os
+import sys
+import json
+import time
+import itertools
+import threading
+import contextvars
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACE_DIR = "traces"
+FLUSH_EVERY = 200  # events buffered before they are appended to the file
+
+# Chrome's trace viewer draws one row per tid; every scrape task gets its own
+# row ("lane") so the spans of tasks running side by side do not overlap.
+_lane = contextvars.ContextVar("trace_lane", default=0)
+_parent = contextvars.ContextVar("trace_parent", default=None)
+_lanes = itertools.count(1)
+_ids = itertools.count(1)
+
+class _Writer:
+    """Appends Chrome trace events to a JSONL file, one event per line."""
+    def __init__(self, path: str):
+        self.path = path
+        self.buffer = []
+        self.events = 0
+        self.lock = threading.Lock()  # storage spans end in worker threads
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    def write(self, event: dict):
+        with self.lock:
+            self.buffer.append(json.dumps(event, ensure_ascii=False, default=str))
+            self.events += 1
+            if len(self.buffer) >= FLUSH_EVERY:
+                self._flush()
+
+    def _flush(self):
+        if not self.buffer:
+            return
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(self.buffer) + "\n")
+        self.buffer = []
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+class _Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.directory = TRACE_DIR
+        self.writer = None
+        self.pid = os.getpid()
+
+tracer = _Tracer()
+
+def configure(config: dict):
+    """Applies the tracing section of config.json; the runtime switch (enable/disable) may override it later."""
+    conf = config.get("tracing", {})
+    tracer.directory = conf.get("directory", TRACE_DIR)
+    if conf.get("enabled", False):
+        tracer.enabled = True
+
+def enable():
+    tracer.enabled = True
+
+def disable():
+    tracer.enabled = False
+    flush()
+
+def is_enabled() -> bool:
+    return tracer.enabled
+
+def open_trace(name: str):
+    """Starts writing to <directory>/<name>.jsonl (a run's trace), when tracing is on."""
+    flush()
+    tracer.writer = _Writer(os.path.join(tracer.directory, f"{name}.jsonl")) if tracer.enabled else None
+
+def flush():
+    if tracer.writer:
+        tracer.writer.flush()
+
+def status() -> dict:
+    writer = tracer.writer
+    return {"enabled": tracer.enabled, "file": writer.path if writer else None, "events": writer.events if writer else 0}
+
+def _writer():
+    if not tracer.enabled:
+        return None
+    if tracer.writer is None:
+        # Switched on outside of a run, e.g. for filter_by_year.py
+        open_trace(time.strftime("trace_%Y%m%d_%H%M%S"))
+    return tracer.writer
+
+class Span:
+    """
+    A timed operation, written as a Chrome "complete" event when it ends.
+    Use as a context manager, or call end() when start and end are in
+    different places.
+    """
+    __slots__ = ("name", "attrs", "id", "parent", "lane", "started", "_tokens")
+
+    def __init__(self, name: str, attrs: dict, lane: bool):
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_ids)
+        self.parent = _parent.get()
+        self.lane = next(_lanes) if lane else _lane.get()
+        self.started = time.time()
+        self._tokens = (_parent.set(self.id), _lane.set(self.lane))
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def end(self, error: BaseException = None):
+        if self._tokens is None:
+            return
+        for var, token in zip((_parent, _lane), self._tokens):
+            try:
+                var.reset(token)
+            except ValueError:
+                # Ended from another task or thread; its context never saw the span
+                pass
+        self._tokens = None
+        if error is not None:
+            self.attrs["error"] = repr(error)[:300]
+        _emit(self.name, self.started, time.time(), self.lane, {**self.attrs, "span": self.id, "parent": self.parent})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def end(self, error=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP = _NoopSpan()
+
+def span(name: str, lane: bool = False, **attrs):
+    """
+    Starts a span nested under the current one. lane=True puts it (and its
+    children) on a row of its own in the timeline; use it for concurrent tasks.
+    With tracing off this returns a shared no-op span.
+    """
+    if not tracer.enabled:
+        return NOOP
+    return Span(name, attrs, lane)
+
+def record(name: str, started: float, **attrs):
+    """Writes a span that already happened, from started (time.time()) until now."""
+    if tracer.enabled:
+        _emit(name, started, time.time(), _lane.get(), {**attrs, "parent": _parent.get()})
+
+def _emit(name, started, ended, lane, args):
+    writer = _writer()
+    if writer:
+        writer.write({
+            "name": name,
+            "ph": "X",
+            "ts": int(started * 1e6),
+            "dur": max(int((ended - started) * 1e6), 1),
+            "pid": tracer.pid,
+            "tid": lane,
+            "args": {k: v for k, v in args.items() if v is not None},
+        })
+
+def to_chrome(jsonl_path: str, out_path: str = None) -> str:
+    """Wraps a JSONL trace into the JSON object format read by chrome://tracing and Perfetto."""
+    out_path = out_path or os.path.splitext(jsonl_path)[0] + ".json"
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return out_path
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python tracing.py traces/<run_id>.jsonl [out.json]")
+        sys.exit(1)
+    print(to_chrome(*sys.argv[1:3]))